@@ -2,6 +2,8 @@
 ASGI config for ProjectManagement project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn ProjectManagement.asgi:application``) so the
+``/events/`` progress streams idle on the event loop instead of holding a worker thread each.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -28,23 +28,29 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'projects.log.JsonFormatter',
+        },
     },
     'handlers': {
         'console': {
             'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+            # Records are formatted and written by a background thread; see projects/log.py.
+            'class': 'projects.log.QueuedStreamHandler',
+            'formatter': env('LOG_FORMAT', default='simple'),
+            # Records waiting to be written beyond this are dropped (and counted) instead of piling up.
+            'queue_size': env.int('LOG_QUEUE_SIZE', default=10000),
         },
     },
     'loggers': {
         'django': {
             'handlers': ['console'],
             'level': 'INFO',
-            'propagate': True,
+            'propagate': False,
         },
         '': {
             'handlers': ['console'],
-            'level': 'INFO',
+            'level': env('LOG_LEVEL', default='INFO'),
             'propagate': False,
         },
     },
@@ -70,7 +76,58 @@ SOCIALACCOUNT_PROVIDERS = {
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'projects.pagination.IdCursorPagination',
+    'PAGE_SIZE': env.int('API_PAGE_SIZE', default=50),
+    # Applies to the views that set a throttle_scope (the projects, tasks and users viewsets).
+    'DEFAULT_THROTTLE_CLASSES': ['projects.throttling.TokenBucketThrottle'],
+}
+
+# Upper bound for the ?page_size= query parameter on list endpoints.
+API_MAX_PAGE_SIZE = env.int('API_MAX_PAGE_SIZE', default=500)
+
+# Token-bucket throttling per client and endpoint: refill rates ('<requests>/<s|min|hour|day>') and
+# bucket sizes (the burst a client may send at once) for reads and writes. Keys such as
+# 'tasks.write' override one endpoint. Share the buckets between workers with a Redis cache.
+API_THROTTLE = env.bool('API_THROTTLE', default=True)
+API_THROTTLE_RATES = {
+    'read': env.str('API_THROTTLE_READ_RATE', default='600/min'),
+    'write': env.str('API_THROTTLE_WRITE_RATE', default='120/min'),
+}
+API_THROTTLE_BURSTS = {
+    'read': env.int('API_THROTTLE_READ_BURST', default=100),
+    'write': env.int('API_THROTTLE_WRITE_BURST', default=20),
 }
+API_THROTTLE_CACHE = env.str('API_THROTTLE_CACHE', default='default')
+
+# Delta sync (/api/sync/): rows per stream and page, the window resent to cover transactions that
+# commit late, and how long deletions are remembered (older tokens get 410 and must resync fully).
+SYNC_PAGE_SIZE = env.int('SYNC_PAGE_SIZE', default=500)
+SYNC_SETTLE_SECONDS = env.int('SYNC_SETTLE_SECONDS', default=5)
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int('SYNC_TOMBSTONE_RETENTION_DAYS', default=30)
+
+# Maximum number of tasks accepted by one /api/tasks/bulk/ request.
+TASK_BULK_MAX_ITEMS = env.int('TASK_BULK_MAX_ITEMS', default=1000)
+
+# Rows fetched per database round trip by the streaming CSV/NDJSON exports.
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
+# Tasks or memberships removed per transaction when a project is deleted or archived: each chunk
+# holds the write lock only briefly. manage.py archive_projects moves projects whose tasks are all
+# completed and that have not changed for ARCHIVE_AFTER_DAYS.
+DELETE_CHUNK_SIZE = env.int('DELETE_CHUNK_SIZE', default=1000)
+ARCHIVE_AFTER_DAYS = env.int('ARCHIVE_AFTER_DAYS', default=90)
+
+# Background jobs (manage.py run_worker): attempts before a job is kept as failed, the base of the
+# exponential retry delay, and how long a job may run before its worker is presumed dead.
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=5)
+JOB_RETRY_BACKOFF_SECONDS = env.int('JOB_RETRY_BACKOFF_SECONDS', default=10)
+JOB_LOCK_TIMEOUT_SECONDS = env.int('JOB_LOCK_TIMEOUT_SECONDS', default=600)
+
+# Queue the project recounts after bulk task writes and the dashboard/progress-event fan-out, coalesced
+# per project over PROGRESS_DEBOUNCE_SECONDS. Needs a running worker, and a cache and EVENT_BROKER
+# shared between the worker and the web processes.
+DEFER_PROGRESS_UPDATES = env.bool('DEFER_PROGRESS_UPDATES', default=False)
+PROGRESS_DEBOUNCE_SECONDS = env.int('PROGRESS_DEBOUNCE_SECONDS', default=2)
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Project Management API',
@@ -107,6 +164,7 @@ AUTHENTICATION_BACKENDS = (
 )
 
 MIDDLEWARE = [
+    'projects.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -117,6 +175,18 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Compress responses with Brotli (if the brotli package is installed) or gzip. Off by default: a
+# proxy usually does this, and compressing pages that carry secrets invites BREACH-style attacks.
+RESPONSE_COMPRESSION = env.bool('RESPONSE_COMPRESSION', default=False)
+if RESPONSE_COMPRESSION:
+    MIDDLEWARE.insert(1, 'projects.middleware.CompressionMiddleware')
+
+# Requests slower than this, or issuing at least this many queries, are logged with their
+# most repeated SQL shapes (shapes seen fewer than SLOW_REQUEST_REPEATED_QUERIES times are left out).
+SLOW_REQUEST_MS = env.int('SLOW_REQUEST_MS', default=500)
+SLOW_REQUEST_QUERIES = env.int('SLOW_REQUEST_QUERIES', default=50)
+SLOW_REQUEST_REPEATED_QUERIES = env.int('SLOW_REQUEST_REPEATED_QUERIES', default=5)
+
 ROOT_URLCONF = 'ProjectManagement.urls'
 
 TEMPLATES = [
@@ -138,13 +208,67 @@ TEMPLATES = [
 WSGI_APPLICATION = 'ProjectManagement.wsgi.application'
 
 # Database
+# DATABASE_URL selects the primary (SQLite file by default). With DATABASE_REPLICA_URL set, reads
+# of the project data in GET/HEAD requests go to the replica, unless the request, or one from the
+# same client in the last REPLICA_PIN_SECONDS, wrote to the primary.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': env.db('DATABASE_URL', default=f'sqlite:///{BASE_DIR / "db.sqlite3"}'),
+}
+if env.str('DATABASE_REPLICA_URL', default=''):
+    DATABASES['replica'] = env.db('DATABASE_REPLICA_URL')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['projects.db.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(1, 'projects.middleware.ReplicaRoutingMiddleware')
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+# Seconds a connection is reused across requests (0 closes it after each request, as ASGI
+# deployments should); reused connections are checked before each request.
+DB_CONN_MAX_AGE = env.int('DB_CONN_MAX_AGE', default=60)
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the one writer, and with
+# NORMAL sync a commit does not wait for fsync (a power loss can drop the last commits, never corrupt).
+# Writers wait up to SQLITE_BUSY_TIMEOUT_MS for the lock; atomic blocks take it at BEGIN.
+SQLITE_PRAGMAS = {
+    'journal_mode': env.str('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': env.str('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'busy_timeout': env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000),
+    # Negative: KiB of page cache per connection.
+    'cache_size': -env.int('SQLITE_CACHE_SIZE_KB', default=20000),
+    'temp_store': 'MEMORY',
 }
 
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    database['CONN_HEALTH_CHECKS'] = True
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['ENGINE'] = 'projects.backends.sqlite3'
+        database.setdefault('OPTIONS', {}).setdefault('transaction_mode', 'IMMEDIATE')
+
+# Cache
+# Defaults to a per-process LocMemCache; point CACHE_URL at a shared backend (e.g. redis://) in production.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Seconds a rendered dashboard project list is kept; signals invalidate it earlier on change.
+DASHBOARD_CACHE_TIMEOUT = env.int('DASHBOARD_CACHE_TIMEOUT', default=600)
+
+# Live progress events (/events/). The in-memory broker fans out within one process; with several
+# ASGI workers, or DEFER_PROGRESS_UPDATES, use projects.events.RedisBroker, which relays through
+# Redis pub/sub at EVENT_REDIS_URL.
+EVENT_BROKER = env('EVENT_BROKER', default='projects.events.InMemoryBroker')
+EVENT_REDIS_URL = env.str('EVENT_REDIS_URL', default='redis://localhost:6379/0')
+# Events buffered per open stream before a slow client starts losing them.
+EVENT_QUEUE_SIZE = env.int('EVENT_QUEUE_SIZE', default=100)
+# Seconds between keep-alive comments on an idle stream, so proxies do not drop the connection.
+EVENT_KEEPALIVE_SECONDS = env.int('EVENT_KEEPALIVE_SECONDS', default=15)
+
+# Full-text search (/api/search/). The FTS5 index exists on SQLite only; on other databases use
+# projects.search.SimpleSearchBackend, or a projects.search.SearchBackend over a search engine.
+SEARCH_BACKEND = env('SEARCH_BACKEND', default='projects.search.SQLiteFTSBackend')
+# Matches (newest first) ranked per query; broader queries rank among the most recent ones only.
+SEARCH_MAX_CANDIDATES = env.int('SEARCH_MAX_CANDIDATES', default=1000)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
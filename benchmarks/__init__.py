@@ -0,0 +1,8 @@
+"""
+In-process benchmarks for the template views and the REST API.
+
+Run from the repository root::
+
+    python -m benchmarks.run --output benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+"""
@@ -0,0 +1,162 @@
+"""
+Concurrent-connection throughput of the sync DRF viewsets against their async variants.
+
+Requests are fed straight into ``ProjectManagement.asgi.application`` from ``--concurrency``
+coroutines, each a keep-busy client issuing requests back to back, so both variants run under the
+same ASGI handler and event loop. ``--query-latency-ms`` adds a sleep to every SQL statement to
+stand in for a remote database under load::
+
+    python -m benchmarks.async_throughput --concurrency 1 --concurrency 50 --query-latency-ms 2
+
+Note that Django still runs async ORM calls through a single ``sync_to_async`` thread, so the
+database work of both variants is serialized; what the async views save is the thread hop and the
+DRF machinery around it.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = [
+    ('projects.list', lambda dataset: '/api/projects/', lambda dataset: '/api/async/projects/'),
+    ('projects.retrieve', lambda dataset: f'/api/projects/{dataset.project.pk}/',
+     lambda dataset: f'/api/async/projects/{dataset.project.pk}/'),
+    ('tasks.list', lambda dataset: '/api/tasks/', lambda dataset: '/api/async/tasks/'),
+    ('tasks.retrieve', lambda dataset: f'/api/tasks/{dataset.task.pk}/',
+     lambda dataset: f'/api/async/tasks/{dataset.task.pk}/'),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--tasks-per-project', type=int, default=40)
+    parser.add_argument('--members-per-project', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, action='append', default=[],
+                        help='Number of concurrent connections; may be repeated (default 1, 10 and 50).')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and concurrency level.')
+    parser.add_argument('--query-latency-ms', type=float, default=0)
+    return parser.parse_args(argv)
+
+
+async def asgi_get(application, path, cookie):
+    """Issue one GET through the ASGI application and return the response status."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    body_sent = False
+    status = None
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The handler waits for a disconnect while the view runs; the client never hangs up.
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+async def load(application, path, cookie, concurrency, total):
+    """Run ``total`` requests over ``concurrency`` connections; return (elapsed seconds, latencies ms)."""
+    remaining = total
+    latencies = []
+
+    async def connection():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            status = await asgi_get(application, path, cookie)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                raise RuntimeError(f'GET {path} returned {status}')
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProjectManagement.settings')
+    django.setup()
+
+    import logging
+
+    from django.conf import settings
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+    from ProjectManagement.asgi import application
+
+    from .dataset import DatasetConfig, seed_dataset
+    from .harness import percentile
+
+    logging.disable(logging.WARNING)
+
+    def slow_query(execute, sql, params, many, context):
+        time.sleep(args.query_latency_ms / 1000)
+        return execute(sql, params, many, context)
+
+    def add_latency(sender, connection, **kwargs):
+        connection.execute_wrappers.append(slow_query)
+
+    config = DatasetConfig(
+        users=args.users, projects=args.projects, tasks_per_project=args.tasks_per_project,
+        members_per_project=args.members_per_project, seed=args.seed,
+    )
+    setup_test_environment()
+    # Only the sync views are throttled, and the load test is one client far above the limits.
+    throttle_off = override_settings(API_THROTTLE=False)
+    throttle_off.enable()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        dataset = seed_dataset(config)
+        client = Client()
+        client.force_login(dataset.member)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        if args.query_latency_ms:
+            connection_created.connect(add_latency)
+
+        print(f"{'endpoint':<20} {'conc':>5} {'sync req/s':>11} {'async req/s':>12} {'sync p95':>10} "
+              f"{'async p95':>10} {'speedup':>8}")
+        for name, sync_path, async_path in ENDPOINTS:
+            for concurrency in args.concurrency or [1, 10, 50]:
+                row = {}
+                for variant, path in (('sync', sync_path(dataset)), ('async', async_path(dataset))):
+                    asyncio.run(load(application, path, cookie, concurrency, min(20, args.requests)))  # warm up
+                    elapsed, latencies = asyncio.run(load(application, path, cookie, concurrency, args.requests))
+                    row[variant] = (args.requests / elapsed, percentile(latencies, 0.95))
+                print(f"{name:<20} {concurrency:>5} {row['sync'][0]:>11.1f} {row['async'][0]:>12.1f} "
+                      f"{row['sync'][1]:>8.1f}ms {row['async'][1]:>8.1f}ms {row['async'][0] / row['sync'][0]:>7.2f}x")
+    finally:
+        connection_created.disconnect(add_latency)
+        runner.teardown_databases(old_config)
+        throttle_off.disable()
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
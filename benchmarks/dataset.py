@@ -0,0 +1,80 @@
+import random
+from dataclasses import asdict, dataclass
+
+from django.contrib.auth.models import User
+
+from projects.models import Project, Task
+
+
+@dataclass
+class DatasetConfig:
+    users: int = 200
+    projects: int = 50
+    tasks_per_project: int = 40
+    members_per_project: int = 10
+    completed_ratio: float = 0.3
+    seed: int = 42
+
+    def as_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class Dataset:
+    """Handles to the seeded rows that scenarios need."""
+    config: DatasetConfig
+    admin: User
+    member: User
+    project: Project
+    task: Task
+
+
+def seed_dataset(config):
+    """
+    Create a reproducible synthetic dataset with bulk inserts.
+
+    ``member`` creates and belongs to ``project`` and to ``members_per_project`` fan-out of other
+    projects, and every project gets tasks assigned round-robin to its members.
+    """
+    rng = random.Random(config.seed)
+    admin = User.objects.create_superuser(username='bench-admin', email='admin@example.com', password=None)
+    users = User.objects.bulk_create(
+        User(username=f'bench-user-{i}', email=f'user{i}@example.com') for i in range(config.users)
+    )
+    member = users[0]
+    projects = Project.objects.bulk_create(
+        Project(name=f'Project {i}', description=f'Synthetic project {i}', created_by=rng.choice(users))
+        for i in range(config.projects)
+    )
+    projects[0].created_by = member
+    projects[0].save(update_fields=['created_by'])
+
+    Membership = Project.members.through
+    memberships = []
+    project_members = {}
+    for project in projects:
+        members = {member} if project is projects[0] or rng.random() < 0.5 else set()
+        members.update(rng.sample(users, min(config.members_per_project, len(users))))
+        project_members[project.pk] = list(members)
+        memberships.extend(Membership(project_id=project.pk, user_id=user.pk) for user in members)
+    Membership.objects.bulk_create(memberships, batch_size=1000)
+
+    tasks = []
+    for project in projects:
+        members = project_members[project.pk]
+        for i in range(config.tasks_per_project):
+            tasks.append(Task(
+                project=project,
+                name=f'Task {project.pk}-{i}',
+                description=f'Synthetic task {i} of project {project.pk}',
+                assigned_to=members[i % len(members)],
+                completed=rng.random() < config.completed_ratio,
+                progress=rng.randrange(0, 101),
+            ))
+    Task.objects.bulk_create(tasks, batch_size=1000)
+    Project.refresh_task_counters([project.pk for project in projects])
+
+    task = Task.objects.filter(project=projects[0], assigned_to=member).first()
+    if task is None:
+        task = Task.objects.create(project=projects[0], name='Member task', description='', assigned_to=member)
+    return Dataset(config=config, admin=admin, member=member, project=projects[0], task=task)
@@ -0,0 +1,76 @@
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class ScenarioError(Exception):
+    pass
+
+
+def consume(response):
+    """Drain streaming responses so their generation cost is part of the measurement."""
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    if response.status_code >= 400:
+        raise ScenarioError(f'HTTP {response.status_code}')
+    return response
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_scenario(scenario, context, iterations, warmup):
+    for _ in range(warmup):
+        consume(scenario.prepare(context)())
+
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        request = scenario.prepare(context)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            consume(request())
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+
+    # Memory is sampled in a separate pass because tracing skews the timings.
+    request = scenario.prepare(context)
+    tracemalloc.start()
+    try:
+        consume(request())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': int(statistics.median(queries)),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return human-readable regressions of ``current`` against ``baseline`` results."""
+    regressions = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'peak_kib'):
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                regressions.append(
+                    f'{name}: {metric} {before[metric]} -> {result[metric]} '
+                    f'(+{(result[metric] / before[metric] - 1) * 100:.0f}%)')
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+    return regressions
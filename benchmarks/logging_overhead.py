@@ -0,0 +1,100 @@
+"""
+Per-request cost of the view logging, before and after the move to deferred, queued audit records.
+
+"before" replays what a list request used to emit: two eagerly formatted f-string records through a
+synchronous StreamHandler. "after" emits the single ``audit()`` record through ``QueuedStreamHandler``.
+Both write to a real file so the synchronous variant pays for the I/O it used to block on;
+``--write-latency-us`` additionally simulates a slow sink such as a congested pipe or log shipper::
+
+    python -m benchmarks.logging_overhead --requests 20000 --write-latency-us 50
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from projects.log import QueuedStreamHandler, audit  # noqa: E402
+
+FORMAT = '{levelname} {message}'
+
+
+class SlowStream:
+    """Stream wrapper that sleeps before every write."""
+
+    def __init__(self, stream, latency_us):
+        self.stream = stream
+        self.latency = latency_us / 1e6
+
+    def write(self, data):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def make_logger(name, handler):
+    handler.setFormatter(logging.Formatter(FORMAT, style='{'))
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def before(logger, request):
+    logger.info(f'User {request.user.username} is retrieving their projects.')
+    logger.info(f'User {request.user.username} listed projects.')
+
+
+def after(logger, request):
+    audit(logger, 'project.listed', user=request.user.username, status=200)
+
+
+def measure(emit, logger, requests):
+    request = SimpleNamespace(user=SimpleNamespace(username='benchmark-user'))
+    started = time.perf_counter()
+    for _ in range(requests):
+        emit(logger, request)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--write-latency-us', type=float, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sync_stream = open(os.path.join(directory, 'sync.log'), 'w')
+        queued_stream = open(os.path.join(directory, 'queued.log'), 'w')
+        sync_logger = make_logger('bench.sync', logging.StreamHandler(SlowStream(sync_stream, args.write_latency_us)))
+        queued_handler = QueuedStreamHandler(SlowStream(queued_stream, args.write_latency_us))
+        queued_logger = make_logger('bench.queued', queued_handler)
+
+        rows = [
+            ('before: 2 eager records, sync handler', measure(before, sync_logger, args.requests)),
+            ('after: 1 audit record, queued handler', measure(after, queued_logger, args.requests)),
+        ]
+        sync_logger.setLevel(logging.WARNING)
+        queued_logger.setLevel(logging.WARNING)
+        rows += [
+            ('before, INFO disabled', measure(before, sync_logger, args.requests)),
+            ('after, INFO disabled', measure(after, queued_logger, args.requests)),
+        ]
+        queued_handler.close()
+        sync_stream.close()
+        queued_stream.close()
+
+    for label, micros in rows:
+        print(f'{label:<40} {micros:8.2f} us/request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Deleting a large project: the ORM's cascading delete against the chunked delete_project().
+
+Seeds two projects of ``--tasks`` tasks each (indexed for search), deletes one with
+``Project.delete()`` and the other with ``projects.archive.delete_project()``, and reports the total
+time and the longest transaction, i.e. the longest the write lock is held at once::
+
+    python -m benchmarks.project_delete --tasks 200000 --chunk-size 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tasks', type=int, default=200000, help='Tasks per project.')
+    parser.add_argument('--members', type=int, default=20, help='Members and assignees per project.')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+def seed(args, name):
+    from django.contrib.auth.models import User
+
+    from projects.models import Project, Task
+
+    users = User.objects.bulk_create(User(username=f'{name}-user-{i}') for i in range(args.members))
+    project = Project.objects.create(name=name, description='', created_by=users[0], total_tasks=args.tasks)
+    project.members.add(*users)
+    batch = []
+    for i in range(args.tasks):
+        batch.append(Task(project=project, name=f'Task {i}', description='Benchmark',
+                          assigned_to=users[i % len(users)], completed=i % 3 == 0))
+        if len(batch) == 10000:
+            Task.objects.bulk_create(batch)
+            batch = []
+    Task.objects.bulk_create(batch)
+    return project
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProjectManagement.settings')
+    django.setup()
+
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from projects.archive import delete_project, remove_task_chunk
+    from projects.rollups import rebuild
+    from projects.search import get_search_backend
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        cascading, chunked = seed(args, 'cascading'), seed(args, 'chunked')
+        get_search_backend().rebuild()
+        rebuild()
+        print(f'Seeded two projects of {args.tasks:,} tasks.')
+
+        started = time.perf_counter()
+        cascading.delete()
+        elapsed = time.perf_counter() - started
+        # One transaction from start to end.
+        print(f'{"Project.delete()":<18} {elapsed:>8.2f}s total {elapsed * 1000:>9.1f}ms longest transaction')
+
+        # delete_project()'s loops, timed chunk by chunk; it then finishes off the memberships and the row.
+        longest = 0
+        started = time.perf_counter()
+        while True:
+            chunk_started = time.perf_counter()
+            if not remove_task_chunk(chunked, chunk_size=args.chunk_size):
+                break
+            longest = max(longest, time.perf_counter() - chunk_started)
+        final_started = time.perf_counter()
+        delete_project(chunked, args.chunk_size)
+        longest = max(longest, time.perf_counter() - final_started)
+        elapsed = time.perf_counter() - started
+        print(f'{"delete_project()":<18} {elapsed:>8.2f}s total {longest * 1000:>9.1f}ms longest transaction')
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Encode time and payload size of the API response formats.
+
+A page of ``--rows`` projects and one of tasks, as the list endpoints build them, are rendered
+with DRF's ``JSONRenderer``, the orjson renderer and the MessagePack renderer; each payload is
+also reported gzip- and (if ``brotli`` is installed) Brotli-compressed. Formats whose package is
+not installed are skipped::
+
+    python -m benchmarks.renderer_formats --rows 5000 --repeat 10
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10, help='Encodes per format; the best one is reported.')
+    parser.add_argument('--members-per-project', type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def best_encode_ms(render, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = render(data)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, payload
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProjectManagement.settings')
+    django.setup()
+
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from rest_framework.renderers import JSONRenderer
+
+    from projects import renderers
+    from projects.middleware import CompressionMiddleware, brotli
+    from projects.models import Project, Task
+    from projects.serializers.serializers_v1 import ProjectSerializer, TaskSerializer, ValuesRepresentation
+
+    from .serialization_throughput import seed
+
+    formats = [('json (DRF)', JSONRenderer())]
+    if renderers.orjson is not None:
+        formats.append(('json (orjson)', renderers.ORJSONRenderer()))
+    if renderers.msgpack is not None:
+        formats.append(('msgpack', renderers.MessagePackRenderer()))
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        seed(args.rows, args.members_per_project)
+        print(f"{'page':<10} {'format':<14} {'encode':>10} {'bytes':>11} {'gzip':>10} {'brotli':>10}")
+        for name, serializer_class, queryset in (('projects', ProjectSerializer, Project.objects.order_by('pk')),
+                                                 ('tasks', TaskSerializer, Task.objects.order_by('pk'))):
+            representation = ValuesRepresentation(serializer_class())
+            data = {'next': None, 'previous': None,
+                    'results': representation.to_representation(representation.values(queryset))}
+            for label, renderer in formats:
+                encode_ms, payload = best_encode_ms(renderer.render, data, args.repeat)
+                gzipped = len(gzip.compress(payload))
+                brotlied = '-'
+                if brotli is not None:
+                    brotlied = f'{len(brotli.compress(payload, quality=CompressionMiddleware.brotli_quality)):,}'
+                print(f'{name:<10} {label:<14} {encode_ms:>8.1f}ms {len(payload):>11,} {gzipped:>10,} {brotlied:>10}')
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import sys
+
+import django
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the template views and REST API in-process.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--tasks-per-project', type=int, default=40)
+    parser.add_argument('--members-per-project', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', action='append', default=[],
+                        help='Glob of scenario names to run, e.g. "api.tasks.*". May be repeated.')
+    parser.add_argument('--output', help='Write results as JSON, e.g. to refresh benchmarks/baseline.json.')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Relative slowdown that counts as a regression (default 0.25 = 25%%).')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='Application log level while benchmarking (default WARNING).')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProjectManagement.settings')
+    django.setup()
+
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+    from .dataset import DatasetConfig, seed_dataset
+    from .harness import ScenarioError, compare, run_scenario
+    from .scenarios import SCENARIOS, Context
+
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+    config = DatasetConfig(
+        users=args.users, projects=args.projects, tasks_per_project=args.tasks_per_project,
+        members_per_project=args.members_per_project, seed=args.seed,
+    )
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if not args.only or any(fnmatch.fnmatch(scenario.name, pattern) for pattern in args.only)
+    ]
+
+    setup_test_environment()
+    # The scenarios replay one client far faster than the API throttle lets through.
+    throttle_off = override_settings(API_THROTTLE=False)
+    throttle_off.enable()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    results = {}
+    failures = []
+    try:
+        context = Context(seed_dataset(config))
+        for scenario in scenarios:
+            try:
+                results[scenario.name] = result = run_scenario(scenario, context, args.iterations, args.warmup)
+            except ScenarioError as exc:
+                failures.append(f'{scenario.name}: {exc}')
+                continue
+            except Exception as exc:
+                failures.append(f'{scenario.name}: {exc!r}')
+                continue
+            print(f"{scenario.name:<34} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+                  f"queries {result['queries']:>4}  peak {result['peak_kib']:>9.1f} KiB")
+    finally:
+        runner.teardown_databases(old_config)
+        throttle_off.disable()
+        teardown_test_environment()
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'config': config.as_dict(), 'results': results}, output, indent=2, sort_keys=True)
+            output.write('\n')
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('config') != config.as_dict():
+            print('warning: baseline was recorded with a different dataset configuration', file=sys.stderr)
+        regressions = compare(baseline['results'], results, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+
+    for failure in failures:
+        print(f'FAILED {failure}', file=sys.stderr)
+    return 1 if regressions or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Benchmark scenarios. Each scenario's ``prepare(context)`` runs untimed before every iteration
+and returns the zero-argument callable that issues the timed request.
+"""
+import itertools
+from dataclasses import dataclass
+from typing import Callable
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from projects.models import Project, Task
+
+_sequence = itertools.count()
+
+
+@dataclass
+class Scenario:
+    name: str
+    prepare: Callable
+
+
+class Context:
+    """Logged-in clients and factories for the rows that write scenarios consume."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.web = Client()
+        self.web.force_login(dataset.member)
+        self.api = APIClient()
+        self.api.force_authenticate(dataset.member)
+        self.admin_api = APIClient()
+        self.admin_api.force_authenticate(dataset.admin)
+
+    @staticmethod
+    def unique(prefix):
+        return f'{prefix}-{next(_sequence)}'
+
+    def make_project(self):
+        project = Project.objects.create(name=self.unique('project'), description='Benchmark', created_by=self.dataset.member)
+        project.members.add(self.dataset.member)
+        return project
+
+    def make_task(self):
+        return Task.objects.create(project=self.dataset.project, name=self.unique('task'), description='Benchmark',
+                                   assigned_to=self.dataset.member)
+
+    def make_user(self):
+        return User.objects.create(username=self.unique('user'))
+
+    def task_payload(self, **overrides):
+        payload = {'name': self.unique('task'), 'description': 'Benchmark', 'assigned_to': self.dataset.member.pk,
+                   'project': self.dataset.project.pk}
+        payload.update(overrides)
+        return payload
+
+
+def get(url_factory, client='web'):
+    def prepare(ctx):
+        url = url_factory(ctx)
+        return lambda: getattr(ctx, client).get(url)
+    return prepare
+
+
+def cold(prepare):
+    def cold_prepare(ctx):
+        cache.clear()
+        return prepare(ctx)
+    return cold_prepare
+
+
+def web_post(url_factory, data_factory):
+    def prepare(ctx):
+        url, data = url_factory(ctx), data_factory(ctx)
+        return lambda: ctx.web.post(url, data)
+    return prepare
+
+
+def api(method, url_factory, data_factory=None, client='api'):
+    def prepare(ctx):
+        url = url_factory(ctx)
+        data = data_factory(ctx) if data_factory else None
+        return lambda: getattr(getattr(ctx, client), method)(url, data, format='json')
+    return prepare
+
+
+def _project_url(ctx):
+    return f'/api/projects/{ctx.dataset.project.pk}/'
+
+
+def _task_url(ctx):
+    return f'/api/tasks/{ctx.dataset.task.pk}/'
+
+
+def _user_url(ctx):
+    return f'/api/users/{ctx.dataset.member.pk}/'
+
+
+def _new_task_url(ctx):
+    return f'/api/tasks/{ctx.make_task().pk}/'
+
+
+def _new_project_url(ctx):
+    return f'/api/projects/{ctx.make_project().pk}/'
+
+
+def _new_user_url(ctx):
+    return f'/api/users/{ctx.make_user().pk}/'
+
+
+WEB_SCENARIOS = [
+    Scenario('web.signup', get(lambda ctx: reverse('signup'))),
+    Scenario('web.login', get(lambda ctx: reverse('login'))),
+    Scenario('web.dashboard.cold', cold(get(lambda ctx: reverse('dashboard')))),
+    Scenario('web.dashboard.warm', get(lambda ctx: reverse('dashboard'))),
+    Scenario('web.create_project.get', get(lambda ctx: reverse('create_project'))),
+    Scenario('web.create_project.post', web_post(
+        lambda ctx: reverse('create_project'),
+        lambda ctx: {'name': ctx.unique('project'), 'description': 'Benchmark', 'members': [ctx.dataset.member.pk]})),
+    Scenario('web.project_detail', get(lambda ctx: reverse('project_detail', args=[ctx.dataset.project.pk]))),
+    Scenario('web.user_list', get(lambda ctx: reverse('user_list'))),
+    Scenario('web.create_user.get', get(lambda ctx: reverse('create_user'))),
+    Scenario('web.user_detail', get(lambda ctx: reverse('user_detail', args=[ctx.dataset.member.pk]))),
+    Scenario('web.update_task_progress.get', get(lambda ctx: reverse('update_task_progress', args=[ctx.dataset.task.pk]))),
+    Scenario('web.update_task_progress.post', web_post(
+        lambda ctx: reverse('update_task_progress', args=[ctx.dataset.task.pk]),
+        lambda ctx: {'progress': next(_sequence) % 100, 'completed': ''})),
+    Scenario('web.create_task.get', get(lambda ctx: reverse('create_task', args=[ctx.dataset.project.pk]))),
+    Scenario('web.create_task.post', web_post(
+        lambda ctx: reverse('create_task', args=[ctx.dataset.project.pk]),
+        lambda ctx: ctx.task_payload())),
+    Scenario('web.add_member.get', get(lambda ctx: reverse('add_member', args=[ctx.dataset.project.pk]))),
+    Scenario('web.add_member.post', web_post(
+        lambda ctx: reverse('add_member', args=[ctx.dataset.project.pk]),
+        lambda ctx: {'user': ctx.make_user().pk})),
+]
+
+API_SCENARIOS = [
+    Scenario('api.users.list', api('get', lambda ctx: '/api/users/')),
+    Scenario('api.users.retrieve', api('get', _user_url)),
+    Scenario('api.users.create', api('post', lambda ctx: '/api/users/', lambda ctx: {'username': ctx.unique('user')})),
+    Scenario('api.users.update', api('put', _user_url, lambda ctx: {'username': ctx.dataset.member.username})),
+    Scenario('api.users.partial_update', api('patch', _user_url, lambda ctx: {'first_name': ctx.unique('first')})),
+    Scenario('api.users.destroy', api('delete', _new_user_url)),
+
+    Scenario('api.projects.list', api('get', lambda ctx: '/api/projects/')),
+    Scenario('api.projects.list.admin', api('get', lambda ctx: '/api/projects/', client='admin_api')),
+    Scenario('api.projects.retrieve', api('get', _project_url)),
+    Scenario('api.projects.create', api('post', lambda ctx: '/api/projects/', lambda ctx: {
+        'name': ctx.unique('project'), 'description': 'Benchmark', 'created_by': ctx.dataset.member.pk,
+        'members': [ctx.dataset.member.pk]})),
+    Scenario('api.projects.update', api('put', _project_url, lambda ctx: {
+        'name': ctx.dataset.project.name, 'description': 'Benchmark', 'created_by': ctx.dataset.member.pk,
+        'members': [ctx.dataset.member.pk]})),
+    Scenario('api.projects.partial_update', api('patch', _project_url, lambda ctx: {'description': ctx.unique('d')})),
+    Scenario('api.projects.destroy', api('delete', _new_project_url)),
+    Scenario('api.projects.export', api('get', lambda ctx: '/api/projects/export/ndjson/')),
+
+    Scenario('api.tasks.list', api('get', lambda ctx: '/api/tasks/')),
+    Scenario('api.tasks.list.admin', api('get', lambda ctx: '/api/tasks/', client='admin_api')),
+    Scenario('api.tasks.retrieve', api('get', _task_url)),
+    Scenario('api.tasks.create', api('post', lambda ctx: '/api/tasks/', lambda ctx: ctx.task_payload())),
+    Scenario('api.tasks.update', api('put', _task_url, lambda ctx: ctx.task_payload(name=ctx.dataset.task.name))),
+    Scenario('api.tasks.partial_update', api('patch', _task_url, lambda ctx: {'progress': next(_sequence) % 100})),
+    Scenario('api.tasks.destroy', api('delete', _new_task_url)),
+    Scenario('api.tasks.bulk_create', api('post', lambda ctx: '/api/tasks/bulk/',
+                                          lambda ctx: [ctx.task_payload() for _ in range(50)])),
+    Scenario('api.tasks.bulk_update', api('patch', lambda ctx: '/api/tasks/bulk/', lambda ctx: [
+        {'id': ctx.dataset.task.pk, 'progress': next(_sequence) % 100}])),
+    Scenario('api.tasks.export', api('get', lambda ctx: '/api/tasks/export/csv/', client='admin_api')),
+
+    # Async variants; they authenticate by session, so they go through the web client.
+    Scenario('api.async.projects.list', get(lambda ctx: reverse('async-project-list'))),
+    Scenario('api.async.projects.retrieve', get(lambda ctx: reverse('async-project-detail', args=[ctx.dataset.project.pk]))),
+    Scenario('api.async.tasks.list', get(lambda ctx: reverse('async-task-list'))),
+    Scenario('api.async.tasks.retrieve', get(lambda ctx: reverse('async-task-detail', args=[ctx.dataset.task.pk]))),
+]
+
+SCENARIOS = WEB_SCENARIOS + API_SCENARIOS
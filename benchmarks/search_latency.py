@@ -0,0 +1,126 @@
+"""
+Latency of /api/search/ queries on a large synthetic dataset.
+
+Seeds ``--tasks`` tasks over ``--projects`` projects with names and descriptions drawn from a
+skewed vocabulary (so some words hit a large share of the rows and others a handful), rebuilds the
+search index, then times ``SearchView`` for a superuser and for a member across common, rare,
+prefix and multi-word queries::
+
+    python -m benchmarks.search_latency --tasks 1000000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from itertools import accumulate
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = [f'w{i:04d}' for i in range(5000)]
+# Zipf-like weights: the first words appear in a large share of the rows.
+CUM_WEIGHTS = list(accumulate(1 / (rank + 1) for rank in range(len(WORDS))))
+
+QUERIES = {
+    # In most rows, like a stop word: ranking has to read its whole posting list.
+    'stop word': 'w0000',
+    'common word': 'w0010',
+    'rare word': 'w4321',
+    'two words': 'w0020 w0030',
+    'prefix': 'w012*',
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--members-per-project', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20, help='Requests per query and user.')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def phrase(rng, words):
+    return ' '.join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=words))
+
+
+def seed(args):
+    from django.contrib.auth.models import User
+
+    from projects.models import Project, Task
+
+    rng = random.Random(args.seed)
+    users = User.objects.bulk_create(User(username=f'search-user-{i}') for i in range(args.users))
+    projects = Project.objects.bulk_create(
+        Project(name=phrase(rng, 3), description=phrase(rng, 12), created_by=rng.choice(users))
+        for _ in range(args.projects)
+    )
+    Membership = Project.members.through
+    members = {project.pk: rng.sample(users, min(args.members_per_project, len(users))) for project in projects}
+    Membership.objects.bulk_create(
+        (Membership(project_id=project_id, user_id=user.pk) for project_id, users_ in members.items()
+         for user in users_), batch_size=5000,
+    )
+    batch = []
+    for _ in range(args.tasks):
+        project = rng.choice(projects)
+        batch.append(Task(project=project, name=phrase(rng, 4), description=phrase(rng, 16),
+                          assigned_to=rng.choice(members[project.pk])))
+        if len(batch) == 10000:
+            Task.objects.bulk_create(batch)
+            batch = []
+    Task.objects.bulk_create(batch)
+    return User.objects.create_superuser(username='search-admin', password=None), users[0]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProjectManagement.settings')
+    django.setup()
+
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from projects.search import get_search_backend
+    from projects.views.api_search_views import SearchView
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        started = time.perf_counter()
+        admin, member = seed(args)
+        print(f'Seeded {args.tasks:,} tasks in {time.perf_counter() - started:.1f}s.')
+        started = time.perf_counter()
+        get_search_backend().rebuild()
+        print(f'Rebuilt the search index in {time.perf_counter() - started:.1f}s.')
+
+        view = SearchView.as_view()
+        factory = APIRequestFactory()
+        print(f"{'user':<8} {'query':<12} {'hits':>5} {'p50':>9} {'p95':>9}")
+        for user_label, user in (('admin', admin), ('member', member)):
+            for label, query in QUERIES.items():
+                timings = []
+                for _ in range(args.repeat):
+                    request = factory.get('/api/search/', {'q': query, 'page_size': args.page_size})
+                    force_authenticate(request, user)
+                    started = time.perf_counter()
+                    response = view(request)
+                    timings.append((time.perf_counter() - started) * 1000)
+                p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+                print(f"{user_label:<8} {label:<12} {len(response.data['results']):>5} "
+                      f"{statistics.median(timings):>7.1f}ms {p95:>7.1f}ms")
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
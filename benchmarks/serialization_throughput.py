@@ -0,0 +1,104 @@
+"""
+Serialization throughput (rows/second) of the list representations.
+
+For each of projects, tasks and users, ``--rows`` rows are seeded into a throwaway test database
+and serialized three ways: the ``ModelSerializer`` over model instances, the ``values()`` fast path
+(``ValuesRepresentation``), and the fast path with a sparse ``--fields`` selection. Query time is
+included, as it is in a list request::
+
+    python -m benchmarks.serialization_throughput --rows 10000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per variant; the best one is reported.')
+    parser.add_argument('--members-per-project', type=int, default=5)
+    parser.add_argument('--fields', default='id,name,progress',
+                        help='Sparse selection for projects and tasks (users get id,username).')
+    return parser.parse_args(argv)
+
+
+def seed(rows, members_per_project):
+    from django.contrib.auth.models import User
+
+    from projects.models import Project, Task
+
+    users = User.objects.bulk_create(User(username=f'user-{i}', email=f'user{i}@example.com') for i in range(rows))
+    projects = Project.objects.bulk_create(
+        Project(name=f'Project {i}', description='Synthetic project', created_by=users[i]) for i in range(rows)
+    )
+    Membership = Project.members.through
+    Membership.objects.bulk_create(
+        Membership(project_id=project.pk, user_id=users[(index + offset) % rows].pk)
+        for index, project in enumerate(projects) for offset in range(members_per_project)
+    )
+    Task.objects.bulk_create(
+        Task(project=projects[i], name=f'Task {i}', description='Synthetic task', assigned_to=users[i])
+        for i in range(rows)
+    )
+
+
+def best_rate(serialize, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = serialize()
+        best = min(best, time.perf_counter() - started)
+        assert len(data) == rows, f'serialized {len(data)} rows, expected {rows}'
+    return rows / best
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProjectManagement.settings')
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from projects.models import Project, Task
+    from projects.serializers.serializers_v1 import (ProjectSerializer, TaskSerializer, UserSerializer,
+                                                     ValuesRepresentation)
+
+    fields = args.fields.split(',')
+    # (list, serializer, rows for the fast path, instances as the viewsets used to load them, sparse fields)
+    cases = [
+        ('projects', ProjectSerializer, Project.objects.order_by('pk'),
+         Project.objects.order_by('pk').prefetch_related('members'), fields),
+        ('tasks', TaskSerializer, Task.objects.order_by('pk'), Task.objects.order_by('pk'), fields),
+        ('users', UserSerializer, User.objects.order_by('pk'), User.objects.order_by('pk'), ['id', 'username']),
+    ]
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        seed(args.rows, args.members_per_project)
+        print(f"{'list':<10} {'ModelSerializer':>16} {'values()':>12} {'values() sparse':>16} {'speedup':>8}")
+        for name, serializer_class, queryset, instances, sparse_fields in cases:
+            full = ValuesRepresentation(serializer_class())
+            sparse = ValuesRepresentation(serializer_class(fields=sparse_fields))
+            model_rate = best_rate(lambda: serializer_class(instances.all(), many=True).data, args.rows, args.repeat)
+            values_rate = best_rate(lambda: full.to_representation(full.values(queryset.all())), args.rows, args.repeat)
+            sparse_rate = best_rate(lambda: sparse.to_representation(sparse.values(queryset.all())), args.rows,
+                                    args.repeat)
+            print(f'{name:<10} {model_rate:>12,.0f}/s {values_rate:>10,.0f}/s {sparse_rate:>14,.0f}/s '
+                  f'{values_rate / model_rate:>7.1f}x')
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Per-request cost of the API token-bucket throttle.
+
+Times ``TokenBucketThrottle.allow_request()`` as ``TaskViewSet`` calls it for every request, against
+the configured ``API_THROTTLE_CACHE`` and, with ``--redis-url`` (and ``redis`` installed), a Redis
+cache, which checks in one round trip. ``GET /api/tasks/{id}/`` is timed alongside for scale::
+
+    python -m benchmarks.throttle_overhead --checks 20000 --redis-url redis://localhost:6379/15
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--checks', type=int, default=20000, help='Throttle checks timed per bucket store.')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests timed for comparison.')
+    parser.add_argument('--clients', type=int, default=100, help='Distinct users the checks rotate through.')
+    parser.add_argument('--redis-url', help='Also time the checks against this Redis server.')
+    return parser.parse_args(argv)
+
+
+def time_checks(throttle, requests, view, count):
+    started = time.perf_counter()
+    for i in range(count):
+        assert throttle.allow_request(requests[i % len(requests)], view)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProjectManagement.settings')
+    django.setup()
+
+    import logging
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+    from rest_framework.request import Request
+    from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+    from projects.models import Project, Task
+    from projects.throttling import TokenBucketThrottle, get_bucket_store
+    from projects.views.api_task_views import TaskViewSet
+
+    logging.disable(logging.WARNING)
+    setup_test_environment()
+    # Budgets no benchmark exhausts: every check takes a token and lets the request through.
+    unlimited = override_settings(API_THROTTLE_RATES={'read': f'{10 ** 9}/s', 'write': f'{10 ** 9}/s'})
+    unlimited.enable()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        users = User.objects.bulk_create(User(username=f'throttle-bench-{i}') for i in range(args.clients))
+        project = Project.objects.create(name='Bench', description='', created_by=users[0])
+        task = Task.objects.create(project=project, name='Task', description='', assigned_to=users[0])
+
+        factory = APIRequestFactory()
+        view = TaskViewSet(throttle_scope='tasks')
+        requests = []
+        for user in users:
+            request = factory.get('/api/tasks/')
+            force_authenticate(request, user)
+            requests.append(Request(request, authenticators=TaskViewSet().get_authenticators()))
+
+        variants = [{}]
+        if args.redis_url:
+            redis_cache = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': args.redis_url}
+            variants.append({'CACHES': {**settings.CACHES, 'throttle': redis_cache}, 'API_THROTTLE_CACHE': 'throttle'})
+        print(f"{'bucket store':<22} {'per request':>12}")
+        for overrides in variants:
+            with override_settings(**overrides):
+                label = type(get_bucket_store()).__name__
+                try:
+                    time_checks(TokenBucketThrottle(), requests, view, min(1000, args.checks))  # warm up
+                    per_check = time_checks(TokenBucketThrottle(), requests, view, args.checks)
+                except ImportError:
+                    # RedisCache imports redis on first use.
+                    print(f'{label:<22} skipped (pip install redis)')
+                    continue
+            print(f'{label:<22} {per_check:>10.1f}us')
+
+        client = APIClient()
+        client.force_authenticate(users[0])
+        timings = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            client.get(f'/api/tasks/{task.pk}/')
+            timings.append((time.perf_counter() - started) * 1e6)
+        print(f"{'GET /api/tasks/{id}/':<22} {statistics.median(timings):>10.1f}us (whole request, p50)")
+    finally:
+        runner.teardown_databases(old_config)
+        unlimited.disable()
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
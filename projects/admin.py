@@ -1,5 +1,39 @@
-from django.contrib import admin
-from .models import Project, Task
+from django.contrib import admin, messages
+from .archive import archive_project, delete_project
+from .models import ArchivedProject, Job, Project, Task
+
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    actions = ['archive_finished']
+
+    def get_deleted_objects(self, objs, request):
+        # The default collects and lists every task, loading a large project whole for the confirmation page.
+        objs = list(objs)
+        perms_needed = set() if request.user.has_perm('projects.delete_task') else {Task._meta.verbose_name}
+        model_count = {
+            Project._meta.verbose_name_plural: len(objs),
+            Task._meta.verbose_name_plural: sum(project.total_tasks for project in objs),
+        }
+        return [str(project) for project in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        delete_project(obj)
+
+    def delete_queryset(self, request, queryset):
+        for project in queryset:
+            delete_project(project)
+
+    @admin.action(description='Archive the selected projects whose tasks are all completed')
+    def archive_finished(self, request, queryset):
+        finished = [
+            project for project in queryset if project.total_tasks and project.completed_tasks == project.total_tasks
+        ]
+        for project in finished:
+            archive_project(project)
+        self.message_user(request, f'Archived {len(finished)} of {len(queryset)} projects.', messages.SUCCESS)
+
 
-admin.site.register(Project)
 admin.site.register(Task)
+admin.site.register(Job)
+admin.site.register(ArchivedProject)
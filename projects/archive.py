@@ -0,0 +1,140 @@
+"""
+Chunked deletion and archival of large projects.
+
+``Project.delete()`` hands the tasks to Django's deletion Collector, which loads every one of them
+into Python (Task has post_delete receivers, so it cannot delete them in bulk) and removes them in
+the same transaction as the project: the write lock, on SQLite the whole database's, is held until
+the last task is gone. ``delete_project()`` removes the tasks with set-based SQL, doing in bulk what
+the per-row receivers would (sync tombstones, search index, rollups). A project of more than
+``DELETE_CHUNK_SIZE`` tasks is emptied of its tasks, then its memberships, that many rows per
+transaction; the project row goes last, through the ORM, once nothing is left under it. An
+interrupted deletion leaves the project with fewer tasks than its counters say until it is run again.
+
+``archive_project()`` does the same after copying each chunk of tasks into ArchivedTask with one
+``INSERT ... SELECT``, so finished projects leave the hot tables and their indexes. Both can be
+interrupted and run again; an unfinished ArchivedProject is picked up where it stopped.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .log import audit
+from .models import ArchivedProject, ArchivedTask, Project, Task, TaskState, Tombstone, tasks_changed
+from .search import get_search_backend
+from .signals import record_project_deletion
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_TASK_COLUMNS = ('name', 'description', 'assigned_to_id', 'completed', 'progress', 'updated_at')
+
+
+def finished_projects(days=None):
+    """Projects with tasks, all of them completed, unchanged for ``days`` (``ARCHIVE_AFTER_DAYS``)."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    open_tasks = Task.objects.filter(project=OuterRef('pk'), completed=False)
+    return Project.objects.filter(
+        total_tasks__gt=0, updated_at__lt=timezone.now() - timedelta(days=days),
+    ).exclude(Exists(open_tasks))
+
+
+def remove_task_chunk(project, archived=None, chunk_size=None):
+    """
+    Delete (and with ``archived``, first copy into it) the project's ``chunk_size`` lowest-id tasks
+    in one transaction; returns how many there were.
+    """
+    chunk_size = chunk_size or settings.DELETE_CHUNK_SIZE
+    connection = connections[router.db_for_write(Task)]
+    with transaction.atomic(using=connection.alias):
+        rows = list(
+            Task.objects.using(connection.alias).filter(project_id=project.pk).order_by('id')
+            .values_list('id', *TaskState._fields)[:chunk_size]
+        )
+        if not rows:
+            return 0
+        # The chunk is every task of the project up to the last id read; new tasks get higher ids.
+        chunk = f'FROM {Task._meta.db_table} WHERE project_id = %s AND id <= %s'
+        params = [project.pk, rows[-1][0]]
+        with connection.cursor() as cursor:
+            if archived is not None:
+                columns = ', '.join(ARCHIVED_TASK_COLUMNS)
+                cursor.execute(
+                    f'INSERT INTO {ArchivedTask._meta.db_table} (original_id, project_id, {columns}) '
+                    f'SELECT id, %s, {columns} {chunk}', [archived.pk, *params],
+                )
+            # The rows Tombstone.record() would write: one for the assignee, one for the superusers.
+            deleted_at = connection.ops.adapt_datetimefield_value(timezone.now())
+            cursor.execute(
+                f'INSERT INTO {Tombstone._meta.db_table} (kind, object_id, user_id, deleted_at) '
+                f'SELECT %s, id, assigned_to_id, %s {chunk} UNION ALL SELECT %s, id, NULL, %s {chunk}',
+                [Tombstone.TASK, deleted_at, *params, Tombstone.TASK, deleted_at, *params],
+            )
+            cursor.execute(f'DELETE {chunk}', params)
+        # What the other post_delete receivers of Task do row by row.
+        states = [(pk, TaskState(*state)) for pk, *state in rows]
+        get_search_backend().remove(Task, [pk for pk, _ in states])
+        tasks_changed.send(sender=Task, changes=[(state, None) for _, state in states])
+    return len(rows)
+
+
+def remove_member_chunk(project, chunk_size=None):
+    chunk_size = chunk_size or settings.DELETE_CHUNK_SIZE
+    Membership = Project.members.through
+    alias = router.db_for_write(Membership)
+    with transaction.atomic(using=alias):
+        user_ids = list(
+            Membership.objects.using(alias).filter(project_id=project.pk).order_by('id')
+            .values_list('user_id', flat=True)[:chunk_size]
+        )
+        # One DELETE per chunk; m2m_changed records the tombstones and invalidates the dashboards.
+        project.members.remove(*user_ids)
+    return len(user_ids)
+
+
+def delete_project(project, chunk_size=None, archived=None):
+    """
+    Delete a project with its tasks and memberships; returns the number of tasks. Projects of more
+    than ``chunk_size`` tasks are emptied a chunk per transaction first, the rest in one transaction.
+    """
+    chunk_size = chunk_size or settings.DELETE_CHUNK_SIZE
+    tasks = 0
+    # Counted rather than read from total_tasks, which lags behind while recounts are deferred.
+    task_count = Task.objects.filter(project_id=project.pk).count()
+    if task_count > chunk_size:
+        while removed := remove_task_chunk(project, archived, chunk_size):
+            tasks += removed
+        # Written while the members are still there to be told; project.delete() finds none left.
+        record_project_deletion(project)
+        project.tombstones_recorded = True
+        while remove_member_chunk(project, chunk_size):
+            pass
+    with transaction.atomic(using=router.db_for_write(Project)):
+        # A small project's tasks, or those added to a large one since its last chunk. Without tasks or
+        # an archive to copy them into, the Collector's delete below is as cheap.
+        if archived is not None or task_count:
+            while removed := remove_task_chunk(project, archived, chunk_size):
+                tasks += removed
+        if archived is not None:
+            archived.archived_at = timezone.now()
+            archived.save(update_fields=['archived_at'])
+        project.delete()
+    return tasks
+
+
+def archive_project(project, chunk_size=None):
+    """Move a project and its tasks into ArchivedProject/ArchivedTask; returns the ArchivedProject."""
+    archived = ArchivedProject.objects.filter(original_id=project.pk, archived_at=None).first()
+    if archived is None:
+        # Recorded before the tasks are moved: the members are removed chunk by chunk too.
+        archived = ArchivedProject.objects.create(
+            original_id=project.pk, name=project.name, description=project.description,
+            created_by_id=project.created_by_id, member_ids=list(project.members.values_list('id', flat=True)),
+            progress=project.progress, total_tasks=project.total_tasks, completed_tasks=project.completed_tasks,
+            updated_at=project.updated_at,
+        )
+    tasks = delete_project(project, chunk_size, archived)
+    audit(logger, 'project.archived', project=archived.original_id, archive=archived.pk, tasks=tasks)
+    return archived
@@ -0,0 +1,29 @@
+"""
+The stock SQLite backend plus ``OPTIONS['transaction_mode']`` (as in Django 5.1).
+
+``atomic`` normally opens a deferred transaction, which takes the write lock only at its first
+write. Under WAL, a transaction that read before another connection committed can then never get
+the lock, and it fails with "database is locked" straight away instead of waiting
+``busy_timeout``. ``'IMMEDIATE'`` takes the write lock at ``BEGIN``, so concurrent writers queue up.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = {'DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode') or 'DEFERRED'
+        if mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode must be one of {', '.join(sorted(TRANSACTION_MODES))}.")
+        return mode.upper()
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,34 @@
+"""
+Job handlers, and the entry points that run progress bookkeeping now or hand it to the queue.
+
+With ``DEFER_PROGRESS_UPDATES`` the recount after bulk task writes and the reactions to changed
+project progress (dashboard invalidation, progress events) leave the request: they are queued per
+project and coalesced, so a burst of task updates costs one recount and one fan-out.
+"""
+from django.conf import settings
+
+from .cache import invalidate_dashboards
+from .events import publish_project_progress
+from .jobs import enqueue_many, register
+from .models import Project
+from .signals import member_ids
+
+
+@register('refresh_task_counters')
+def refresh_task_counters_job(job):
+    Project.refresh_task_counters([int(job.key)])
+
+
+@register('project_progress_changed')
+def project_progress_changed_job(job):
+    project_id = int(job.key)
+    invalidate_dashboards(member_ids([project_id]))
+    publish_project_progress([project_id])
+
+
+def refresh_task_counters(project_ids):
+    """Recount the tasks of ``project_ids`` after writes that bypass ``Task.save()``, or queue the recounts."""
+    if settings.DEFER_PROGRESS_UPDATES:
+        enqueue_many('refresh_task_counters', project_ids)
+    else:
+        Project.refresh_task_counters(project_ids)
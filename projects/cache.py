@@ -0,0 +1,65 @@
+"""
+The cached project list of the dashboard, one fragment per user (superusers share one).
+
+Fragment keys carry a per-user version that ``invalidate_dashboards()`` replaces. A dashboard
+reads the key before it renders and fills that same key, so a render that an invalidation overtook
+fills a key nobody reads any more, instead of overwriting the invalidation with stale projects.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+DASHBOARD_KEY_PREFIX = 'dashboard:projects'
+VERSION_KEY_PREFIX = 'dashboard:version'
+ALL_PROJECTS = 'all'
+HITS_KEY = 'dashboard:stats:hits'
+MISSES_KEY = 'dashboard:stats:misses'
+
+
+def _version_key(owner):
+    return f'{VERSION_KEY_PREFIX}:{owner}'
+
+
+def dashboard_cache_key(user):
+    """The key of ``user``'s fragment at the current version."""
+    # Superusers see every project, so they share one fragment.
+    owner = ALL_PROJECTS if user.is_superuser else user.pk
+    version = cache.get(_version_key(owner))
+    if version is None:
+        # A fresh version rather than a counter from 0, which an evicted version key would repeat.
+        cache.add(_version_key(owner), uuid4().hex, timeout=None)
+        version = cache.get(_version_key(owner))
+    return f'{DASHBOARD_KEY_PREFIX}:{owner}:{version}'
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_dashboard_fragment(key):
+    fragment = cache.get(key)
+    _increment(MISSES_KEY if fragment is None else HITS_KEY)
+    return None if fragment is None else mark_safe(fragment)
+
+
+def set_dashboard_fragment(key, fragment):
+    cache.set(key, str(fragment), timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+
+
+def invalidate_dashboards(user_ids):
+    """Move the given members and the superusers on to new fragment versions."""
+    version = uuid4().hex
+    cache.set_many({_version_key(owner): version for owner in [ALL_PROJECTS, *user_ids]}, timeout=None)
+
+
+def dashboard_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
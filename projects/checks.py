@@ -0,0 +1,45 @@
+"""System checks for settings whose wrong combination fails silently at run time."""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+from .events import InMemoryBroker
+
+
+@register()
+def check_throttle_cache(app_configs, **kwargs):
+    if settings.API_THROTTLE and isinstance(caches[settings.API_THROTTLE_CACHE], FileBasedCache):
+        return [Error(
+            f'API_THROTTLE_CACHE ({settings.API_THROTTLE_CACHE!r}) is a file-based cache: its add() is not '
+            'atomic, so concurrent requests could overdraw the throttle buckets.',
+            hint='Use a Redis, Memcached or database cache, or set API_THROTTLE=False.',
+            id='projects.E001',
+        )]
+    return []
+
+
+@register()
+def check_deferred_progress_updates(app_configs, **kwargs):
+    # The worker invalidates dashboards and publishes progress events for the web processes.
+    if not settings.DEFER_PROGRESS_UPDATES:
+        return []
+    errors = []
+    if isinstance(caches['default'], (LocMemCache, DummyCache)):
+        errors.append(Error(
+            f"DEFER_PROGRESS_UPDATES needs a cache shared with the worker; {type(caches['default']).__name__} "
+            'is per process, so the web processes would keep serving the dashboards it invalidates.',
+            hint='Point CACHE_URL at a Redis, Memcached or database cache, or set DEFER_PROGRESS_UPDATES=False.',
+            id='projects.E002',
+        ))
+    if issubclass(import_string(settings.EVENT_BROKER), InMemoryBroker):
+        errors.append(Error(
+            f'DEFER_PROGRESS_UPDATES needs an EVENT_BROKER shared with the worker; {settings.EVENT_BROKER} '
+            'is per process, so the progress events the worker publishes would reach no stream.',
+            hint='Set EVENT_BROKER to projects.events.RedisBroker, or set DEFER_PROGRESS_UPDATES=False.',
+            id='projects.E003',
+        ))
+    return errors
@@ -0,0 +1,65 @@
+"""
+Database plumbing: SQLite connection tuning and primary/replica read routing.
+
+``ReplicaRoutingMiddleware`` opens a ``RequestRouting`` for every request; ``PrimaryReplicaRouter``
+sends the reads of ``REPLICA_APPS`` models in GET/HEAD requests to the ``replica`` alias until the
+request writes, after which it reads its own writes from the primary. Outside of requests
+(commands, the job worker) everything uses the primary.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+
+# Sessions, users and allauth rows are read to authenticate; a lagging replica would log people out.
+REPLICA_APPS = {'projects'}
+
+_routing = ContextVar('db_routing', default=None)
+
+
+def apply_sqlite_pragmas(connection):
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class RequestRouting:
+    """Routing state of one request; mutable, so writes made in ``sync_to_async`` threads pin it too."""
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+@contextmanager
+def request_routing(use_replica):
+    state = RequestRouting(use_replica)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is not None and state.use_replica and not state.wrote and model._meta.app_label in REPLICA_APPS:
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either can be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
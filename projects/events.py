@@ -0,0 +1,202 @@
+"""
+Publish/subscribe fan-out for live progress events.
+
+Writers publish plain dicts to channels from any thread; every open event stream holds one
+``Subscription`` (an asyncio queue on the server's event loop) and idles until something arrives.
+The broker class is picked by ``settings.EVENT_BROKER``; ``InMemoryBroker`` fans out within one
+process, which covers a single ASGI worker and the test suite. ``RedisBroker`` relays through Redis
+pub/sub, so events published by any process (another ASGI worker, the ``run_worker`` job runner)
+reach the streams of all of them.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .log import audit
+from .models import Project
+
+logger = logging.getLogger(__name__)
+
+# Superusers see every project, so they listen on one channel instead of one per project.
+ALL_PROJECTS_CHANNEL = 'projects'
+
+
+def project_channel(project_id):
+    return f'project:{project_id}'
+
+
+class Subscription:
+    """Events for a set of channels, buffered for one consumer on the loop that subscribed."""
+
+    def __init__(self, broker, channels, maxsize=0):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def deliver(self, message):
+        # A consumer that cannot keep up loses events rather than growing without bound.
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout=None):
+        """Wait for the next event; raises ``asyncio.TimeoutError`` after ``timeout`` seconds."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class Broker:
+    """Interface of the event brokers."""
+
+    def subscribe(self, channels):
+        """Return a ``Subscription`` for ``channels``; must be called from the consuming event loop."""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def publish(self, channel, message):
+        """Hand ``message`` to every subscriber of ``channel``; safe to call from any thread."""
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    def __init__(self, maxsize=None):
+        self.maxsize = settings.EVENT_QUEUE_SIZE if maxsize is None else maxsize
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.maxsize)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's loop is gone (server shut down mid-stream).
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({subscription for subscribers in self._subscriptions.values() for subscription in subscribers})
+
+
+class RedisBroker(Broker):
+    """
+    Publishes to Redis channels under ``channel_prefix``. The process's own subscriptions are kept in
+    an ``InMemoryBroker`` fed by one listener thread, started with the first subscription, so a
+    process that only publishes (the job runner) holds no Redis subscription at all.
+    """
+    channel_prefix = 'events:'
+    # Seconds the listener waits before reading again after losing the connection.
+    retry_delay = 1
+
+    def __init__(self, url=None, maxsize=None, **options):
+        self.client = redis.Redis.from_url(url or settings.EVENT_REDIS_URL, **options)
+        self.local = InMemoryBroker(maxsize)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        with self._lock:
+            if self._listener is None:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(**{f'{self.channel_prefix}*': self._relay})
+                self._listener = pubsub.run_in_thread(
+                    sleep_time=1, daemon=True, exception_handler=self._listener_failed,
+                )
+        return self.local.subscribe(channels)
+
+    def unsubscribe(self, subscription):
+        self.local.unsubscribe(subscription)
+
+    def publish(self, channel, message):
+        self.client.publish(self.channel_prefix + channel, json.dumps(message))
+
+    def subscriber_count(self):
+        return self.local.subscriber_count()
+
+    def close(self):
+        """Stop the listener thread, if one was started."""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+
+    def _relay(self, message):
+        channel = message['channel'].decode()[len(self.channel_prefix):]
+        self.local.publish(channel, json.loads(message['data']))
+
+    def _listener_failed(self, exc, pubsub, thread):
+        # The next read reconnects and subscribes again; events published meanwhile are lost.
+        audit(logger, 'events.listener_failed', logging.WARNING, error=repr(exc))
+        time.sleep(self.retry_delay)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.EVENT_BROKER)()
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    if setting in ('EVENT_BROKER', 'EVENT_QUEUE_SIZE', 'EVENT_REDIS_URL'):
+        get_broker.cache_clear()
+
+
+def publish_project_event(project_id, event, data):
+    message = {'event': event, 'data': data}
+    broker = get_broker()
+    broker.publish(project_channel(project_id), message)
+    broker.publish(ALL_PROJECTS_CHANNEL, message)
+
+
+def publish_project_progress(project_ids):
+    """Publish the current progress and task counters of the given projects."""
+    rows = Project.objects.filter(pk__in=list(project_ids)).values('id', 'progress', 'total_tasks', 'completed_tasks')
+    for row in rows:
+        publish_project_event(row['id'], 'project', row)
+
+
+def publish_task_changes(tasks):
+    for task in tasks:
+        publish_project_event(task.project_id, 'task', {
+            'id': task.pk, 'project': task.project_id, 'progress': task.progress, 'completed': task.completed,
+        })
@@ -1,10 +1,11 @@
 from django import forms
 from .models import Project, Task
 from django.contrib.auth.models import User
+from .widgets import AutocompleteSelect, UserAutocompleteSelect, UserAutocompleteSelectMultiple
 
 
 class ProjectForm(forms.ModelForm):
-    members = forms.ModelMultipleChoiceField(queryset=User.objects.all(), widget=forms.CheckboxSelectMultiple)
+    members = forms.ModelMultipleChoiceField(queryset=User.objects.all(), widget=UserAutocompleteSelectMultiple)
 
     class Meta:
         model = Project
@@ -15,6 +16,8 @@ class TaskForm(forms.ModelForm):
     class Meta:
         model = Task
         fields = ['name', 'description', 'assigned_to', 'project']
+        # Only the selected rows are rendered; the project is fixed by the view that builds the form.
+        widgets = {'assigned_to': UserAutocompleteSelect, 'project': AutocompleteSelect}
 
 
 class UserCreationForm(forms.ModelForm):
@@ -32,4 +35,4 @@ class TaskProgressForm(forms.ModelForm):
 
 
 class AddMemberForm(forms.Form):
-    user = forms.ModelChoiceField(queryset=User.objects.all(), label="Add Member")
\ No newline at end of file
+    user = forms.ModelChoiceField(queryset=User.objects.all(), label="Add Member", widget=UserAutocompleteSelect)
@@ -0,0 +1,265 @@
+"""
+Streaming bulk import of projects, their members and tasks from CSV or NDJSON files.
+
+A projects file has the columns ``ref, name, description, created_by, members``: ``created_by`` and
+``members`` (separated by spaces or commas, or a list in NDJSON) are usernames, and ``ref`` is any
+label unique within the import. A tasks file has ``project`` (a ref from the projects file) or
+``project_id`` (an existing project), and ``name, description, assigned_to, completed, progress``.
+
+Rows are read, validated and written ``batch_size`` at a time, one transaction per batch. Tasks
+are bulk inserted without ``Task.save()``, so each batch adds its rows to the search index and the
+rollups itself; the counters of every touched project are recounted once at the end.
+"""
+import csv
+import json
+import os
+import re
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .background import refresh_task_counters
+from .models import Project, Task, TaskState, tasks_changed
+from .search import get_search_backend
+
+IMPORT_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'', '0', 'false', 'f', 'no', 'n'}
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportAborted(Exception):
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid rows.')
+        self.errors = errors
+
+
+def detect_format(path):
+    return IMPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def read_rows(path, file_format):
+    """Yield ``(line number, row dict)`` from a CSV file with a header row or an NDJSON file."""
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                raise ImportAborted([f'line {line_number}: invalid JSON ({exc})'])
+            if not isinstance(row, dict):
+                raise ImportAborted([f'line {line_number}: expected a JSON object'])
+            yield line_number, row
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class UserLookup:
+    """
+    Username to id, resolved with one query per batch of rows and remembered for the ``size`` most
+    recently used names, so a large import costs neither a query per row nor a map of every user.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._ids = OrderedDict()
+
+    def preload(self, usernames):
+        missing = {username for username in usernames if username and username not in self._ids}
+        if not missing:
+            return
+        found = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        for username in missing:
+            # Unknown names are remembered too (as None), so every row naming them is not a query.
+            self._remember(username, found.get(username))
+
+    def get(self, username):
+        if username not in self._ids:
+            # Evicted by a batch naming more users than the cache holds.
+            self.preload([username])
+        self._ids.move_to_end(username)
+        return self._ids[username]
+
+    def _remember(self, username, user_id):
+        self._ids[username] = user_id
+        self._ids.move_to_end(username)
+        while len(self._ids) > self.size:
+            self._ids.popitem(last=False)
+
+
+def text(row, column, required=False, max_length=None):
+    value = row.get(column)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{column} is required')
+    if max_length is not None and len(value) > max_length:
+        raise RowError(f'{column} is longer than {max_length} characters')
+    return value
+
+
+def usernames(value):
+    if isinstance(value, list):
+        return [str(username).strip() for username in value if str(username).strip()]
+    return [username for username in re.split(r'[\s,;]+', str(value or '')) if username]
+
+
+def boolean(row, column):
+    value = row.get(column)
+    if isinstance(value, bool):
+        return value
+    value = '' if value is None else str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f'{column} must be true or false')
+
+
+def percentage(row, column):
+    value = row.get(column)
+    try:
+        value = int(value) if value not in (None, '') else 0
+    except (TypeError, ValueError):
+        raise RowError(f'{column} must be a whole number')
+    if not 0 <= value <= 100:
+        raise RowError(f'{column} must be between 0 and 100')
+    return value
+
+
+class Importer:
+    def __init__(self, batch_size=1000, user_cache_size=10000, dry_run=False, on_batch=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.on_batch = on_batch
+        self.users = UserLookup(user_cache_size)
+        # Project ref -> id of the created project (None in a dry run).
+        self.project_refs = {}
+        self.touched_project_ids = set()
+        self.counts = Counter()
+        # Invalid rows found in a dry run, which reads on instead of stopping at the first bad batch.
+        self.errors = []
+
+    def user_id(self, username, column):
+        user_id = self.users.get(username)
+        if user_id is None:
+            raise RowError(f'{column} {username!r} does not exist')
+        return user_id
+
+    def import_projects(self, rows):
+        for batch in chunks(rows, self.batch_size):
+            self.users.preload(
+                name for _, row in batch for name in [text(row, 'created_by'), *usernames(row.get('members'))]
+            )
+            projects = self.validate(batch, self.parse_project)
+            if not self.dry_run:
+                self.write_projects(projects)
+            self.counts['projects'] += len(projects)
+            self.counts['memberships'] += sum(len(members) for _, _, members in projects)
+            self.batch_done(len(batch))
+
+    def parse_project(self, row):
+        ref = text(row, 'ref')
+        if ref and ref in self.project_refs:
+            raise RowError(f'ref {ref!r} is used twice')
+        project = Project(
+            name=text(row, 'name', required=True, max_length=255),
+            description=text(row, 'description'),
+            created_by_id=self.user_id(text(row, 'created_by', required=True), 'created_by'),
+        )
+        members = {self.user_id(username, 'members') for username in usernames(row.get('members'))}
+        if ref:
+            self.project_refs[ref] = None
+        return ref, project, members
+
+    def write_projects(self, projects):
+        Membership = Project.members.through
+        with transaction.atomic():
+            created = Project.objects.bulk_create([project for _, project, _ in projects])
+            Membership.objects.bulk_create(
+                Membership(project_id=project.pk, user_id=user_id)
+                for project, (_, _, members) in zip(created, projects) for user_id in members
+            )
+            get_search_backend().index(Project, [project.pk for project in created])
+        for project, (ref, _, _) in zip(created, projects):
+            if ref:
+                self.project_refs[ref] = project.pk
+            # Members' dashboards are invalidated by the recount at the end.
+            self.touched_project_ids.add(project.pk)
+
+    def import_tasks(self, rows):
+        for batch in chunks(rows, self.batch_size):
+            self.users.preload(text(row, 'assigned_to') for _, row in batch)
+            project_ids = {text(row, 'project_id') for _, row in batch}
+            existing = set(Project.objects.filter(pk__in=[int(pk) for pk in project_ids if pk.isdigit()])
+                           .values_list('pk', flat=True))
+            tasks = self.validate(batch, lambda row: self.parse_task(row, existing))
+            if not self.dry_run:
+                with transaction.atomic():
+                    Task.objects.bulk_create(tasks)
+                    get_search_backend().index(Task, [task.pk for task in tasks])
+                    tasks_changed.send(sender=Task, changes=[(None, TaskState.of(task)) for task in tasks])
+                self.touched_project_ids.update(task.project_id for task in tasks)
+            self.counts['tasks'] += len(tasks)
+            self.batch_done(len(batch))
+
+    def parse_task(self, row, existing_project_ids):
+        ref = text(row, 'project')
+        if ref:
+            if ref not in self.project_refs:
+                raise RowError(f'project {ref!r} is not a ref of the imported projects')
+            project_id = self.project_refs[ref]
+        else:
+            try:
+                project_id = int(text(row, 'project_id', required=True))
+            except ValueError:
+                raise RowError('project_id must be a project id')
+            if project_id not in existing_project_ids:
+                raise RowError(f'project_id {project_id} does not exist')
+        return Task(
+            project_id=project_id,
+            name=text(row, 'name', required=True, max_length=255),
+            description=text(row, 'description'),
+            assigned_to_id=self.user_id(text(row, 'assigned_to', required=True), 'assigned_to'),
+            completed=boolean(row, 'completed'),
+            progress=percentage(row, 'progress'),
+        )
+
+    def validate(self, batch, parse):
+        parsed = []
+        errors = []
+        for line_number, row in batch:
+            try:
+                parsed.append(parse(row))
+            except RowError as exc:
+                errors.append(f'line {line_number}: {exc}')
+        if errors and not self.dry_run:
+            raise ImportAborted(errors)
+        self.errors.extend(errors)
+        return parsed
+
+    def batch_done(self, rows):
+        self.counts['rows'] += rows
+        if self.on_batch is not None:
+            self.on_batch(self.counts)
+
+    def finish(self):
+        """Recount the tasks of every project written to, once, in batches."""
+        for project_ids in chunks(sorted(self.touched_project_ids), self.batch_size):
+            refresh_task_counters(project_ids)
+        self.touched_project_ids.clear()
@@ -0,0 +1,145 @@
+"""
+A small database-backed job queue.
+
+Handlers are registered by name with ``@register``. ``enqueue()`` inserts a ``Job`` row inside the
+caller's transaction, so work is queued only if the change that asked for it commits. Jobs with a
+``key`` are coalesced: while one is queued, enqueueing the same name and key again is a no-op, so a
+burst of changes to one project costs a single run. ``manage.py run_worker`` claims due jobs and
+runs them on a thread or process pool; failures are retried with exponential backoff and, after
+``JOB_MAX_ATTEMPTS``, kept as ``failed``.
+"""
+import logging
+import time
+import traceback
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .log import audit
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class Handler(NamedTuple):
+    func: Callable[[Job], None]
+    max_attempts: Optional[int]
+
+
+handlers = {}
+
+
+def register(name, max_attempts=None):
+    """Register the decorated ``func(job)`` as the handler of jobs called ``name``."""
+    def decorator(func):
+        handlers[name] = Handler(func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, payload=None, delay=0):
+    enqueue_many(name, [key], payload, delay)
+
+
+def enqueue_many(name, keys, payload=None, delay=0):
+    """Queue ``name`` once per key in one INSERT; keys that already have a queued job are skipped."""
+    if name not in handlers:
+        raise ValueError(f'No handler registered for job {name!r}.')
+    run_after = timezone.now() + timedelta(seconds=delay)
+    Job.objects.bulk_create(
+        [Job(name=name, key=None if key is None else str(key), payload=payload or {}, run_after=run_after)
+         for key in keys],
+        ignore_conflicts=True,
+    )
+
+
+def claim(worker_id, limit=1):
+    """Mark up to ``limit`` due jobs as running for ``worker_id`` and return their ids."""
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        # The conditional UPDATE is the lock: of several workers racing for a job, one changes the row.
+        if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        ):
+            claimed.append(job_id)
+    return claimed
+
+
+def run_job(job_id):
+    """Run a claimed job: delete it on success, schedule a retry or mark it failed otherwise."""
+    try:
+        job = Job.objects.get(pk=job_id, status=Job.RUNNING)
+    except Job.DoesNotExist:
+        # Requeued as stale in the meantime.
+        return
+    handler = handlers.get(job.name)
+    started = time.perf_counter()
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job {job.name!r}.')
+        # Deleting the job in the handler's transaction makes its database work happen exactly once.
+        with transaction.atomic():
+            handler.func(job)
+            job.delete()
+    except Exception:
+        fail(job, handler, traceback.format_exc())
+    else:
+        audit(logger, 'job.done', job=job_id, name=job.name, key=job.key, attempt=job.attempts,
+              ms=round((time.perf_counter() - started) * 1000, 1))
+
+
+def run_pooled_job(job_id):
+    """``run_job`` for pool workers, which keep a connection per thread or process across jobs."""
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def fail(job, handler, error):
+    max_attempts = (handler and handler.max_attempts) or settings.JOB_MAX_ATTEMPTS
+    if handler is None or job.attempts >= max_attempts:
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, locked_by='', locked_at=None, last_error=error)
+        logger.error('Job %s (%s) failed after %d attempts:\n%s', job.pk, job, job.attempts, error)
+        return
+    delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+    requeue(job.pk, run_after=timezone.now() + timedelta(seconds=delay), last_error=error)
+    logger.warning('Job %s (%s) failed on attempt %d/%d, retrying in %ds:\n%s',
+                   job.pk, job, job.attempts, max_attempts, delay, error)
+
+
+def requeue(job_id, **changes):
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job_id).update(status=Job.QUEUED, locked_by='', locked_at=None, **changes)
+    except IntegrityError:
+        # The same name and key was queued again meanwhile; that job will redo the work.
+        Job.objects.filter(pk=job_id).delete()
+
+
+def requeue_stale():
+    """Requeue jobs running for longer than ``JOB_LOCK_TIMEOUT_SECONDS``, whose worker presumably died."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+    stale = list(Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff).values_list('id', flat=True))
+    for job_id in stale:
+        requeue(job_id)
+    return len(stale)
+
+
+def run_due_jobs(worker_id='inline'):
+    """Run every due job in the calling thread, including ones they enqueue; return how many ran."""
+    count = 0
+    while job_ids := claim(worker_id):
+        run_job(job_ids[0])
+        count += 1
+    return count
@@ -0,0 +1,124 @@
+"""
+Structured, deferred logging for the request path.
+
+``audit(logger, 'project.created', user=..., project=...)`` emits one record whose message is
+only rendered when a handler formats it, and whose fields stay available on ``record.fields``.
+``QueuedStreamHandler`` moves the formatter's layout and the stream I/O onto a background thread;
+the message itself is rendered, and the fields copied, when the record is queued.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class Fields(dict):
+    """Event fields, rendered as ``key=value`` pairs only when the record is formatted."""
+
+    def __str__(self):
+        return ' '.join(f'{key}={value}' for key, value in self.items())
+
+
+def audit(logger, event, level=logging.INFO, **fields):
+    if not logger.isEnabledFor(level):
+        return
+    fields = Fields(fields)
+    logger.log(level, '%s %s', event, fields, extra={'event': event, 'fields': fields}, stacklevel=2)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; audit fields are inlined next to the standard keys."""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room: the base class would raise queue.Full on a full bounded queue, which the
+        # listener is still draining.
+        self.queue.put(self._sentinel)
+
+
+class QueuedStreamHandler(QueueHandler):
+    """
+    Queues records for a ``QueueListener`` thread that formats and writes them with a
+    ``StreamHandler``, so the logging call returns without touching the stream. At most
+    ``queue_size`` records wait; beyond that they are dropped and the count reported once there is
+    room again. A forked child (pre-fork servers) starts a listener of its own.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self.start_listener()
+        atexit.register(self.stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.restart_listener_after_fork)
+
+    def start_listener(self):
+        self.listener = DrainingQueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def stop_listener(self):
+        # QueueListener.stop() is not idempotent; close() and atexit may both get here.
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def restart_listener_after_fork(self):
+        # The parent's thread did not survive the fork, and it may have held the queue's lock: start
+        # afresh. Records still queued belong to the parent, which writes them.
+        if self.listener is None:
+            return
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.dropped = 0
+        self.start_listener()
+
+    def setFormatter(self, fmt):
+        # Only the listener's handler applies the layout; prepare() renders the bare message.
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # The base class renders msg % args (and any traceback) into the message here, on the logging
+        # thread, so the listener never reads objects the caller may have changed since. Audit fields
+        # are copied the same way, as plain values.
+        record = super().prepare(record)
+        fields = getattr(record, 'fields', None)
+        if fields is not None:
+            record.fields = Fields(
+                (key, value if value is None or isinstance(value, (str, int, float, bool)) else str(value))
+                for key, value in fields.items()
+            )
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            self.enqueue(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'{dropped} log records dropped: the log queue was full.',
+            }))
+
+    def close(self):
+        self.stop_listener()
+        self.listener = None
+        self.target.close()
+        super().close()
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...archive import archive_project, finished_projects
+
+
+class Command(BaseCommand):
+    help = ('Move finished projects (every task completed, unchanged for --days) and their tasks into the '
+            'archive tables, a chunk of tasks per transaction. Run it periodically, e.g. nightly from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help='Archive projects unchanged for this many days (default ARCHIVE_AFTER_DAYS).')
+        parser.add_argument('--chunk-size', type=int, default=settings.DELETE_CHUNK_SIZE,
+                            help='Tasks moved per transaction (default DELETE_CHUNK_SIZE).')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived.')
+
+    def handle(self, *args, **options):
+        projects = list(finished_projects(options['days']).order_by('id'))
+        tasks = sum(project.total_tasks for project in projects)
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Would archive {len(projects)} projects and {tasks} tasks.'))
+            return
+        started = time.perf_counter()
+        tasks = sum(archive_project(project, options['chunk_size']).tasks.count() for project in projects)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {len(projects)} projects and {tasks} tasks in {time.perf_counter() - started:.1f}s.'
+        ))
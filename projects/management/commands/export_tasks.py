@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ...exports import EXPORT_FORMATS, TASK_EXPORT_FIELDS, export_lines
+from ...models import Task
+
+
+class Command(BaseCommand):
+    help = 'Stream tasks as CSV or NDJSON with constant memory, optionally scoped to what one user can see.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', dest='file_format')
+        parser.add_argument('--user', help='Only export the tasks visible to this username through the API.')
+        parser.add_argument('--output', help='File to write to (defaults to stdout).')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per database round trip.')
+
+    def handle(self, *args, **options):
+        queryset = Task.objects.all()
+        if options['user']:
+            try:
+                queryset = Task.objects.visible_to(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+        lines = export_lines(queryset, TASK_EXPORT_FIELDS, options['file_format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
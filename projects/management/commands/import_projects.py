@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...imports import ImportAborted, Importer, detect_format, read_rows
+
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = ('Bulk import projects (with their members) and tasks from CSV or NDJSON files in batched '
+            'transactions; see projects/imports.py for the columns.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', help='Projects file: ref, name, description, created_by, members.')
+        parser.add_argument('--tasks', help='Tasks file: project or project_id, name, description, assigned_to, '
+                                            'completed, progress.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], dest='file_format',
+                            help='File format (defaults to the file extension).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and written per transaction.')
+        parser.add_argument('--user-cache-size', type=int, default=10000,
+                            help='Usernames whose ids are kept in memory between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything.')
+
+    def handle(self, *args, **options):
+        sources = [(kind, options[kind]) for kind in ('projects', 'tasks') if options[kind]]
+        if not sources:
+            raise CommandError('Pass --projects and/or --tasks.')
+        formats = {}
+        for kind, path in sources:
+            formats[kind] = options['file_format'] or detect_format(path)
+            if formats[kind] is None:
+                raise CommandError(f'Cannot tell the format of {path}; pass --format.')
+
+        started = time.perf_counter()
+        importer = Importer(
+            batch_size=max(1, options['batch_size']), user_cache_size=max(1, options['user_cache_size']),
+            dry_run=options['dry_run'], on_batch=lambda counts: self.report_batch(counts, started, options),
+        )
+        try:
+            for kind, path in sources:
+                rows = read_rows(path, formats[kind])
+                if kind == 'projects':
+                    importer.import_projects(rows)
+                else:
+                    importer.import_tasks(rows)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ImportAborted as exc:
+            self.report_errors(exc.errors)
+            raise CommandError(f'Import stopped: {exc} Earlier batches were imported: {self.summary(importer)}.')
+        finally:
+            importer.finish()
+
+        elapsed = time.perf_counter() - started
+        rate = importer.counts['rows'] / elapsed if elapsed else 0
+        if importer.errors:
+            self.report_errors(importer.errors)
+            raise CommandError(f'{len(importer.errors)} invalid rows; nothing was written.')
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {self.summary(importer)} in {elapsed:.1f}s ({rate:,.0f} rows/s).'
+        ))
+
+    @staticmethod
+    def summary(importer):
+        counts = importer.counts
+        return f"{counts['projects']} projects, {counts['memberships']} memberships and {counts['tasks']} tasks"
+
+    def report_batch(self, counts, started, options):
+        if options['verbosity'] >= 2:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{counts['rows']} rows read ({counts['rows'] / elapsed:,.0f} rows/s)")
+
+    def report_errors(self, errors):
+        for error in errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(error)
+        if len(errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'... and {len(errors) - MAX_REPORTED_ERRORS} more.')
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than the retention window; clients holding older tokens resync fully.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SYNC_TOMBSTONE_RETENTION_DAYS,
+                            help='Keep tombstones this many days (default SYNC_TOMBSTONE_RETENTION_DAYS).')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many would be deleted.')
+
+    def handle(self, *args, **options):
+        queryset = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=options['days']))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Would delete {queryset.count()} tombstones.'))
+            return
+        deleted, _ = queryset.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones.'))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = ('Repopulate the full-text search index from the projects and tasks tables, e.g. after writes '
+            'that bypassed the signals (raw SQL, queryset.update() of names).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = get_search_backend().rebuild()
+        indexed = ', '.join(f'{count} {kind}s' for kind, count in counts.items()) or 'nothing (no index to build)'
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} in {time.perf_counter() - started:.1f}s.'))
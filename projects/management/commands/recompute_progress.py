@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ...models import Project, task_counters_changed
+
+
+class Command(BaseCommand):
+    help = 'Recount tasks per project and repair drifted total/completed counters and progress.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of projects recounted per aggregate query.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted projects without writing the repaired values.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = repaired = 0
+        queryset = Project.objects.order_by('pk').only('id', 'total_tasks', 'completed_tasks', 'progress', 'updated_at')
+        last_pk = 0
+        while True:
+            projects = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not projects:
+                break
+            last_pk = projects[-1].pk
+            counts = Project.count_tasks([project.pk for project in projects])
+            drifted = []
+            now = timezone.now()
+            for project in projects:
+                total, completed = counts[project.pk]
+                progress = Project.calculate_progress(total, completed)
+                if (project.total_tasks, project.completed_tasks, project.progress) != (total, completed, progress):
+                    project.total_tasks = total
+                    project.completed_tasks = completed
+                    project.progress = progress
+                    project.updated_at = now
+                    drifted.append(project)
+            if drifted and not options['dry_run']:
+                with transaction.atomic():
+                    Project.objects.bulk_update(drifted, ['total_tasks', 'completed_tasks', 'progress', 'updated_at'])
+                    task_counters_changed.send(sender=Project, project_ids=[project.pk for project in drifted])
+            checked += len(projects)
+            repaired += len(drifted)
+        verb = 'would repair' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} projects, {verb} {repaired}.'))
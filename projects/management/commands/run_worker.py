@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ...jobs import claim, requeue_stale, run_pooled_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (progress recounts, dashboard and event fan-out) until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Jobs run at the same time (on SQLite their writes still take turns).')
+        parser.add_argument('--processes', action='store_true',
+                            help='Run jobs in a process pool instead of threads, for CPU-bound handlers.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait before polling again when no job is due.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due instead of polling.')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+
+        if options['processes']:
+            # Fresh interpreters rather than forks, so no child inherits this process's connections.
+            executor = ProcessPoolExecutor(concurrency, mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=django.setup)
+        else:
+            executor = ThreadPoolExecutor(concurrency, thread_name_prefix='job')
+        self.stdout.write(f'Worker {worker_id} running up to {concurrency} jobs at a time.')
+
+        ran = 0
+        in_flight = set()
+        next_stale_check = 0
+        with executor:
+            while not stop.is_set():
+                if time.monotonic() >= next_stale_check:
+                    requeue_stale()
+                    next_stale_check = time.monotonic() + settings.JOB_LOCK_TIMEOUT_SECONDS / 2
+                finished = {future for future in in_flight if future.done()}
+                for future in finished:
+                    future.result()
+                ran += len(finished)
+                in_flight -= finished
+                if len(in_flight) == concurrency:
+                    wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    continue
+                job_ids = claim(worker_id, concurrency - len(in_flight))
+                in_flight.update(executor.submit(run_pooled_job, job_id) for job_id in job_ids)
+                if job_ids:
+                    continue
+                if options['burst'] and not in_flight:
+                    break
+                if in_flight:
+                    wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                else:
+                    stop.wait(options['poll_interval'])
+            # Leaving the executor waits for the jobs still running.
+        connections.close_all()
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} stopped after {ran + len(in_flight)} jobs.'))
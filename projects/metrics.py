@@ -0,0 +1,125 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def sql_shape(sql):
+    """Collapse the parts of a statement that vary between otherwise identical queries."""
+    return _NUMBER.sub('?', _IN_LIST.sub('(...)', sql))
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` callable counting and timing the queries of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration_ms += (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated_shapes(self, minimum, limit=5):
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[sql_shape(sql)] += count
+        return [(shape, count) for shape, count in shapes.most_common(limit) if count >= minimum]
+
+
+# The recorder of the request being handled. Context variables follow a request into the
+# sync_to_async threads the async ORM runs on, which a per-connection wrapper would not.
+active_recorder = ContextVar('active_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper kept on every connection; hands the query to the current request's recorder."""
+    recorder = active_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recording(connection):
+    # First in line, so that connection.execute_wrapper() blocks, which pop the last wrapper, leave it alone.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def recording(recorder):
+    token = active_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        active_recorder.reset(token)
+
+
+class RouteHistogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms, queries, db_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.queries += queries
+        self.db_ms += db_ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def as_dict(self):
+        bounds = [str(bound) for bound in LATENCY_BUCKETS_MS] + ['+Inf']
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3),
+            'max_ms': round(self.max_ms, 3),
+            'mean_queries': round(self.queries / self.count, 2),
+            'mean_db_ms': round(self.db_ms / self.count, 3),
+            'buckets_ms': dict(zip(bounds, self.buckets)),
+        }
+
+
+class RequestMetrics:
+    """Per-process latency histograms keyed by ``"<METHOD> <url name>"``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, elapsed_ms, queries, db_ms):
+        with self._lock:
+            histogram = self._routes.get(route)
+            if histogram is None:
+                histogram = self._routes[route] = RouteHistogram()
+            histogram.observe(elapsed_ms, queries, db_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: histogram.as_dict() for route, histogram in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+request_metrics = RequestMetrics()
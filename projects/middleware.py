@@ -0,0 +1,156 @@
+import logging
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .db import request_routing
+from .metrics import QueryRecorder, install_query_recording, recording, request_metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+accepts_brotli = re.compile(r'\bbr\b').search
+
+
+class RequestMetricsMiddleware:
+    """
+    Times each request and its database work, reports both as ``Server-Timing``, records them in
+    per-route histograms and logs slow requests together with their most repeated SQL shapes.
+
+    Works in both modes so that, under ASGI, async views are awaited on the event loop rather than
+    being pushed into a thread by a sync-only middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, started, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self.recording(recorder):
+            response = await self.get_response(request)
+        return self.finish(request, response, started, recorder)
+
+    @staticmethod
+    def recording(recorder):
+        # Connections opened before the connection_created receiver was registered.
+        for connection in connections.all(initialized_only=True):
+            install_query_recording(connection)
+        return recording(recorder)
+
+    def finish(self, request, response, started, recorder):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        route = self.route(request)
+        request_metrics.observe(route, elapsed_ms, recorder.count, recorder.duration_ms)
+        response['Server-Timing'] = (
+            f'total;dur={elapsed_ms:.1f}, db;dur={recorder.duration_ms:.1f};desc="{recorder.count} queries"'
+        )
+        if elapsed_ms >= settings.SLOW_REQUEST_MS or recorder.count >= settings.SLOW_REQUEST_QUERIES:
+            self.log_slow_request(request, route, elapsed_ms, recorder)
+        return response
+
+    @staticmethod
+    def route(request):
+        match = request.resolver_match
+        if match is None:
+            return f'{request.method} <unresolved>'
+        return f'{request.method} {match.view_name or match.route}'
+
+    @staticmethod
+    def log_slow_request(request, route, elapsed_ms, recorder):
+        repeated = recorder.repeated_shapes(settings.SLOW_REQUEST_REPEATED_QUERIES)
+        logger.warning(
+            'Slow request %s (%s): %.1f ms, %d queries, %.1f ms in the database.%s',
+            request.get_full_path(), route, elapsed_ms, recorder.count, recorder.duration_ms,
+            ''.join(f'\n  {count}x {shape}' for shape, count in repeated),
+        )
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    ``GZipMiddleware`` that answers with Brotli instead when the client accepts it and the
+    ``brotli`` package is installed. Event streams are passed through untouched: a compressor
+    would hold events back until its buffer fills.
+    """
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if (brotli is None or response.streaming or len(response.content) < 200
+                or response.has_header('Content-Encoding')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not accepts_brotli(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+        compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = 'br'
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Same weakening as the gzip path: the bytes now differ between encodings.
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets the reads of GET/HEAD requests go to the read replica (see ``projects.db``). A request that
+    writes sets a short-lived cookie, so its client reads from the primary until the replica has
+    caught up, e.g. on the page a form redirects to.
+    """
+    sync_capable = True
+    async_capable = True
+    pin_cookie = 'db_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_routing(self.use_replica(request)) as routing:
+            response = self.get_response(request)
+        return self.pin(response, routing)
+
+    async def __acall__(self, request):
+        with request_routing(self.use_replica(request)) as routing:
+            response = await self.get_response(request)
+        return self.pin(response, routing)
+
+    def use_replica(self, request):
+        return request.method in ('GET', 'HEAD') and self.pin_cookie not in request.COOKIES
+
+    def pin(self, response, routing):
+        if routing.wrote and settings.REPLICA_PIN_SECONDS:
+            response.set_cookie(self.pin_cookie, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_task_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    projects = Project.objects.annotate(
+        task_total=Count('tasks'),
+        task_completed=Count('tasks', filter=Q(tasks__completed=True)),
+    )
+    updated = []
+    for project in projects.iterator(chunk_size=1000):
+        project.total_tasks = project.task_total
+        project.completed_tasks = project.task_completed
+        project.progress = project.task_completed * 100 // project.task_total if project.task_total else 0
+        updated.append(project)
+    Project.objects.bulk_update(updated, ['total_tasks', 'completed_tasks', 'progress'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_task_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='completed_tasks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_tasks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_task_hot_filter_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    # auth.User is not ours to add Meta.indexes to; these back the prefix search of the user autocomplete.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_username_lower_idx ON auth_user (LOWER(username));',
+            reverse_sql='DROP INDEX auth_user_username_lower_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX auth_user_email_lower_idx;',
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:15
+
+from django.db import migrations
+
+TABLES = {
+    'projects_project_fts': (
+        "SELECT id, name, description, COALESCE((SELECT group_concat('u' || user_id, ' ') "
+        "FROM projects_project_members WHERE project_id = projects_project.id), '') FROM projects_project"
+    ),
+    'projects_task_fts': "SELECT id, name, description, 'u' || assigned_to_id FROM projects_task",
+}
+
+
+def create_search_tables(apps, schema_editor):
+    # Full-text search uses FTS5 on SQLite; other databases go with SimpleSearchBackend.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, select in TABLES.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5(name, description, scope, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(f'INSERT INTO {table} (rowid, name, description, scope) {select}')
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_job_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+BUCKETS = {
+    'progress_0_24': Q(progress__lt=25),
+    'progress_25_49': Q(progress__gte=25, progress__lt=50),
+    'progress_50_74': Q(progress__gte=50, progress__lt=75),
+    'progress_75_100': Q(progress__gte=75),
+}
+
+
+def build_rollups(apps, schema_editor):
+    # The same single grouped aggregate as projects.rollups.rebuild(), over the historical models.
+    Task = apps.get_model('projects', 'Task')
+    users, projects = defaultdict(Counter), defaultdict(Counter)
+    rows = Task.objects.order_by().values('assigned_to_id', 'project_id').annotate(
+        open_tasks=Count('id', filter=Q(completed=False)),
+        completed_tasks=Count('id', filter=Q(completed=True)),
+        **{field: Count('id', filter=bounds) for field, bounds in BUCKETS.items()},
+    )
+    for row in rows.iterator():
+        counts = {field: row[field] for field in ['open_tasks', 'completed_tasks', *BUCKETS]}
+        users[row['assigned_to_id']].update(counts)
+        projects[row['project_id']].update(counts)
+    now = timezone.now()
+    for name, key, totals in (('UserTaskRollup', 'user_id', users), ('ProjectTaskRollup', 'project_id', projects)):
+        model = apps.get_model('projects', name)
+        model.objects.bulk_create(
+            (model(**{key: pk}, **counts, updated_at=now, rebuilt_at=now) for pk, counts in totals.items()),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('projects', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTaskRollup',
+            fields=[
+                ('open_tasks', models.IntegerField(default=0)),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('progress_0_24', models.IntegerField(default=0)),
+                ('progress_25_49', models.IntegerField(default=0)),
+                ('progress_50_74', models.IntegerField(default=0)),
+                ('progress_75_100', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_rollup', serialize=False, to='projects.project')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserTaskRollup',
+            fields=[
+                ('open_tasks', models.IntegerField(default=0)),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('progress_0_24', models.IntegerField(default=0)),
+                ('progress_25_49', models.IntegerField(default=0)),
+                ('progress_50_74', models.IntegerField(default=0)),
+                ('progress_75_100', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_rollup', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 22:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_assignee_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_assignee_completed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_open_assignee_idx',
+        ),
+    ]
@@ -1,5 +1,48 @@
+from typing import NamedTuple
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Sent with ``project_ids`` whenever task counters (and so progress) change outside of Project.save().
+task_counters_changed = Signal()
+# Sent with ``changes``, ``(old, new)`` pairs of ``TaskState`` (``None`` for a created or deleted
+# task), whenever the counted state of tasks changes; bulk writes send it for their tasks themselves.
+tasks_changed = Signal()
+
+
+class TaskState(NamedTuple):
+    """The persisted values of a task that the counters and rollups are derived from."""
+    project_id: int
+    completed: bool
+    assigned_to_id: int
+    progress: int
+
+    @classmethod
+    def of(cls, task):
+        return cls(task.project_id, task.completed, task.assigned_to_id, task.progress)
+
+
+def progress_expression(total, completed):
+    """SQL expression for ``completed * 100 / total``, or 0 when there are no tasks."""
+    return Coalesce(completed * 100 / NullIf(total, Value(0)), Value(0))
+
+
+class ProjectQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        if user.is_superuser:
+            return self.all()
+        return self.filter(members=user)
+
+
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        if user.is_superuser:
+            return self.all()
+        return self.filter(assigned_to=user)
 
 
 class Project(models.Model):
@@ -8,18 +51,92 @@ class Project(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='projects')
     members = models.ManyToManyField(User, related_name='member_projects')
     progress = models.IntegerField(default=0)
+    total_tasks = models.PositiveIntegerField(default=0)
+    completed_tasks = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProjectQuerySet.as_manager()
+
+    # Maintained in SQL as tasks change (adjust_task_counters, refresh_task_counters, update_progress);
+    # a full save() of an instance loaded earlier leaves them out rather than write back stale values.
+    COUNTER_FIELDS = ('total_tasks', 'completed_tasks', 'progress')
 
     def __str__(self):
         return self.name
 
-    def update_progress(self):
-        total_tasks = self.tasks.count()
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def calculate_progress(total_tasks, completed_tasks):
         if total_tasks > 0:
-            completed_tasks = self.tasks.filter(completed=True).count()
-            self.progress = int((completed_tasks / total_tasks) * 100)
-        else:
-            self.progress = 0
-        self.save()
+            return completed_tasks * 100 // total_tasks
+        return 0
+
+    @classmethod
+    def adjust_task_counters(cls, project_id, total=0, completed=0):
+        """Atomically shift the task counters of a project and re-derive its progress in one UPDATE."""
+        if not total and not completed:
+            return
+        new_total = F('total_tasks') + total
+        new_completed = F('completed_tasks') + completed
+        cls.objects.filter(pk=project_id).update(
+            total_tasks=new_total,
+            completed_tasks=new_completed,
+            progress=progress_expression(new_total, new_completed),
+            updated_at=timezone.now(),
+        )
+        task_counters_changed.send(sender=cls, project_ids=[project_id])
+
+    @classmethod
+    def count_tasks(cls, project_ids):
+        """Return ``{project_id: (total, completed)}`` for the given projects using one grouped query."""
+        counts = {project_id: (0, 0) for project_id in project_ids}
+        rows = (
+            Task.objects.filter(project_id__in=project_ids)
+            .order_by()
+            .values('project_id')
+            .annotate(total=Count('id'), completed=Count('id', filter=Q(completed=True)))
+        )
+        for row in rows:
+            counts[row['project_id']] = (row['total'], row['completed'])
+        return counts
+
+    @classmethod
+    def refresh_task_counters(cls, project_ids):
+        """Recount the tasks of several projects at once, e.g. after bulk task writes that bypass Task.save()."""
+        project_ids = list(project_ids)
+        if not project_ids:
+            return
+        # One UPDATE with correlated counts; bulk_update() would build a CASE branch per project.
+        tasks = Task.objects.filter(project=OuterRef('pk')).order_by().values('project')
+        total = Coalesce(Subquery(tasks.annotate(count=Count('id')).values('count')), Value(0))
+        completed = Coalesce(
+            Subquery(tasks.filter(completed=True).annotate(count=Count('id')).values('count')), Value(0),
+        )
+        cls.objects.filter(pk__in=project_ids).update(
+            total_tasks=total,
+            completed_tasks=completed,
+            progress=progress_expression(total, completed),
+            updated_at=timezone.now(),
+        )
+        task_counters_changed.send(sender=cls, project_ids=project_ids)
+
+    def update_progress(self):
+        """Recount the tasks of this project and repair the denormalized counters."""
+        counts = self.tasks.aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(completed=True)),
+        )
+        self.total_tasks = counts['total']
+        self.completed_tasks = counts['completed']
+        self.progress = self.calculate_progress(self.total_tasks, self.completed_tasks)
+        self.save(update_fields=['total_tasks', 'completed_tasks', 'progress', 'updated_at'])
 
 
 class Task(models.Model):
@@ -29,10 +146,225 @@ class Task(models.Model):
     assigned_to = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
     completed = models.BooleanField(default=False)
     progress = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    # Fields whose persisted values drive the project counters.
+    COUNTER_FIELDS = ('project_id', 'completed')
+    # Persisted fields remembered on load (the fields of TaskState): the counter fields, the assignee,
+    # whose change takes the task out of the previous assignee's sync scope, and the progress.
+    TRACKED_FIELDS = COUNTER_FIELDS + ('assigned_to_id', 'progress')
+
+    class Meta:
+        indexes = [
+            # Completed/open task counts per project.
+            models.Index(fields=['project', 'completed'], name='task_project_completed_idx'),
+            # Delta sync walks an assignee's tasks in (updated_at, id) order.
+            models.Index(fields=['assigned_to', 'updated_at', 'id'], name='task_assignee_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_counter_state()
+        return instance
+
+    def _remember_counter_state(self):
+        self._persisted = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def _persisted_counter_state(self):
+        persisted = getattr(self, '_persisted', {})
+        if len(persisted) < len(self.TRACKED_FIELDS):
+            # Loaded with deferred fields; fetch the stored values once.
+            persisted = Task.objects.filter(pk=self.pk).values(*self.TRACKED_FIELDS).first() or {}
+        return persisted
+
+    def persisted_state(self):
+        """The TaskState as last loaded or saved, whatever has been assigned since."""
+        return TaskState(**self._persisted_counter_state())
+
+    def locked_state(self, using=None):
+        """
+        The TaskState as stored now, read under a row lock held until the transaction ends, or None
+        once the row is gone. Counter deltas come from it rather than from the copy loaded earlier:
+        two requests completing the same task must not both count it.
+        """
+        using = using or router.db_for_write(Task, instance=self)
+        row = (
+            Task.objects.using(using).select_for_update().filter(pk=self.pk)
+            .values(*self.TRACKED_FIELDS).first()
+        )
+        return TaskState(**row) if row else None
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.project.update_progress()
+        update_fields = kwargs.get('update_fields')
+        using = kwargs.get('using') or router.db_for_write(Task, instance=self)
+        with transaction.atomic(using=using):
+            old = None if self._state.adding else self.locked_state(using)
+            super().save(*args, **kwargs)
+            if old is None:
+                Project.adjust_task_counters(self.project_id, total=1, completed=int(self.completed))
+                self._remember_counter_state()
+                tasks_changed.send(sender=Task, changes=[(None, TaskState.of(self))])
+                return
+            project_saved = update_fields is None or {'project', 'project_id'} & set(update_fields)
+            completed_saved = update_fields is None or 'completed' in update_fields
+            new_project_id = self.project_id if project_saved else old.project_id
+            new_completed = self.completed if completed_saved else old.completed
+            assignee_saved = update_fields is None or {'assigned_to', 'assigned_to_id'} & set(update_fields)
+            new_assignee_id = self.assigned_to_id if assignee_saved else old.assigned_to_id
+            progress_saved = update_fields is None or 'progress' in update_fields
+            new_progress = self.progress if progress_saved else old.progress
+            if new_project_id != old.project_id:
+                Project.adjust_task_counters(old.project_id, total=-1, completed=-int(old.completed))
+                Project.adjust_task_counters(new_project_id, total=1, completed=int(new_completed))
+            elif new_completed != old.completed:
+                Project.adjust_task_counters(new_project_id, completed=1 if new_completed else -1)
+            if new_assignee_id != old.assigned_to_id:
+                Tombstone.record(Tombstone.TASK, [(self.pk, old.assigned_to_id)], everyone=False)
+            new_state = TaskState(new_project_id, new_completed, new_assignee_id, new_progress)
+            if new_state != old:
+                tasks_changed.send(sender=Task, changes=[(old, new_state)])
+        self._persisted = new_state._asdict()
+
+
+class Tombstone(models.Model):
+    """
+    A deleted project or task, or an ended membership, kept so that delta sync clients can drop
+    their copy. ``user`` is who has to be told; rows without one are the superusers' view.
+    """
+    PROJECT = 'project'
+    TASK = 'task'
+    # ``object_id`` is the project the user was removed from.
+    MEMBERSHIP = 'membership'
+    KIND_CHOICES = [(PROJECT, 'Project'), (TASK, 'Task'), (MEMBERSHIP, 'Membership')]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+    @classmethod
+    def record(cls, kind, entries, everyone=True):
+        """
+        Store tombstones for ``(object_id, user_id)`` pairs in one INSERT. With ``everyone``, each
+        object also gets a user-less row for the superusers, who see every row.
+        """
+        now = timezone.now()
+        rows = {(object_id, user_id) for object_id, user_id in entries}
+        if everyone:
+            rows |= {(object_id, None) for object_id, _ in rows}
+        cls.objects.bulk_create(
+            cls(kind=kind, object_id=object_id, user_id=user_id, deleted_at=now) for object_id, user_id in rows
+        )
+
+
+class Job(models.Model):
+    """
+    A unit of deferred work for ``manage.py run_worker``; see ``projects.jobs``. Successful jobs are
+    deleted, failed ones are kept with their last traceback.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=64)
+    # Jobs with a key are coalesced: at most one per name and key is queued at a time.
+    key = models.CharField(max_length=255, null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=128, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'key'], condition=Q(status='queued'), name='job_queued_key_uniq'),
+        ]
+        indexes = [
+            # Workers poll for due jobs; failed ones stay out of the way.
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return self.name if self.key is None else f'{self.name} {self.key}'
+
+
+class TaskRollup(models.Model):
+    """
+    Task counts of one assignee or project, shifted as tasks change (``projects.rollups``) and
+    recomputed by ``manage.py rebuild_rollups``, so /api/stats/ does not scan Task.
+    """
+    open_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+    # Tasks by progress, open and completed alike.
+    progress_0_24 = models.IntegerField(default=0)
+    progress_25_49 = models.IntegerField(default=0)
+    progress_50_74 = models.IntegerField(default=0)
+    progress_75_100 = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    # When rebuild_rollups last recomputed the row; None until it has.
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+class UserTaskRollup(TaskRollup):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='task_rollup')
+
+
+class ProjectTaskRollup(TaskRollup):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='task_rollup')
+
+
+class ArchivedProject(models.Model):
+    """
+    A finished project moved out of the hot tables by ``manage.py archive_projects`` (see
+    ``projects.archive``), with its tasks as ArchivedTask rows. Ids are the archive's own: SQLite
+    may hand a deleted project's id to a new one. ``archived_at`` is None while the move is unfinished.
+    """
+    original_id = models.PositiveIntegerField(db_index=True)
+    name = models.CharField(max_length=255)
+    description = models.TextField()
+    created_by = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='+')
+    member_ids = models.JSONField(default=list, blank=True)
+    progress = models.IntegerField(default=0)
+    total_tasks = models.PositiveIntegerField(default=0)
+    completed_tasks = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ArchivedTask(models.Model):
+    original_id = models.PositiveIntegerField()
+    project = models.ForeignKey(ArchivedProject, on_delete=models.CASCADE, related_name='tasks')
+    name = models.CharField(max_length=255)
+    description = models.TextField()
+    assigned_to = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='+')
+    completed = models.BooleanField(default=False)
+    progress = models.IntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
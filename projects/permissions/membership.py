@@ -0,0 +1,28 @@
+from ..models import Project
+
+
+class ProjectMembership:
+    """
+    Per-request view of which projects the current user belongs to: each project is probed with one
+    ``EXISTS`` query, whose answer serves every later check of it in the same request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._known = {}
+
+    def is_member(self, project_id):
+        if project_id not in self._known:
+            self._known[project_id] = Project.members.through.objects.filter(
+                user_id=self.user.pk, project_id=project_id,
+            ).exists()
+        return self._known[project_id]
+
+
+def membership_for(request):
+    """The ``ProjectMembership`` of this request, created on first use."""
+    request = getattr(request, '_request', request)  # DRF Request -> HttpRequest
+    membership = getattr(request, '_project_membership', None)
+    if membership is None or membership.user.pk != request.user.pk:
+        membership = request._project_membership = ProjectMembership(request.user)
+    return membership
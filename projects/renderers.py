@@ -0,0 +1,85 @@
+"""
+Faster and more compact API formats, each backed by an optional package.
+
+``orjson`` replaces the stdlib encoder behind ``application/json`` (same document, several times
+faster), ``msgpack`` adds ``application/msgpack`` (``?format=msgpack``). Without the package the
+viewsets simply do not offer that format.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, FormParser, JSONParser, MultiPartParser
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+# DRF's encoder knows the remaining types (Decimal, UUID, lazy strings, querysets, ...); datetimes go
+# through it too, so every format keeps DRF's millisecond ``...Z`` timestamps.
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # Only the stdlib encoder does arbitrary indents; they are asked for by hand, not by clients.
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
+
+def _available(*candidates):
+    return [cls for cls, available in candidates if available]
+
+
+API_RENDERER_CLASSES = _available(
+    (ORJSONRenderer, orjson is not None),
+    (JSONRenderer, orjson is None),
+    (MessagePackRenderer, msgpack is not None),
+    (BrowsableAPIRenderer, True),
+)
+
+API_PARSER_CLASSES = _available(
+    (ORJSONParser, orjson is not None),
+    (JSONParser, orjson is None),
+    (MessagePackParser, msgpack is not None),
+    (FormParser, True),
+    (MultiPartParser, True),
+)
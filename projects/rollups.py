@@ -0,0 +1,142 @@
+"""
+Per-assignee and per-project task rollups behind /api/stats/.
+
+Every ``tasks_changed`` signal is folded into one delta per affected row (a reassigned task moves a
+count between two users, a completed one from ``open_tasks`` to ``completed_tasks``), and the
+deltas are added in place, with one upsert per model on SQLite and PostgreSQL however many rows a
+bulk write touches. ``rebuild()`` recomputes every row from one grouped aggregate over Task, for
+``manage.py rebuild_rollups`` to reconcile the drift left by writes that bypass the signal (raw
+SQL, ``queryset.update()``).
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import ProjectTaskRollup, Task, UserTaskRollup
+
+# (field, lowest progress counted, lowest progress of the next bucket); the ends are open.
+PROGRESS_BUCKETS = [
+    ('progress_0_24', None, 25),
+    ('progress_25_49', 25, 50),
+    ('progress_50_74', 50, 75),
+    ('progress_75_100', 75, None),
+]
+COUNT_FIELDS = ['open_tasks', 'completed_tasks', *(field for field, _, _ in PROGRESS_BUCKETS)]
+
+# Rows per upsert statement, below SQLite's bound-parameter limit.
+SHIFT_CHUNK_SIZE = 500
+
+
+def progress_bucket(progress):
+    return next(
+        field for field, lowest, below in PROGRESS_BUCKETS
+        if (lowest is None or progress >= lowest) and (below is None or progress < below)
+    )
+
+
+def state_counts(state):
+    return {'completed_tasks' if state.completed else 'open_tasks': 1, progress_bucket(state.progress): 1}
+
+
+def apply_task_changes(changes):
+    """Shift the rollups of every user and project touched by ``(old, new)`` TaskState pairs."""
+    deltas = {UserTaskRollup: defaultdict(Counter), ProjectTaskRollup: defaultdict(Counter)}
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            for field, count in state_counts(state).items():
+                deltas[UserTaskRollup][state.assigned_to_id][field] += sign * count
+                deltas[ProjectTaskRollup][state.project_id][field] += sign * count
+    for model, rows in deltas.items():
+        shift(model, rows)
+
+
+def shift(model, deltas):
+    """Add ``{pk: {field: count}}`` to the rollup rows of ``model``, creating the missing ones."""
+    deltas = {pk: delta for pk, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+    now = timezone.now()
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        for pk, delta in deltas.items():
+            shift_row(model, pk, delta, now)
+        return
+    # One upsert per chunk however many rows change: INSERT ... ON CONFLICT DO UPDATE SET x = x + n.
+    table = connection.ops.quote_name(model._meta.db_table)
+    key = model._meta.pk.column
+    columns = [key, *COUNT_FIELDS, 'updated_at']
+    assignments = [f'{field} = {table}.{field} + excluded.{field}' for field in COUNT_FIELDS]
+    updated_at = connection.ops.adapt_datetimefield_value(now)
+    with connection.cursor() as cursor:
+        items = list(deltas.items())
+        for start in range(0, len(items), SHIFT_CHUNK_SIZE):
+            chunk = items[start:start + SHIFT_CHUNK_SIZE]
+            values = ', '.join(['(%s)' % ', '.join(['%s'] * len(columns))] * len(chunk))
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) VALUES {values} '
+                f'ON CONFLICT ({key}) DO UPDATE SET {", ".join(assignments)}, updated_at = excluded.updated_at',
+                [param for pk, delta in chunk for param in (pk, *(delta[field] for field in COUNT_FIELDS), updated_at)],
+            )
+
+
+def shift_row(model, pk, delta, now):
+    changes = {field: F(field) + count for field, count in delta.items() if count}
+    rows = model.objects.filter(pk=pk)
+    if rows.update(**changes, updated_at=now):
+        return
+    try:
+        # The first change since the last rebuild of a new user or project.
+        with transaction.atomic(using=rows.db):
+            model.objects.create(**{model._meta.pk.attname: pk}, **delta, updated_at=now)
+    except IntegrityError:
+        # Created concurrently.
+        rows.update(**changes, updated_at=now)
+
+
+def remove_project_tasks(project):
+    """Take the tasks of a project being deleted off their assignees; its own rollup goes with it."""
+    rows = grouped_counts(Task.objects.filter(project=project), 'assigned_to_id')
+    shift(UserTaskRollup, {row['assigned_to_id']: Counter({field: -row[field] for field in COUNT_FIELDS})
+                           for row in rows})
+
+
+def grouped_counts(queryset, *fields):
+    """Rows of ``fields`` plus every count field, from one grouped aggregate over ``queryset``."""
+    buckets = {}
+    for field, lowest, below in PROGRESS_BUCKETS:
+        bounds = Q()
+        if lowest is not None:
+            bounds &= Q(progress__gte=lowest)
+        if below is not None:
+            bounds &= Q(progress__lt=below)
+        buckets[field] = Count('id', filter=bounds)
+    return queryset.order_by().values(*fields).annotate(
+        open_tasks=Count('id', filter=Q(completed=False)),
+        completed_tasks=Count('id', filter=Q(completed=True)),
+        **buckets,
+    )
+
+
+def rebuild():
+    """Recompute every rollup from one pass over Task; returns the number of user and project rows."""
+    users, projects = defaultdict(Counter), defaultdict(Counter)
+    now = timezone.now()
+    # Counted inside the transaction, which on SQLite holds the write lock: no task changes meanwhile.
+    with transaction.atomic():
+        # Grouped by assignee and project, so one query yields both sides.
+        for row in grouped_counts(Task.objects.all(), 'assigned_to_id', 'project_id').iterator():
+            counts = {field: row[field] for field in COUNT_FIELDS}
+            users[row['assigned_to_id']].update(counts)
+            projects[row['project_id']].update(counts)
+        for model, rows in ((UserTaskRollup, users), (ProjectTaskRollup, projects)):
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                (model(**{model._meta.pk.attname: pk}, **counts, updated_at=now, rebuilt_at=now)
+                 for pk, counts in rows.items()),
+                batch_size=1000,
+            )
+    return len(users), len(projects)
@@ -0,0 +1,187 @@
+"""
+Full-text search over the names and descriptions of projects and tasks.
+
+The backend class is picked by ``settings.SEARCH_BACKEND``. ``SQLiteFTSBackend`` keeps an FTS5 table
+per model (created by migration 0010) that signals update as rows are saved and deleted; bulk
+writes index their rows explicitly, and ``rebuild_search_index`` repopulates the tables from
+scratch. ``SimpleSearchBackend`` needs no index and scans with ``icontains``, for databases without
+FTS5. Both only return rows the user may see through the API (``visible_to``).
+"""
+import re
+from functools import lru_cache
+from heapq import merge
+from itertools import islice
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Project, Task
+
+SEARCH_KINDS = {'project': Project, 'task': Task}
+
+# Words of a query beyond this are ignored; every word narrows the match.
+MAX_QUERY_TERMS = 8
+
+# Ids per statement when (re)indexing or removing rows, below SQLite's bound-parameter limit.
+INDEX_CHUNK_SIZE = 500
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    # Lower is better, so hits from several kinds sort together.
+    rank: float
+
+
+def query_terms(query):
+    """
+    The words of a search string; empty if there is nothing to search. A word keeps a trailing
+    ``*`` to match as a prefix: prefix queries read more of the index, so they are opt-in.
+    """
+    return re.findall(r'\w+\*?', query or '')[:MAX_QUERY_TERMS]
+
+
+class SearchBackend:
+    """Interface of the search backends."""
+
+    def index(self, model, pks):
+        """Add or refresh the rows ``pks`` of ``model`` (``Project`` or ``Task``) in the index."""
+        raise NotImplementedError
+
+    def remove(self, model, pks):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Repopulate the whole index; returns the number of rows indexed per kind."""
+        raise NotImplementedError
+
+    def search(self, user, terms, kinds, offset, limit):
+        """Best ``SearchHit``s matching every word of ``terms`` among ``kinds`` visible to ``user``."""
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(SearchBackend):
+    """Case-insensitive substring scan of the model tables, newest first; nothing to keep in sync."""
+
+    def index(self, model, pks):
+        pass
+
+    def remove(self, model, pks):
+        pass
+
+    def rebuild(self):
+        return {}
+
+    def search(self, user, terms, kinds, offset, limit):
+        hits = []
+        for kind in kinds:
+            queryset = SEARCH_KINDS[kind].objects.visible_to(user)
+            for term in terms:
+                term = term.rstrip('*')
+                queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+            ids = queryset.order_by('-id').values_list('id', flat=True)[:offset + limit]
+            hits.append([SearchHit(kind, pk, -pk) for pk in ids])
+        return list(islice(merge(*hits, key=lambda hit: hit.rank), offset, offset + limit))
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    SQLite FTS5 tables holding ``name``, ``description`` and a ``scope`` column of ``u<user id>``
+    tokens naming who can see the row. Matching the scope token lets FTS5 intersect posting lists
+    instead of ranking every hit of a common word before dropping the invisible ones; the join on
+    the model tables still decides visibility, so a stale scope can only hide a row, never show one.
+    """
+    tables = {Project: 'projects_project_fts', Task: 'projects_task_fts'}
+    # bm25 weights of name, description and scope: a hit in the name counts for ten in the description.
+    weights = '10.0, 1.0, 0.0'
+
+    def scope_sql(self, model):
+        if model is Project:
+            through = Project.members.through._meta.db_table
+            return (f"COALESCE((SELECT group_concat('u' || user_id, ' ') FROM {through} "
+                    f"WHERE project_id = {Project._meta.db_table}.id), '')")
+        return "'u' || assigned_to_id"
+
+    def populate_sql(self, model):
+        return (f'INSERT INTO {self.tables[model]} (rowid, name, description, scope) '
+                f'SELECT id, name, description, {self.scope_sql(model)} FROM {model._meta.db_table}')
+
+    def index(self, model, pks):
+        connection = connections[router.db_for_write(model)]
+        # Within a model save, its transaction covers the pair of statements; a savepoint would only add two more.
+        with transaction.atomic(using=connection.alias, savepoint=False), connection.cursor() as cursor:
+            for chunk in self.chunks(pks):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {self.tables[model]} WHERE rowid IN ({placeholders})', chunk)
+                cursor.execute(f'{self.populate_sql(model)} WHERE id IN ({placeholders})', chunk)
+
+    def remove(self, model, pks):
+        connection = connections[router.db_for_write(model)]
+        with connection.cursor() as cursor:
+            for chunk in self.chunks(pks):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {self.tables[model]} WHERE rowid IN ({placeholders})', chunk)
+
+    def rebuild(self):
+        counts = {}
+        for kind, model in SEARCH_KINDS.items():
+            table = self.tables[model]
+            connection = connections[router.db_for_write(model)]
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {table}')
+                cursor.execute(self.populate_sql(model))
+                counts[kind] = cursor.rowcount
+                # Merge the index b-trees written by the bulk insert into one.
+                cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+        return counts
+
+    def search(self, user, terms, kinds, offset, limit):
+        match = '{name description} : (%s)' % ' '.join(
+            f'"{term[:-1]}"*' if term.endswith('*') else f'"{term}"' for term in terms
+        )
+        if not user.is_superuser:
+            match += f' AND scope : "u{user.pk}"'
+        hits = [self.search_kind(kind, user, match, offset + limit) for kind in kinds]
+        return list(islice(merge(*hits, key=lambda hit: hit.rank), offset, offset + limit))
+
+    def search_kind(self, kind, user, match, limit):
+        model = SEARCH_KINDS[kind]
+        table = self.tables[model]
+        join, params = '', []
+        if not user.is_superuser:
+            # The same rules as Project/Task.objects.visible_to().
+            if model is Project:
+                join = (f'JOIN {Project.members.through._meta.db_table} AS member '
+                        f'ON member.project_id = {table}.rowid AND member.user_id = %s')
+            else:
+                join = f'JOIN {Task._meta.db_table} AS task ON task.id = {table}.rowid AND task.assigned_to_id = %s'
+            params.append(user.pk)
+        # bm25 ranks the newest SEARCH_MAX_CANDIDATES matches only: reading matches in rowid order is
+        # cheap, scoring them is not. FTS5 only accepts the table's own name, not an alias, here.
+        sql = (f'SELECT * FROM (SELECT {table}.rowid, bm25({table}, {self.weights}) AS rank FROM {table} {join} '
+               f'WHERE {table} MATCH %s ORDER BY {table}.rowid DESC LIMIT %s) ORDER BY rank LIMIT %s')
+        with connections[router.db_for_read(model)].cursor() as cursor:
+            cursor.execute(sql, [*params, match, settings.SEARCH_MAX_CANDIDATES, limit])
+            return [SearchHit(kind, pk, rank) for pk, rank in cursor.fetchall()]
+
+    @staticmethod
+    def chunks(pks):
+        pks = list(pks)
+        for start in range(0, len(pks), INDEX_CHUNK_SIZE):
+            yield pks[start:start + INDEX_CHUNK_SIZE]
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+@receiver(setting_changed)
+def reset_search_backend(setting, **kwargs):
+    if setting == 'SEARCH_BACKEND':
+        get_search_backend.cache_clear()
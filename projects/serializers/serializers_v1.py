@@ -1,21 +1,151 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from ..models import Project, Task
+from ..background import refresh_task_counters
+from ..models import Project, Task, TaskState, tasks_changed
+from ..search import get_search_backend
 
 
-class UserSerializer(serializers.ModelSerializer):
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolves ids from objects preloaded by a list serializer, falling back to a single lookup."""
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is not None and not isinstance(data, bool):
+            try:
+                return preloaded[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class PreloadingListSerializer(serializers.ListSerializer):
+    """Loads the related objects referenced by every item with one query per field before validating."""
+    preload_fields = ()
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and (self.max_length is None or len(data) <= self.max_length):
+            self._context['preloaded'] = {
+                name: self.child.fields[name].get_queryset().in_bulk(self._collect_ids(data, name))
+                for name in self.preload_fields
+            }
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def _collect_ids(data, name):
+        ids = set()
+        for item in data:
+            try:
+                ids.add(int(item[name]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return ids
+
+
+class TaskListSerializer(PreloadingListSerializer):
+    preload_fields = ('project', 'assigned_to')
+
+    def create(self, validated_data):
+        tasks = Task.objects.bulk_create([Task(**item) for item in validated_data])
+        refresh_task_counters({task.project_id for task in tasks})
+        get_search_backend().index(Task, [task.pk for task in tasks])
+        tasks_changed.send(sender=Task, changes=[(None, TaskState.of(task)) for task in tasks])
+        return tasks
+
+
+class SparseFieldsetMixin:
+    """Accepts ``fields=[...]`` to drop every other field from the representation."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ValuesRepresentation:
+    """
+    Read-only fast path for a model serializer: renders its representation from ``values()`` rows
+    instead of model instances. Plain columns are copied as they come from the database, foreign keys
+    as their ``*_id`` column, many-to-many fields are filled in with one query over the through table;
+    only fields needing formatting (e.g. datetimes) go through their serializer field.
+    """
+    PASS_THROUGH = (
+        serializers.BooleanField, serializers.CharField, serializers.IntegerField,
+        serializers.PrimaryKeyRelatedField, serializers.ReadOnlyField,
+    )
+
+    def __init__(self, serializer):
+        opts = serializer.Meta.model._meta
+        self.pk_column = opts.pk.attname
+        self.columns = {}
+        self.converters = {}
+        self.many_to_many = {}
+        self.names = list(serializer.fields)
+        for name, field in serializer.fields.items():
+            model_field = opts.get_field(field.source)
+            if isinstance(field, serializers.ManyRelatedField):
+                self.many_to_many[name] = model_field
+                continue
+            self.columns[name] = model_field.attname
+            if not isinstance(field, self.PASS_THROUGH):
+                self.converters[name] = field.to_representation
+
+    def values(self, queryset):
+        """The queryset of rows this representation reads, always including the primary key."""
+        return queryset.prefetch_related(None).values(*{self.pk_column, *self.columns.values()})
+
+    def to_representation(self, rows):
+        related = {name: self.related_ids(field, rows) for name, field in self.many_to_many.items()}
+        data = []
+        for row in rows:
+            item = {}
+            for name in self.names:
+                if name in related:
+                    item[name] = related[name].get(row[self.pk_column], [])
+                    continue
+                value = row[self.columns[name]]
+                converter = self.converters.get(name)
+                item[name] = converter(value) if converter is not None and value is not None else value
+            data.append(item)
+        return data
+
+    def related_ids(self, field, rows):
+        source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+        links = field.remote_field.through.objects.filter(
+            **{f'{source}__in': [row[self.pk_column] for row in rows]}
+        ).order_by('pk').values_list(source, target)
+        related = {}
+        for owner_id, related_id in links:
+            related.setdefault(owner_id, []).append(related_id)
+        return related
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined']
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = ['id', 'name', 'description', 'created_by', 'members', 'progress']
+        # Derived from the tasks; Project.save() does not write it.
+        read_only_fields = ['progress']
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     class Meta:
         model = Task
         fields = ['id', 'name', 'description', 'assigned_to', 'project', 'completed', 'progress']
+        list_serializer_class = TaskListSerializer
+
+
+class TaskProgressSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = Task
+        fields = ['id', 'progress', 'completed']
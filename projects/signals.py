@@ -0,0 +1,224 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_dashboards
+from .db import apply_sqlite_pragmas
+from .events import publish_project_progress, publish_task_changes
+from .jobs import enqueue_many
+from .metrics import install_query_recording
+from .models import Project, Task, Tombstone, task_counters_changed, tasks_changed
+from .rollups import apply_task_changes, remove_project_tasks
+from .search import get_search_backend
+
+DASHBOARD_FIELDS = {'name', 'progress'}
+TASK_EVENT_FIELDS = {'progress', 'completed', 'project', 'project_id'}
+PROJECT_SEARCH_FIELDS = {'name', 'description'}
+TASK_SEARCH_FIELDS = {'name', 'description', 'assigned_to', 'assigned_to_id'}
+
+
+def member_ids(project_ids):
+    return list(
+        Project.members.through.objects.filter(project_id__in=project_ids).values_list('user_id', flat=True)
+    )
+
+
+def invalidate_dashboards_on_commit(user_ids):
+    transaction.on_commit(lambda: invalidate_dashboards(user_ids))
+
+
+def deleted_with_project(origin):
+    return isinstance(origin, Project) or (isinstance(origin, QuerySet) and origin.model is Project)
+
+
+@receiver(connection_created)
+def record_request_queries(sender, connection, **kwargs):
+    install_query_recording(connection)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_sqlite_pragmas(connection)
+
+
+@receiver(pre_delete, sender=Task)
+def lock_deleted_task(sender, instance, using, origin=None, **kwargs):
+    # The counters and rollups lose what the row holds, not what was loaded before a concurrent
+    # save; None when a concurrent delete got there first and there is nothing left to take off.
+    if not deleted_with_project(origin):
+        instance._deleted_state = instance.locked_state(using)
+
+
+@receiver(post_delete, sender=Task)
+def decrement_project_counters(sender, instance, origin=None, **kwargs):
+    # Tasks removed as part of deleting their own project need no bookkeeping.
+    if deleted_with_project(origin) or instance._deleted_state is None:
+        return
+    state = instance._deleted_state
+    Project.adjust_task_counters(state.project_id, total=-1, completed=-int(state.completed))
+
+
+@receiver(task_counters_changed, sender=Project)
+def invalidate_dashboards_on_progress(sender, project_ids, **kwargs):
+    if not settings.DEFER_PROGRESS_UPDATES:
+        invalidate_dashboards_on_commit(member_ids(project_ids))
+
+
+@receiver(task_counters_changed, sender=Project)
+def defer_progress_updates(sender, project_ids, **kwargs):
+    # The project_progress_changed job invalidates the dashboards and publishes the progress instead.
+    if settings.DEFER_PROGRESS_UPDATES:
+        enqueue_many('project_progress_changed', project_ids, delay=settings.PROGRESS_DEBOUNCE_SECONDS)
+
+
+@receiver(post_save, sender=Project)
+def invalidate_dashboards_on_project_save(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        # Members are attached afterwards and handled by m2m_changed; only the superuser view changes.
+        invalidate_dashboards_on_commit([])
+    elif update_fields is None or DASHBOARD_FIELDS & set(update_fields):
+        invalidate_dashboards_on_commit(member_ids([instance.pk]))
+
+
+@receiver(pre_delete, sender=Project)
+def invalidate_dashboards_on_project_delete(sender, instance, **kwargs):
+    # Membership rows are gone by post_delete, so collect the members up front.
+    invalidate_dashboards_on_commit(member_ids([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def invalidate_dashboards_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.member_projects.add()/remove()/clear(): only that user's dashboard changes.
+        invalidate_dashboards_on_commit([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_dashboards_on_commit(member_ids([instance.pk]))
+    else:
+        invalidate_dashboards_on_commit(pk_set)
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def touch_projects_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # The member list is part of the project representation, so it counts as a modification.
+    if reverse:
+        if action in ('post_add', 'post_remove'):
+            Project.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+        elif action == 'pre_clear':
+            Project.objects.filter(members=instance).update(updated_at=timezone.now())
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        Project.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+
+
+@receiver(task_counters_changed, sender=Project)
+def publish_progress_on_counter_change(sender, project_ids, **kwargs):
+    if settings.DEFER_PROGRESS_UPDATES:
+        return
+    project_ids = list(project_ids)
+    transaction.on_commit(lambda: publish_project_progress(project_ids))
+
+
+@receiver(post_save, sender=Project)
+def publish_progress_on_project_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'progress' in update_fields):
+        transaction.on_commit(lambda: publish_project_progress([instance.pk]))
+
+
+@receiver(post_save, sender=Task)
+def publish_task_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or TASK_EVENT_FIELDS & set(update_fields):
+        transaction.on_commit(lambda: publish_task_changes([instance]))
+
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, origin=None, **kwargs):
+    # Tasks of a deleted project are recorded in bulk by record_project_tombstones.
+    if not deleted_with_project(origin):
+        Tombstone.record(Tombstone.TASK, [(instance.pk, instance.assigned_to_id)])
+
+
+def record_project_deletion(project):
+    """The PROJECT tombstones of ``project``: one per member, and the superusers' row even without members."""
+    user_ids = [None, *member_ids([project.pk])]
+    Tombstone.record(Tombstone.PROJECT, [(project.pk, user_id) for user_id in user_ids], everyone=False)
+
+
+@receiver(pre_delete, sender=Project)
+def record_project_tombstones(sender, instance, **kwargs):
+    # delete_project() records a large project's before it removes the members chunk by chunk.
+    if not getattr(instance, 'tombstones_recorded', False):
+        record_project_deletion(instance)
+    Tombstone.record(Tombstone.TASK, instance.tasks.values_list('id', 'assigned_to_id'))
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def record_membership_tombstones(sender, instance, action, reverse, pk_set, **kwargs):
+    # The project drops out of the removed users' sync scope; remaining members see it change.
+    if action not in ('post_remove', 'pre_clear'):
+        return
+    if reverse:
+        project_ids = pk_set if action == 'post_remove' else instance.member_projects.values_list('id', flat=True)
+        pairs = [(project_id, instance.pk) for project_id in project_ids]
+    else:
+        user_ids = pk_set if action == 'post_remove' else member_ids([instance.pk])
+        pairs = [(instance.pk, user_id) for user_id in user_ids]
+    Tombstone.record(Tombstone.MEMBERSHIP, pairs, everyone=False)
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or PROJECT_SEARCH_FIELDS & set(update_fields):
+        get_search_backend().index(Project, [instance.pk])
+
+
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or TASK_SEARCH_FIELDS & set(update_fields):
+        get_search_backend().index(Task, [instance.pk])
+
+
+@receiver(pre_delete, sender=Project)
+def unindex_project(sender, instance, **kwargs):
+    backend = get_search_backend()
+    backend.remove(Project, [instance.pk])
+    backend.remove(Task, instance.tasks.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def unindex_task(sender, instance, origin=None, **kwargs):
+    # Tasks of a deleted project are removed in bulk by unindex_project.
+    if not deleted_with_project(origin):
+        get_search_backend().remove(Task, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def reindex_project_scope(sender, instance, action, reverse, pk_set, **kwargs):
+    # The members are the project's search scope. user.member_projects.clear() leaves the user in
+    # the scope of those projects, which the membership check at search time makes harmless.
+    if reverse and action in ('post_add', 'post_remove'):
+        get_search_backend().index(Project, pk_set)
+    elif not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        get_search_backend().index(Project, [instance.pk])
+
+
+@receiver(tasks_changed, sender=Task)
+def shift_rollups(sender, changes, **kwargs):
+    apply_task_changes(changes)
+
+
+@receiver(post_delete, sender=Task)
+def announce_task_deletion(sender, instance, origin=None, **kwargs):
+    # The rollups of a deleted project's tasks are taken off in bulk by remove_rollups_of_project.
+    if not deleted_with_project(origin) and instance._deleted_state is not None:
+        tasks_changed.send(sender=Task, changes=[(instance._deleted_state, None)])
+
+
+@receiver(pre_delete, sender=Project)
+def remove_rollups_of_project(sender, instance, **kwargs):
+    remove_project_tasks(instance)
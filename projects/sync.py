@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+
+# Each stream is read with its own keyset cursor ``(timestamp, id)``; a sync token carries all three.
+SYNC_STREAMS = {
+    'projects': 'updated_at',
+    'tasks': 'updated_at',
+    'deleted': 'deleted_at',
+}
+
+EPOCH = datetime.min.replace(tzinfo=dt_timezone.utc)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def initial_cursors(now):
+    """Cursors of a first sync: every live row, but no tombstones of rows the client never had."""
+    cursors = {name: (EPOCH, 0) for name in SYNC_STREAMS}
+    cursors['deleted'] = (now, 0)
+    return cursors
+
+
+def encode_token(cursors):
+    payload = {name: [timestamp.isoformat(), pk] for name, (timestamp, pk) in cursors.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        cursors = {
+            name: (datetime.fromisoformat(payload[name][0]), int(payload[name][1]))
+            for name in SYNC_STREAMS
+        }
+    except (binascii.Error, ValueError, TypeError, KeyError, IndexError) as exc:
+        raise InvalidSyncToken('Invalid sync token.') from exc
+    if any(timestamp.tzinfo is None for timestamp, _ in cursors.values()):
+        raise InvalidSyncToken('Invalid sync token.')
+    return cursors
+
+
+def token_expired(cursors, now):
+    """Tombstones older than the retention window may have been pruned; such tokens need a full sync."""
+    return cursors['deleted'][0] < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def read_stream(queryset, field, cursor, limit):
+    """Return up to ``limit`` rows past ``cursor`` in ``(field, pk)`` order and whether more remain."""
+    timestamp, pk = cursor
+    rows = list(
+        queryset.filter(Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': pk}))
+        .order_by(field, 'pk')[:limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def advance(cursor, field, rows, has_more, now):
+    """The cursor to resume from after reading ``rows``."""
+    if has_more:
+        return (getattr(rows[-1], field), rows[-1].pk)
+    # Read to the end: resume from now, even when nothing came, so that quiet streams keep their
+    # cursor within the tombstone retention window. A transaction committing late can store a
+    # timestamp older than rows already read, so the cursor stays SYNC_SETTLE_SECONDS behind and the
+    # next sync repeats that window.
+    return max(cursor, (now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS), 0))
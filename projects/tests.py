@@ -1,3 +1,1542 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .cache import dashboard_cache_key, dashboard_cache_stats, invalidate_dashboards
+from .checks import check_deferred_progress_updates, check_throttle_cache
+from .db import REPLICA_DB_ALIAS, PrimaryReplicaRouter, request_routing
+from .events import InMemoryBroker, RedisBroker, get_broker, project_channel
+from .exports import TASK_EXPORT_FIELDS
+from .forms import ProjectForm
+from .jobs import enqueue, enqueue_many, handlers, register, run_due_jobs
+from .log import JsonFormatter, QueuedStreamHandler, audit
+from .metrics import QueryRecorder, request_metrics
+from .middleware import CompressionMiddleware, ReplicaRoutingMiddleware
+from .models import ArchivedProject, Job, Project, ProjectTaskRollup, Task, Tombstone, UserTaskRollup
+from .permissions.membership import membership_for
+from .permissions.project_permission import IsProjectCreator
+from .permissions.task_permission import IsTaskAssignee
+from .renderers import msgpack, orjson
+from .rollups import COUNT_FIELDS
+from .search import get_search_backend
+from .throttling import CacheBucketStore, get_bucket_store
+from .serializers.serializers_v1 import ProjectSerializer, TaskSerializer, UserSerializer, ValuesRepresentation
+
+
+class QueryCountAssertionsMixin:
+    """Assert that a page issues the same number of queries regardless of how many rows back it."""
+
+    def assertConstantQueryCount(self, url, seed, sizes=(10, 1000)):
+        counts = []
+        for size in sizes:
+            seed(size)
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(context))
+        self.assertEqual(len(set(counts)), 1, f'Query count for {url} grew with row count: {dict(zip(sizes, counts))}')
+
+
+class ListQueryCountTests(QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='password')
+        self.project = Project.objects.create(name='Seed', description='', created_by=self.user)
+        self.project.members.add(self.user)
+        self.client.force_login(self.user)
+
+    def seed_users(self, size):
+        User.objects.bulk_create(
+            User(username=f'user-{size}-{i}') for i in range(size - User.objects.count())
+        )
+
+    def seed_projects(self, size):
+        self.seed_users(size)
+        users = list(User.objects.exclude(pk=self.user.pk)[:3])
+        projects = Project.objects.bulk_create(
+            Project(name=f'Project {i}', description='', created_by=self.user)
+            for i in range(size - Project.objects.count())
+        )
+        Membership = Project.members.through
+        Membership.objects.bulk_create(
+            Membership(project_id=project.pk, user_id=user.pk)
+            for project in projects for user in [self.user, *users]
+        )
+
+    def seed_tasks(self, size):
+        self.seed_users(size)
+        assignees = [self.user, *User.objects.exclude(pk=self.user.pk)[:size]]
+        Task.objects.bulk_create(
+            Task(project=self.project, name=f'Task {i}', description='', assigned_to=assignees[i % len(assignees)])
+            for i in range(size)
+        )
+
+    def test_project_list(self):
+        self.assertConstantQueryCount('/api/projects/', self.seed_projects)
+
+    def test_task_list(self):
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertConstantQueryCount('/api/tasks/', self.seed_tasks)
+
+    def test_user_list(self):
+        self.assertConstantQueryCount('/api/users/', self.seed_users)
+
+    def test_dashboard(self):
+        self.assertConstantQueryCount(reverse('dashboard'), self.seed_projects)
+
+    def test_project_detail(self):
+        def seed(size):
+            self.seed_tasks(size)
+            self.project.members.add(*User.objects.all()[:size])
+
+        self.assertConstantQueryCount(reverse('project_detail', args=[self.project.pk]), seed)
+
+    def test_user_picker_forms(self):
+        self.assertConstantQueryCount(reverse('create_project'), self.seed_users)
+        self.assertConstantQueryCount(reverse('create_task', args=[self.project.pk]), self.seed_users)
+        self.assertConstantQueryCount(reverse('add_member', args=[self.project.pk]), self.seed_users)
+
+
+class UserAutocompleteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='password')
+        User.objects.bulk_create([
+            User(username='Alice', email='wonderland@example.com'),
+            User(username='alfred', email='butler@example.com'),
+            User(username='bob', email='ALbert@example.com'),
+        ])
+        self.client.force_login(self.user)
+
+    def search(self, term, **params):
+        response = self.client.get(reverse('user_autocomplete'), {'q': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.json()['results']]
+
+    def test_prefix_search_on_username_and_email_ignores_case(self):
+        self.assertEqual(self.search('AL'), ['Alice', 'alfred', 'bob'])
+        self.assertEqual(self.search('won'), ['Alice'])
+        self.assertEqual(self.search('lice'), [])
+        self.assertEqual(self.search(''), [])
+        self.assertEqual(self.search('al', limit=1), ['Alice'])
+
+    def test_search_uses_the_lowered_column_indexes(self):
+        with CaptureQueriesContext(connection) as context:
+            self.search('al')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + context.captured_queries[-1]['sql'])
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('auth_user_username_lower_idx', plan)
+        self.assertIn('auth_user_email_lower_idx', plan)
+
+    def test_project_form_validates_members_with_one_query(self):
+        member_ids = list(User.objects.exclude(pk=self.user.pk).values_list('pk', flat=True))
+        form = ProjectForm({'name': 'P', 'description': 'D', 'members': member_ids})
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+        self.assertFalse(ProjectForm({'name': 'P', 'description': 'D', 'members': [0]}).is_valid())
+        rendered = str(ProjectForm(initial={'members': member_ids[:1]})['members'])
+        self.assertEqual(rendered.count('<option'), 1)
+        self.assertIn(reverse('user_autocomplete'), rendered)
+
+    def test_forms_rerender_with_non_numeric_ids(self):
+        project = Project.objects.create(name='P', description='D', created_by=self.user)
+        for url, data in (
+            (reverse('create_project'), {'name': 'P', 'description': 'D', 'members': ['abc']}),
+            (reverse('create_task', args=[project.pk]), {'name': 'T', 'description': 'D', 'assigned_to': 'abc'}),
+            (reverse('add_member', args=[project.pk]), {'user': 'abc'}),
+        ):
+            response = self.client.post(url, data)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response.context['form'].errors, url)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='member', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.project = Project.objects.create(name='Apollo', description='', created_by=self.user)
+        self.project.members.add(self.user)
+        self.client.force_login(self.user)
+
+    def get_dashboard(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(reverse('dashboard'))
+
+    def assertCached(self, user, cached=True):
+        self.assertEqual(cache.get(dashboard_cache_key(user)) is not None, cached)
+
+    def test_second_hit_is_served_from_cache(self):
+        self.get_dashboard()
+        with self.assertNumQueries(2):  # session and user only
+            response = self.get_dashboard()
+        self.assertContains(response, 'Apollo')
+        self.assertEqual(dashboard_cache_stats()['hits'], 1)
+        self.assertEqual(dashboard_cache_stats()['misses'], 1)
+
+    def test_rename_invalidates_members(self):
+        self.get_dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.name = 'Gemini'
+            self.project.save()
+        self.assertCached(self.user, False)
+        self.assertContains(self.get_dashboard(), 'Gemini')
+
+    def test_progress_change_invalidates_members(self):
+        self.get_dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, name='T', description='', assigned_to=self.user, completed=True)
+        self.assertContains(self.get_dashboard(), 'Progress: 100%')
+
+    def test_membership_change_invalidates_only_affected_user(self):
+        self.get_dashboard()
+        self.client.force_login(self.other)
+        self.get_dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.members.add(self.other)
+        self.assertCached(self.user)
+        self.assertCached(self.other, False)
+        self.assertContains(self.get_dashboard(), 'Apollo')
+
+    def test_delete_invalidates_members(self):
+        self.get_dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.delete()
+        self.assertCached(self.user, False)
+        self.assertNotContains(self.get_dashboard(), 'Apollo')
+
+    def test_fill_overtaken_by_an_invalidation_is_not_served(self):
+        renamed = []
+
+        def rename_during_render(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if not renamed and sql.startswith('SELECT') and 'projects_project' in sql:
+                # Another request commits a rename after this one has read the old name.
+                renamed.append(True)
+                Project.objects.filter(pk=self.project.pk).update(name='Gemini')
+                invalidate_dashboards([self.user.pk])
+            return result
+
+        with connection.execute_wrapper(rename_during_render):
+            self.assertContains(self.get_dashboard(), 'Apollo')
+        self.assertContains(self.get_dashboard(), 'Gemini')
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get(reverse('dashboard_cache_stats')).status_code, 403)
+        self.client.force_login(User.objects.create_superuser(username='admin', password='password'))
+        self.assertEqual(set(self.client.get(reverse('dashboard_cache_stats')).json()), {'hits', 'misses', 'hit_ratio'})
+
+
+class TaskCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner')
+        self.project = Project.objects.create(name='Counted', description='', created_by=self.user)
+        self.other = Project.objects.create(name='Other', description='', created_by=self.user)
+
+    def create_task(self, project=None, **fields):
+        return Task.objects.create(project=project or self.project, name='Task', description='',
+                                   assigned_to=self.user, **fields)
+
+    def assertCounters(self, project, total, completed, progress):
+        project.refresh_from_db()
+        self.assertEqual((project.total_tasks, project.completed_tasks, project.progress), (total, completed, progress))
+
+    def test_create_complete_uncomplete_move_and_delete(self):
+        task = self.create_task()
+        self.create_task()
+        self.assertCounters(self.project, 2, 0, 0)
+        task.completed = True
+        task.save()
+        self.assertCounters(self.project, 2, 1, 50)
+        task.completed = False
+        task.save(update_fields=['completed'])
+        self.assertCounters(self.project, 2, 0, 0)
+        task.completed = True
+        task.project = self.other
+        task.save()
+        self.assertCounters(self.project, 1, 0, 0)
+        self.assertCounters(self.other, 1, 1, 100)
+        task.delete()
+        self.assertCounters(self.other, 0, 0, 0)
+
+    def test_stale_copies_count_a_completion_once(self):
+        task = self.create_task()
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.completed = second.completed = True
+        first.save()
+        second.save()
+        self.assertCounters(self.project, 1, 1, 100)
+        # The row is completed, whatever the copy being deleted was loaded with.
+        task.delete()
+        self.assertCounters(self.project, 0, 0, 0)
+
+    def test_deleting_a_deleted_task_takes_nothing_off(self):
+        self.create_task()
+        task = self.create_task(completed=True)
+        Task.objects.get(pk=task.pk).delete()
+        task.delete()
+        self.assertCounters(self.project, 1, 0, 0)
+
+    def test_saving_a_stale_project_keeps_the_counters(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        self.create_task(completed=True)
+        serializer = ProjectSerializer(stale, data={'name': 'Renamed', 'progress': 0}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.assertCounters(self.project, 1, 1, 100)
+        self.assertEqual(self.project.name, 'Renamed')
+
+    def test_recompute_progress_repairs_drifted_counters(self):
+        self.create_task(completed=True)
+        self.create_task()
+        Project.objects.filter(pk=self.project.pk).update(total_tasks=5, completed_tasks=0, progress=0)
+        out = StringIO()
+        call_command('recompute_progress', '--dry-run', stdout=out)
+        self.assertIn('Checked 2 projects, would repair 1.', out.getvalue())
+        self.assertCounters(self.project, 5, 0, 0)
+        call_command('recompute_progress', '--batch-size', '1', stdout=out)
+        self.assertIn('Checked 2 projects, repaired 1.', out.getvalue())
+        self.assertCounters(self.project, 2, 1, 50)
+        self.assertCounters(self.other, 0, 0, 0)
+
+
+class TaskBulkApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='password')
+        self.project = Project.objects.create(name='Import', description='', created_by=self.user)
+        self.client.force_login(self.user)
+
+    def task_payload(self, count, project=None):
+        project = project or self.project
+        return [
+            {'name': f'Task {i}', 'description': 'Imported', 'assigned_to': self.user.pk, 'project': project.pk}
+            for i in range(count)
+        ]
+
+    def test_bulk_create_batches_writes_and_updates_counters(self):
+        self.client.post('/api/tasks/bulk/', self.task_payload(5), content_type='application/json')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/tasks/bulk/', self.task_payload(500), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 500)
+        # Only the INSERT is split into batches (by SQLite's parameter limit); nothing runs per task.
+        self.assertLess(len(context), 20)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.total_tasks, 505)
+
+    def test_bulk_create_requires_project_creator(self):
+        other = Project.objects.create(name='Other', description='', created_by=User.objects.create_user('other'))
+        response = self.client.post(
+            '/api/tasks/bulk/', self.task_payload(2) + self.task_payload(1, other), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update_recomputes_progress(self):
+        ids = [task['id'] for task in self.client.post(
+            '/api/tasks/bulk/', self.task_payload(4), content_type='application/json').json()]
+        response = self.client.patch(
+            '/api/tasks/bulk/', [{'id': pk, 'completed': True, 'progress': 100} for pk in ids[:3]],
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.completed_tasks, self.project.progress), (3, 75))
+
+    def test_bulk_update_writes_only_the_submitted_fields(self):
+        ids = [task['id'] for task in self.client.post(
+            '/api/tasks/bulk/', self.task_payload(2), content_type='application/json').json()]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                '/api/tasks/bulk/', [{'id': pk, 'progress': 40} for pk in ids], content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        update = next(query['sql'] for query in context if query['sql'].startswith('UPDATE "projects_task"'))
+        self.assertIn('"progress" = CASE', update)
+        self.assertNotIn('"completed" =', update)
+        self.assertEqual(list(Task.objects.values_list('progress', 'completed')), [(40, False), (40, False)])
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(username='owner', password='password')
+        self.project = Project.objects.create(name='Paged', description='', created_by=self.user)
+        self.client.force_login(self.user)
+
+    def seed(self, count):
+        tasks = Task.objects.bulk_create(
+            Task(project=self.project, name=f'Task {i}', description='', assigned_to=self.user) for i in range(count)
+        )
+        Project.refresh_task_counters([self.project.pk])
+        return tasks
+
+    def walk(self, url):
+        ids = []
+        while url:
+            page = self.client.get(url).json()
+            ids.extend(task['id'] for task in page['results'])
+            url = page['next']
+        return ids
+
+    def test_pages_are_ordered_by_id(self):
+        tasks = self.seed(7)
+        self.assertEqual(self.walk('/api/tasks/?page_size=3'), sorted(task.pk for task in tasks))
+
+    def test_cursor_is_stable_across_inserts(self):
+        tasks = self.seed(6)
+        first = self.client.get('/api/tasks/?page_size=3').json()
+        # Rows added since, or removed from the pages already read, neither repeat nor skip a row.
+        added = self.seed(2)
+        Task.objects.get(pk=tasks[0].pk).delete()
+        seen = [task['id'] for task in first['results']] + self.walk(first['next'])
+        self.assertEqual(seen, [task.pk for task in tasks + added])
+
+    def test_page_size_is_capped(self):
+        self.seed(settings.API_MAX_PAGE_SIZE + 1)
+        page = self.client.get(f'/api/tasks/?page_size={settings.API_MAX_PAGE_SIZE * 2}').json()
+        self.assertEqual(len(page['results']), settings.API_MAX_PAGE_SIZE)
+        self.assertIsNotNone(page['next'])
+        self.assertEqual(len(self.client.get(page['next']).json()['results']), 1)
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='assignee', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        project = Project.objects.create(name='Export', description='', created_by=self.user)
+        Task.objects.create(project=project, name='Mine', description='', assigned_to=self.user)
+        Task.objects.create(project=project, name='Theirs', description='', assigned_to=self.other)
+        self.client.force_login(self.user)
+
+    def test_task_export_is_scoped_like_the_task_list(self):
+        response = self.client.get('/api/tasks/export/ndjson/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Mine'])
+
+    def test_task_export_csv_has_header(self):
+        response = self.client.get('/api/tasks/export/csv/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(TASK_EXPORT_FIELDS))
+        self.assertEqual(len(lines), 2)
+        self.assertFalse(response.is_async)
+
+    async def test_task_export_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        with self.settings(EXPORT_CHUNK_SIZE=1):
+            response = await self.async_client.get('/api/tasks/export/csv/')
+            # An async iterator is streamed as is; a sync one would be read into a list first.
+            self.assertTrue(response.is_async)
+            lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(TASK_EXPORT_FIELDS))
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['Mine'])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='poller', password='password')
+        self.project = Project.objects.create(name='Polled', description='', created_by=self.user)
+        self.project.members.add(self.user)
+        self.task = Task.objects.create(project=self.project, name='Task', description='', assigned_to=self.user)
+        self.client.force_login(self.user)
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get('/api/projects/')['ETag']
+        response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_changes_with_membership(self):
+        etag = self.client.get('/api/projects/')['ETag']
+        self.project.members.add(User.objects.create_user(username='newcomer'))
+        self.assertEqual(self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_changes_with_deletion(self):
+        Task.objects.create(project=self.project, name='Second', description='', assigned_to=self.user)
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.task.delete()
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_retrieve_revalidates_after_update(self):
+        url = f'/api/tasks/{self.task.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.task.progress = 50
+        self.task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+    def test_list_has_no_last_modified_to_miss_deletions(self):
+        response = self.client.get('/api/tasks/')
+        self.assertNotIn('Last-Modified', response)
+        self.task.delete()
+        response = self.client.get('/api/tasks/', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_is_only_sent_once_its_second_is_over(self):
+        url = f'/api/tasks/{self.task.pk}/'
+        # Changed in a second that is not over yet, whenever the clock ticks during the test.
+        Task.objects.filter(pk=self.task.pk).update(updated_at=timezone.now() + timezone.timedelta(seconds=10))
+        self.assertNotIn('Last-Modified', self.client.get(url))
+        Task.objects.filter(pk=self.task.pk).update(updated_at=timezone.now() - timezone.timedelta(seconds=10))
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.task.progress = 50
+        self.task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+
+class QueryPlanAssertionsMixin:
+    """Run EXPLAIN QUERY PLAN on every SELECT a block of code emits and reject full scans of hot tables."""
+    hot_tables = ('projects_project', 'projects_task', 'projects_project_members')
+
+    def capture_selects(self, func):
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            func()
+        return statements
+
+    def full_scans(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            details = [row[-1] for row in cursor.fetchall()]
+        scans = []
+        for detail in details:
+            words = detail.split()
+            if words[0] != 'SCAN':
+                continue
+            # Older SQLite versions print "SCAN TABLE <name>".
+            table = words[2] if words[1] == 'TABLE' else words[1]
+            if table in self.hot_tables:
+                scans.append(detail)
+        return scans
+
+    def indexes_used(self, func):
+        used = set()
+        for sql, params in self.capture_selects(func):
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                for row in cursor.fetchall():
+                    words = row[-1].split()
+                    if 'INDEX' in words:
+                        used.add(words[words.index('INDEX') + 1])
+        return used
+
+    def assertNoFullScans(self, func):
+        statements = self.capture_selects(func)
+        self.assertTrue(statements)
+        for sql, params in statements:
+            scans = self.full_scans(sql, params)
+            self.assertFalse(scans, f'Full table scan {scans} in: {sql}')
+
+
+class HotQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='member', password='password')
+        cls.project = Project.objects.create(name='Planned', description='', created_by=cls.user)
+        cls.project.members.add(cls.user)
+        others = User.objects.bulk_create(User(username=f'user-{i}') for i in range(50))
+        for i in range(20):
+            project = Project.objects.create(name=f'Other {i}', description='', created_by=others[i])
+            project.members.add(*others[i:i + 5])
+        Task.objects.bulk_create(
+            Task(project_id=cls.project.pk if i % 10 == 0 else cls.project.pk + 1 + i % 20, name=f'Task {i}',
+                 description='', assigned_to=cls.user if i % 10 == 0 else others[i % 50], completed=i % 3 == 0)
+            for i in range(500)
+        )
+        cls.task = Task.objects.filter(assigned_to=cls.user).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_template_views(self):
+        for url in (
+            reverse('dashboard'),
+            reverse('project_detail', args=[self.project.pk]),
+            reverse('update_task_progress', args=[self.task.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertNoFullScans(lambda: self.client.get(url))
+
+    def test_api_views(self):
+        for url in (
+            '/api/projects/',
+            f'/api/projects/{self.project.pk}/',
+            '/api/tasks/',
+            f'/api/tasks/{self.task.pk}/',
+        ):
+            with self.subTest(url=url):
+                self.assertNoFullScans(lambda: self.client.get(url))
+
+    def test_progress_recount(self):
+        self.assertNoFullScans(self.project.update_progress)
+        self.assertNoFullScans(lambda: Project.count_tasks([self.project.pk]))
+
+    def test_every_task_index_serves_a_hot_query(self):
+        def requests():
+            for url in ('/api/tasks/', '/api/sync/', reverse('project_detail', args=[self.project.pk])):
+                self.client.get(url)
+            Project.count_tasks([self.project.pk])
+
+        unused = {index.name for index in Task._meta.indexes} - self.indexes_used(requests)
+        self.assertFalse(unused, f'Task indexes no query plan uses: {sorted(unused)}')
+
+    def test_assignee_task_list_is_read_in_id_order(self):
+        # The assigned_to index holds the rowid after the assignee: no sort per page.
+        for sql, params in self.capture_selects(lambda: self.client.get('/api/tasks/?page_size=5')):
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                details = [row[-1] for row in cursor.fetchall()]
+            self.assertFalse([detail for detail in details if 'TEMP B-TREE' in detail], sql)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        request_metrics.reset()
+        self.user = User.objects.create_user(username='watcher', password='password')
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/projects/')
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+
+    def test_routes_are_aggregated(self):
+        project = Project.objects.create(name='Metered', description='', created_by=self.user)
+        project.members.add(self.user)
+        self.client.get('/api/projects/')
+        self.client.get(f'/api/projects/{project.pk}/')
+        self.client.get(f'/api/projects/{project.pk}/')
+        snapshot = request_metrics.snapshot()
+        self.assertEqual(snapshot['GET project-detail']['count'], 2)
+        self.assertEqual(snapshot['GET project-list']['count'], 1)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs('projects.middleware', 'WARNING') as logs:
+            self.client.get('/api/projects/')
+        self.assertIn('Slow request /api/projects/', logs.output[0])
+
+    def test_repeated_query_shapes_are_grouped(self):
+        recorder = QueryRecorder()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for pk in range(4):
+            recorder(execute, f'SELECT name FROM projects_task WHERE id = {pk}', (), False, {})
+        recorder(execute, 'SELECT name FROM projects_task WHERE id IN (%s, %s)', (1, 2), False, {})
+        recorder(execute, 'SELECT name FROM projects_task WHERE id IN (%s, %s, %s)', (1, 2, 3), False, {})
+        self.assertEqual(recorder.count, 6)
+        self.assertEqual(recorder.repeated_shapes(2), [
+            ('SELECT name FROM projects_task WHERE id = ?', 4),
+            ('SELECT name FROM projects_task WHERE id IN (...)', 2),
+        ])
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get(reverse('request_metrics')).status_code, 403)
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertIn('GET request_metrics', self.client.get(reverse('request_metrics')).json())
+
+
+class PermissionQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='checker', password='password')
+        self.projects = [
+            Project.objects.create(name=f'P{i}', description='', created_by=self.user) for i in range(3)
+        ]
+        self.projects[0].members.add(self.user)
+        self.projects[1].members.add(self.user)
+        self.request = RequestFactory().get('/')
+        self.request.user = User.objects.get(pk=self.user.pk)
+
+    def test_creator_check_does_not_load_the_creator(self):
+        project = Project.objects.get(pk=self.projects[0].pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(IsProjectCreator().has_object_permission(self.request, None, project))
+
+    def test_assignee_check_does_not_load_the_assignee(self):
+        task = Task.objects.create(project=self.projects[0], name='T', description='', assigned_to=self.user)
+        task = Task.objects.get(pk=task.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(IsTaskAssignee().has_object_permission(self.request, None, task))
+
+    def test_membership_is_probed_once_per_project(self):
+        membership = membership_for(self.request)
+        with self.assertNumQueries(1):
+            self.assertTrue(membership.is_member(self.projects[0].pk))
+            self.assertTrue(membership_for(self.request).is_member(self.projects[0].pk))
+
+    def test_project_detail_checks_membership_without_loading_members_twice(self):
+        self.client.force_login(self.user)
+        url = reverse('project_detail', args=[self.projects[0].pk])
+        # session, user, project, membership probe, member list, tasks
+        with self.assertNumQueries(6):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(reverse('project_detail', args=[self.projects[2].pk])).status_code, 403)
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='password')
+        self.project = Project.objects.create(name='Live', description='', created_by=self.user)
+        self.project.members.add(self.user)
+        self.task = Task.objects.create(project=self.project, name='T', description='', assigned_to=self.user)
+
+    async def test_broker_fans_out_to_channel_subscribers_across_threads(self):
+        broker = InMemoryBroker()
+        first = broker.subscribe([project_channel(1)])
+        second = broker.subscribe([project_channel(1), project_channel(2)])
+        publisher = threading.Thread(target=broker.publish, args=(project_channel(1), {'event': 'x', 'data': 1}))
+        publisher.start()
+        publisher.join()
+        self.assertEqual(await first.get(timeout=1), {'event': 'x', 'data': 1})
+        self.assertEqual(await second.get(timeout=1), {'event': 'x', 'data': 1})
+        first.close()
+        broker.publish(project_channel(2), {'event': 'y', 'data': 2})
+        self.assertEqual(await second.get(timeout=1), {'event': 'y', 'data': 2})
+        self.assertTrue(first.queue.empty())
+        second.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    @skipIf(fakeredis is None, 'fakeredis is not installed')
+    async def test_redis_broker_relays_between_processes(self):
+        # Two brokers on one Redis stand for a web process and the job runner, which only publishes.
+        options = {'connection_class': fakeredis.FakeConnection}
+        web, worker = RedisBroker('redis://events-test/0', **options), RedisBroker('redis://events-test/0', **options)
+        self.addCleanup(web.close)
+        async with web.subscribe([project_channel(1)]) as subscription:
+            await sync_to_async(worker.publish, thread_sensitive=False)(project_channel(2), {'event': 'x', 'data': 2})
+            await sync_to_async(worker.publish, thread_sensitive=False)(project_channel(1), {'event': 'y', 'data': 1})
+            self.assertEqual(await subscription.get(timeout=2), {'event': 'y', 'data': 1})
+        self.assertEqual(web.subscriber_count(), 0)
+        self.assertIsNone(worker._listener)
+
+    def test_task_changes_are_published_after_commit(self):
+        def complete_task():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.task.completed = True
+                self.task.save()
+
+        async def collect():
+            async with get_broker().subscribe([project_channel(self.project.pk)]) as subscription:
+                await sync_to_async(complete_task)()
+                return [await subscription.get(timeout=1), await subscription.get(timeout=1)]
+
+        events = {message['event']: message['data'] for message in async_to_sync(collect)()}
+        self.assertEqual(events['project'], {
+            'id': self.project.pk, 'progress': 100, 'total_tasks': 1, 'completed_tasks': 1,
+        })
+        self.assertEqual(events['task'], {'id': self.task.pk, 'project': self.project.pk, 'progress': 0, 'completed': True})
+
+    async def test_stream_delivers_events_for_member_projects(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('event_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        get_broker().publish(project_channel(self.project.pk), {'event': 'project', 'data': {'id': self.project.pk}})
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertEqual(chunk, f'id: 1\nevent: project\ndata: {{"id":{self.project.pk}}}\n\n'.encode())
+        await stream.aclose()
+
+    async def test_stream_requires_login(self):
+        response = await self.async_client.get(reverse('event_stream'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('event_stream'))
+        self.assertEqual(response.status_code, 501)
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+
+
+class AsyncApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='member', password='password')
+        other = User.objects.create_user(username='other', password='password')
+        self.project = Project.objects.create(name='Mine', description='', created_by=self.user)
+        self.project.members.add(self.user, other)
+        self.hidden = Project.objects.create(name='Hidden', description='', created_by=other)
+        Task.objects.bulk_create(
+            Task(project=self.project, name=f'T{i}', description='', assigned_to=self.user) for i in range(5)
+        )
+        self.client.force_login(self.user)
+
+    async def test_matches_the_sync_representations(self):
+        await self.async_client.aforce_login(self.user)
+        for sync_url, async_url in [
+            ('/api/projects/', reverse('async-project-list')),
+            ('/api/tasks/', reverse('async-task-list')),
+        ]:
+            expected = (await sync_to_async(self.client.get)(sync_url)).json()['results']
+            response = await self.async_client.get(async_url)
+            self.assertEqual(response.json()['results'], expected)
+        task = await Task.objects.afirst()
+        expected = await sync_to_async(self.client.get)(f'/api/tasks/{task.pk}/')
+        response = await self.async_client.get(reverse('async-task-detail', args=[task.pk]))
+        self.assertEqual(response.json(), expected.json())
+        # Same validators as the sync endpoint, so caches can revalidate against either.
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+    async def test_only_safe_methods_are_allowed(self):
+        await self.async_client.aforce_login(self.user)
+        task = await Task.objects.afirst()
+        for url in [
+            reverse('async-project-list'), reverse('async-project-detail', args=[self.project.pk]),
+            reverse('async-task-list'), reverse('async-task-detail', args=[task.pk]),
+        ]:
+            response = await self.async_client.post(url, {'name': 'Posted'})
+            self.assertEqual(response.status_code, 405)
+            self.assertEqual(response['Allow'], 'GET, HEAD')
+        self.assertFalse(await Project.objects.filter(name='Posted').aexists())
+
+    async def test_keyset_pagination_and_conditional_get(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('async-task-list')
+        page = (await self.async_client.get(url, {'page_size': 2})).json()
+        names = [task['name'] for task in page['results']]
+        while page['next']:
+            page = (await self.async_client.get(page['next'])).json()
+            names += [task['name'] for task in page['results']]
+        self.assertEqual(names, [f'T{i}' for i in range(5)])
+        response = await self.async_client.get(url)
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_scope_and_authentication(self):
+        response = await self.async_client.get(reverse('async-project-list'))
+        self.assertEqual(response.status_code, 403)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('async-project-detail', args=[self.hidden.pk]))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('async-project-detail', args=[self.project.pk]))
+        self.assertEqual(sorted(response.json()['members']), sorted(
+            [user.pk async for user in User.objects.filter(username__in=['member', 'other'])]))
+
+    @override_settings(API_THROTTLE_RATES={'read': '60/min', 'write': '1/min'},
+                       API_THROTTLE_BURSTS={'read': 2, 'write': 1})
+    async def test_reads_share_the_viewsets_buckets(self):
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.get(reverse('async-task-list'))).status_code, 200)
+        self.assertEqual((await sync_to_async(self.client.get)('/api/tasks/')).status_code, 200)
+        response = await self.async_client.get(reverse('async-task-detail', args=[1]))
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        self.assertIn('throttled', response.json()['detail'])
+        self.assertEqual((await sync_to_async(self.client.get)('/api/tasks/')).status_code, 429)
+        self.assertEqual((await self.async_client.get(reverse('async-project-list'))).status_code, 200)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.project = Project.objects.create(name='Shared', description='', created_by=self.other)
+        self.project.members.add(self.user, self.other)
+        self.tasks = [
+            Task.objects.create(project=self.project, name=f'T{i}', description='', assigned_to=self.user)
+            for i in range(3)
+        ]
+        self.client.force_login(self.user)
+
+    def sync(self, token=None, **params):
+        if token:
+            params['since'] = token
+        response = self.client.get(reverse('sync'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_pages_through_everything_visible(self):
+        hidden = Project.objects.create(name='Hidden', description='', created_by=self.other)
+        Task.objects.create(project=hidden, name='Theirs', description='', assigned_to=self.other)
+        page = self.sync(page_size=2)
+        tasks = [task['name'] for task in page['tasks']]
+        self.assertTrue(page['has_more'])
+        page = self.sync(page['next'], page_size=2)
+        tasks += [task['name'] for task in page['tasks']]
+        self.assertFalse(page['has_more'])
+        self.assertEqual(tasks, ['T0', 'T1', 'T2'])
+        self.assertEqual(page['projects'], [])
+        self.assertEqual(page['deleted'], [])
+
+    def test_resync_returns_only_changes_and_deletions(self):
+        token = self.sync()['next']
+        self.assertEqual(self.sync(token)['tasks'], [])
+
+        deleted_id = self.tasks[1].pk
+        self.tasks[0].completed = True
+        self.tasks[0].save()
+        self.tasks[1].delete()
+        self.tasks[2].assigned_to = self.other
+        self.tasks[2].save()
+        page = self.sync(token)
+        self.assertEqual([task['id'] for task in page['tasks']], [self.tasks[0].pk])
+        self.assertEqual([project['progress'] for project in page['projects']], [50])
+        self.assertEqual(sorted((item['kind'], item['id']) for item in page['deleted']),
+                         sorted([('task', deleted_id), ('task', self.tasks[2].pk)]))
+
+    def test_membership_removal_and_project_deletion_leave_tombstones(self):
+        token = self.sync()['next']
+        self.project.members.remove(self.user)
+        page = self.sync(token)
+        self.assertEqual(page['projects'], [])
+        self.assertEqual([(item['kind'], item['id']) for item in page['deleted']], [('membership', self.project.pk)])
+
+        self.client.force_login(self.other)
+        token = self.sync()['next']
+        project_id = self.project.pk
+        self.project.delete()
+        deleted = self.sync(token)['deleted']
+        self.assertIn(('project', project_id), [(item['kind'], item['id']) for item in deleted])
+
+    def test_memberless_project_deletion_reaches_superusers(self):
+        admin = User.objects.create_superuser(username='admin', password='password')
+        self.client.force_login(admin)
+        lonely = Project.objects.create(name='Lonely', description='', created_by=admin)
+        token, project_id = self.sync()['next'], lonely.pk
+        lonely.delete()
+        self.assertIn(('project', project_id), [(item['kind'], item['id']) for item in self.sync(token)['deleted']])
+
+    def test_quiet_clients_keep_a_fresh_token(self):
+        token = self.sync()['next']
+        with mock.patch('projects.views.api_sync_views.timezone') as clock:
+            # Daily syncs without a deletion in scope, past the retention window.
+            for day in range(1, settings.SYNC_TOMBSTONE_RETENTION_DAYS + 5):
+                clock.now.return_value = timezone.now() + timezone.timedelta(days=day)
+                token = self.sync(token)['next']
+
+    def test_bad_and_expired_tokens(self):
+        response = self.client.get(reverse('sync'), {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+        token = self.sync()['next']
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=-1):
+            self.assertEqual(self.client.get(reverse('sync'), {'since': token}).status_code, 410)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='password')
+        members = User.objects.bulk_create(User(username=f'member{i}') for i in range(3))
+        for i in range(3):
+            project = Project.objects.create(name=f'P{i}', description='', created_by=self.user)
+            project.members.add(*members[:i])
+            Task.objects.create(project=project, name=f'T{i}', description='', assigned_to=members[i])
+        self.client.force_login(self.user)
+
+    def test_values_fast_path_matches_the_model_serializers(self):
+        for serializer_class, queryset in [
+            (ProjectSerializer, Project.objects.order_by('pk')),
+            (TaskSerializer, Task.objects.order_by('pk')),
+            (UserSerializer, User.objects.order_by('pk')),
+        ]:
+            representation = ValuesRepresentation(serializer_class())
+            self.assertEqual(
+                representation.to_representation(representation.values(queryset)),
+                serializer_class(queryset, many=True).data,
+            )
+
+    def test_fields_narrow_the_representation_and_the_query(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/tasks/', {'fields': 'id,progress'})
+        self.assertEqual(response.json()['results'][0], {'id': Task.objects.first().pk, 'progress': 0})
+        page_query = [query['sql'] for query in context.captured_queries if 'LIMIT' in query['sql']][-1]
+        self.assertNotIn('description', page_query)
+
+        project = Project.objects.last()
+        response = self.client.get(f'/api/projects/{project.pk}/', {'fields': 'name,members'})
+        members = list(project.members.values_list('pk', flat=True))
+        self.assertEqual(response.json(), {'name': project.name, 'members': members})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/projects/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Unknown fields: secret.']})
+
+
+class ResponseFormatTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', password='password')
+        project = Project.objects.create(name='Pröject', description='', created_by=self.user)
+        project.members.add(self.user)
+        Task.objects.create(project=project, name='T', description='', assigned_to=self.user)
+        self.client.force_login(self.user)
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_renders_the_same_document(self):
+        response = self.client.get('/api/sync/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), response.data)
+        self.assertIn('Pröject'.encode(), response.content)
+
+        body = {'name': 'N', 'description': 'D', 'created_by': self.user.pk, 'members': [self.user.pk]}
+        response = self.client.post('/api/projects/', json.dumps(body).encode(), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        response = self.client.get('/api/tasks/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(json.dumps(response.data)))
+
+        body = {'name': 'N', 'description': 'D', 'created_by': self.user.pk, 'members': [self.user.pk]}
+        response = self.client.post('/api/projects/', msgpack.packb(body), content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201)
+
+    def test_compression_weakens_etags_and_skips_event_streams(self):
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = HttpResponse('{"results": []} ' * 50, content_type='application/json')
+        response['ETag'] = '"tasks"'
+        compressed = middleware.process_response(request, response)
+        self.assertIn(compressed['Content-Encoding'], ('gzip', 'br'))
+        self.assertEqual(compressed['ETag'], 'W/"tasks"')
+
+        stream = HttpResponse('data: {}\n\n' * 50, content_type='text/event-stream')
+        self.assertFalse(middleware.process_response(request, stream).has_header('Content-Encoding'))
+
+
+
+class QueuedLoggingTests(SimpleTestCase):
+    def handler(self, stream, formatter=None, **kwargs):
+        handler = QueuedStreamHandler(stream, **kwargs)
+        handler.setFormatter(formatter or logging.Formatter('{levelname} {message}', style='{'))
+        self.addCleanup(handler.close)
+        logger = logging.getLogger(f'projects.tests.{self._testMethodName}')
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return handler, logger
+
+    def test_message_and_fields_are_rendered_when_logged(self):
+        stream = StringIO()
+        handler, logger = self.handler(stream, JsonFormatter())
+        # Keep the listener from writing until after the arguments change.
+        handler.stop_listener()
+        names = ['first']
+        audit(logger, 'project.renamed', names=names)
+        logger.info('names: %s', names)
+        names.append('second')
+        handler.start_listener()
+        handler.stop_listener()
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0]['message'], "project.renamed names=['first']")
+        self.assertEqual(lines[0]['names'], "['first']")
+        self.assertEqual(lines[1]['message'], "names: ['first']")
+
+    def test_full_queue_drops_records_and_reports_the_count(self):
+        stream = StringIO()
+        handler, logger = self.handler(stream, queue_size=2)
+        handler.stop_listener()
+        for i in range(5):
+            logger.warning('record %d', i)
+        handler.start_listener()
+        handler.queue.join()
+        logger.warning('after')
+        handler.stop_listener()
+        self.assertEqual(stream.getvalue().splitlines(), [
+            'WARNING record 0', 'WARNING record 1', 'WARNING after',
+            'WARNING 3 log records dropped: the log queue was full.',
+        ])
+
+    @skipIf(not hasattr(os, 'fork'), 'needs os.fork()')
+    def test_forked_child_writes_through_a_listener_of_its_own(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'child.log')
+        with open(path, 'w') as stream:
+            handler, logger = self.handler(stream)
+            pid = os.fork()
+            if pid == 0:
+                logger.warning('from the child')
+                handler.close()
+                os._exit(0)
+            os.waitpid(pid, 0)
+        with open(path) as stream:
+            self.assertEqual(stream.read(), 'WARNING from the child\n')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='password')
+        self.project = Project.objects.create(name='Queue', description='', created_by=self.user)
+        self.client.force_login(self.user)
+
+    def test_jobs_with_a_key_are_coalesced_while_queued(self):
+        enqueue_many('refresh_task_counters', [1, 2])
+        enqueue_many('refresh_task_counters', [2, 3])
+        self.assertEqual(sorted(Job.objects.values_list('key', flat=True)), ['1', '2', '3'])
+        Job.objects.filter(key='2').update(status=Job.RUNNING)
+        # A running job may have read stale data, so the same key can be queued again.
+        enqueue('refresh_task_counters', 2)
+        self.assertEqual(Job.objects.filter(key='2').count(), 2)
+
+    @override_settings(DEFER_PROGRESS_UPDATES=True, PROGRESS_DEBOUNCE_SECONDS=0)
+    def test_deferred_progress_updates_run_in_the_worker(self):
+        payload = [{'name': f'T{i}', 'description': 'D', 'assigned_to': self.user.pk, 'project': self.project.pk}
+                   for i in range(3)]
+        for _ in range(2):
+            self.client.post('/api/tasks/bulk/', payload, content_type='application/json')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.total_tasks, 0)
+        self.assertEqual(list(Job.objects.values_list('name', 'key')),
+                         [('refresh_task_counters', str(self.project.pk))])
+
+        # The recount queues the dashboard and event fan-out, which runs in the same pass.
+        self.assertEqual(run_due_jobs(), 2)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.total_tasks, 6)
+        self.assertFalse(Job.objects.exists())
+
+    def test_deferred_progress_updates_need_a_shared_cache_and_broker(self):
+        shared_cache = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+        with override_settings(DEFER_PROGRESS_UPDATES=True):
+            self.assertEqual([error.id for error in check_deferred_progress_updates(None)],
+                             ['projects.E002', 'projects.E003'])
+            with override_settings(CACHES=shared_cache, EVENT_BROKER='projects.events.RedisBroker'):
+                self.assertEqual(check_deferred_progress_updates(None), [])
+        self.assertEqual(check_deferred_progress_updates(None), [])
+
+    @override_settings(JOB_RETRY_BACKOFF_SECONDS=60)
+    def test_failing_jobs_are_retried_then_kept(self):
+        @register('test.flaky', max_attempts=2)
+        def flaky(job):
+            Project.objects.filter(pk=self.project.pk).update(name='Changed')
+            raise RuntimeError('boom')
+
+        self.addCleanup(handlers.pop, 'test.flaky')
+        enqueue('test.flaky')
+        self.assertEqual(run_due_jobs(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(Project.objects.get().name, 'Queue')
+
+        Job.objects.update(run_after=timezone.now())
+        run_due_jobs()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+
+class ImportProjectsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice')
+        self.bob = User.objects.create_user(username='bob')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.projects_path = os.path.join(directory.name, 'projects.csv')
+        self.tasks_path = os.path.join(directory.name, 'tasks.ndjson')
+
+    def write(self, projects, tasks):
+        with open(self.projects_path, 'w', newline='') as output:
+            output.write('ref,name,description,created_by,members\n' + ''.join(f'{line}\n' for line in projects))
+        with open(self.tasks_path, 'w') as output:
+            output.writelines(json.dumps(task) + '\n' for task in tasks)
+
+    def call(self, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_projects', projects=self.projects_path, tasks=self.tasks_path,
+                     stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue()
+
+    def test_import_batches_rows_and_recounts_progress_once(self):
+        existing = Project.objects.create(name='Existing', description='', created_by=self.alice)
+        self.write(
+            [f'p{i},Project {i},"Imported, {i}",alice,alice bob' for i in range(30)],
+            [{'project': f'p{i % 30}', 'name': f'T{i}', 'assigned_to': 'bob', 'completed': i % 2 == 0}
+             for i in range(60)] + [{'project_id': existing.pk, 'name': 'Old', 'assigned_to': 'alice'}],
+        )
+        with CaptureQueriesContext(connection) as context:
+            output = self.call(batch_size=25)
+        self.assertIn('Imported 30 projects, 60 memberships and 61 tasks', output)
+        # A handful of statements per batch (search indexing included), none per row.
+        self.assertLess(len(context), 50)
+        project = Project.objects.get(name='Project 0')
+        self.assertEqual((project.description, project.total_tasks, project.progress), ('Imported, 0', 2, 100))
+        self.assertEqual(set(project.members.all()), {self.alice, self.bob})
+        existing.refresh_from_db()
+        self.assertEqual(existing.total_tasks, 1)
+
+    def test_dry_run_reports_every_invalid_row_and_writes_nothing(self):
+        self.write(
+            ['p1,Project,,alice,carol', 'p2,Project,,alice,'],
+            [{'project': 'p2', 'name': 'T', 'assigned_to': 'bob', 'progress': 150},
+             {'project': 'p3', 'name': 'T', 'assigned_to': 'bob'}],
+        )
+        with self.assertRaisesMessage(CommandError, '3 invalid rows'):
+            self.call(dry_run=True)
+        self.assertFalse(Project.objects.exists())
+
+        with self.assertRaisesMessage(CommandError, 'Import stopped'):
+            self.call()
+        self.assertFalse(Project.objects.exists())
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice')
+        self.bob = User.objects.create_user(username='bob')
+        self.project = Project.objects.create(name='Garden', description='Roses and tulips', created_by=self.alice)
+        self.project.members.add(self.alice)
+        self.task = Task.objects.create(project=self.project, name='Plant roses', description='By the fence',
+                                        assigned_to=self.alice)
+        self.client.force_login(self.alice)
+
+    def search(self, query, user=None, **params):
+        self.client.force_login(user or self.alice)
+        response = self.client.get(reverse('search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def hits(self, query, user=None):
+        return [(hit['type'], hit['id']) for hit in self.search(query, user)['results']]
+
+    def test_hits_are_ranked_paginated_and_limited_to_visible_rows(self):
+        Task.objects.create(project=self.project, name='Water', description='roses, roses daily', assigned_to=self.bob)
+        # A match in the name outranks the same word in a description.
+        self.assertEqual(self.hits('roses'), [('task', self.task.pk), ('project', self.project.pk)])
+        self.assertEqual(self.hits('ros*'), self.hits('roses'))
+        self.assertEqual(self.hits('roses fence'), [('task', self.task.pk)])
+
+        page = self.search('roses', page_size=1)
+        self.assertEqual(len(page['results']), 1)
+        self.assertEqual([hit['id'] for hit in self.client.get(page['next']).json()['results']], [self.project.pk])
+
+        # Bob is assigned a task but is no member of the project.
+        self.assertEqual([kind for kind, _ in self.hits('roses', self.bob)], ['task'])
+        self.project.members.add(self.bob)
+        self.assertEqual([kind for kind, _ in self.hits('roses', self.bob)], ['task', 'project'])
+        self.assertEqual(self.client.get(reverse('search'), {'q': ' '}).status_code, 400)
+
+    def test_index_follows_saves_bulk_writes_and_deletes(self):
+        self.task.name = 'Prune hedges'
+        self.task.save()
+        self.assertEqual(self.hits('hedges'), [('task', self.task.pk)])
+        self.assertEqual(self.hits('plant'), [])
+
+        payload = [{'name': 'Mow lawn', 'description': 'Weekly', 'assigned_to': self.alice.pk,
+                    'project': self.project.pk}]
+        self.client.post('/api/tasks/bulk/', payload, content_type='application/json')
+        self.assertEqual([kind for kind, _ in self.hits('lawn')], ['task'])
+
+        # Writes that bypass the signals are picked up by a rebuild.
+        Task.objects.filter(pk=self.task.pk).update(name='Rake leaves')
+        self.assertEqual(self.hits('leaves'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.hits('leaves'), [('task', self.task.pk)])
+
+        self.project.delete()
+        self.assertEqual(self.hits('leaves lawn garden'), [])
+        self.assertEqual(get_search_backend().rebuild(), {'project': 0, 'task': 0})
+
+    @override_settings(SEARCH_BACKEND='projects.search.SimpleSearchBackend')
+    def test_simple_backend_scans_without_an_index(self):
+        self.assertCountEqual(self.hits('ROSES'), [('task', self.task.pk), ('project', self.project.pk)])
+        self.assertEqual(self.hits('roses', self.bob), [])
+
+
+@override_settings(API_THROTTLE_RATES={'read': '60/min', 'write': '1/min', 'users.read': '1/hour'},
+                   API_THROTTLE_BURSTS={'read': 3, 'write': 1, 'users.read': 1})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner')
+        self.client.force_login(self.user)
+
+    def test_reads_and_writes_have_separate_buckets_per_endpoint(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+        self.assertEqual(self.client.post('/api/tasks/', {}).status_code, 400)
+        response = self.client.post('/api/tasks/', {})
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '60'))
+
+        self.assertEqual(self.client.get('/api/projects/').status_code, 200)
+        self.assertEqual(self.client.get('/api/users/').status_code, 200)
+        self.assertEqual(self.client.get('/api/users/')['Retry-After'], '3600')
+        with override_settings(API_THROTTLE=False):
+            self.assertEqual(self.client.get('/api/users/').status_code, 200)
+
+    def test_bucket_refills_and_concurrent_takes_never_overdraw(self):
+        store = CacheBucketStore(cache)
+        self.assertEqual(store.take('bucket:refill', 0.05, 0), 0)
+        self.assertGreater(store.take('bucket:refill', 0.05, 0), 0)
+        time.sleep(0.06)
+        self.assertEqual(store.take('bucket:refill', 0.05, 0), 0)
+
+        # A burst of 100 and no refill to speak of: exactly 100 of 400 concurrent takes succeed, split
+        # over stores that only share the cache, like workers do.
+        taken = []
+
+        def worker():
+            worker_store = CacheBucketStore(cache)
+            taken.extend(worker_store.take('bucket:burst', 1000, 99 * 1000) == 0 for _ in range(50))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(taken), 100)
+
+    @skipIf(fakeredis is None, 'fakeredis is not installed')
+    def test_redis_script_takes_tokens_in_one_round_trip(self):
+        redis_cache = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://throttle-test/0',
+            'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+        }
+        with override_settings(CACHES={**settings.CACHES, 'throttle': redis_cache}, API_THROTTLE_CACHE='throttle'):
+            store = get_bucket_store()
+            self.assertEqual(type(store).__name__, 'RedisBucketStore')
+            self.assertEqual([store.take('bucket:redis', 1, 2) for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(store.take('bucket:redis', 1, 2), 1, delta=0.05)
+            client = caches['throttle']._cache.get_client(write=False)
+            self.assertGreater(client.pttl(caches['throttle'].make_and_validate_key('bucket:redis')), 2000)
+
+    def test_file_based_cache_fails_the_system_check(self):
+        file_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/throttle'}
+        with override_settings(CACHES={**settings.CACHES, 'throttle': file_cache}, API_THROTTLE_CACHE='throttle'):
+            self.assertEqual([error.id for error in check_throttle_cache(None)], ['projects.E001'])
+            with override_settings(API_THROTTLE=False):
+                self.assertEqual(check_throttle_cache(None), [])
+        self.assertEqual(check_throttle_cache(None), [])
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice')
+        self.bob = User.objects.create_user(username='bob')
+        self.project = Project.objects.create(name='Garden', description='', created_by=self.alice)
+        self.project.members.add(self.alice)
+        self.client.force_login(self.alice)
+
+    def stats(self):
+        response = self.client.get(reverse('stats'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def counts(self, model, pk):
+        row = model.objects.filter(pk=pk).values(*COUNT_FIELDS).first() or dict.fromkeys(COUNT_FIELDS, 0)
+        return [row[field] for field in COUNT_FIELDS]
+
+    def test_rollups_follow_creates_updates_and_deletes(self):
+        task = Task.objects.create(project=self.project, name='Dig', description='', assigned_to=self.alice)
+        other = Task.objects.create(project=self.project, name='Sow', description='', assigned_to=self.alice)
+        self.assertEqual(self.counts(UserTaskRollup, self.alice.pk), [2, 0, 2, 0, 0, 0])
+
+        task.assigned_to = self.bob
+        task.completed, task.progress = True, 100
+        task.save()
+        self.assertEqual(self.counts(UserTaskRollup, self.alice.pk), [1, 0, 1, 0, 0, 0])
+        self.assertEqual(self.counts(UserTaskRollup, self.bob.pk), [0, 1, 0, 0, 0, 1])
+        self.assertEqual(self.counts(ProjectTaskRollup, self.project.pk), [1, 1, 1, 0, 0, 1])
+
+        other.delete()
+        response = self.client.post('/api/tasks/bulk/', [
+            {'name': f'Task {i}', 'description': 'Seeded', 'assigned_to': self.alice.pk, 'project': self.project.pk}
+            for i in range(3)
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        stats = self.stats()
+        # Alice sees her own counts only, and the project she is a member of.
+        self.assertEqual([(row['id'], row['open_tasks']) for row in stats['users']], [(self.alice.pk, 3)])
+        self.assertEqual(stats['projects'], [{
+            'id': self.project.pk, 'name': 'Garden', 'open_tasks': 3, 'completed_tasks': 1,
+            'progress': {'0-24': 3, '25-49': 0, '50-74': 0, '75-100': 1},
+        }])
+
+        self.project.delete()
+        self.assertEqual(self.counts(UserTaskRollup, self.alice.pk), [0] * len(COUNT_FIELDS))
+        self.assertEqual(self.counts(UserTaskRollup, self.bob.pk), [0] * len(COUNT_FIELDS))
+
+    def test_rebuild_reconciles_writes_that_bypass_the_signal(self):
+        for i in range(3):
+            Task.objects.create(project=self.project, name=f'Task {i}', description='', assigned_to=self.alice)
+        Task.objects.filter(name='Task 0').update(completed=True, progress=100)
+        self.assertEqual(self.counts(ProjectTaskRollup, self.project.pk), [3, 0, 3, 0, 0, 0])
+
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        self.assertIn('1 users and 1 projects', out.getvalue())
+        self.assertEqual(self.counts(ProjectTaskRollup, self.project.pk), [2, 1, 2, 0, 0, 1])
+        stats = self.stats()
+        self.assertEqual(stats['rebuilt_at'], stats['updated_at'])
+
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice')
+        self.bob = User.objects.create_user(username='bob')
+        self.project = Project.objects.create(name='Garden', description='Roses', created_by=self.alice)
+        self.project.members.add(self.alice, self.bob)
+        for i in range(5):
+            Task.objects.create(project=self.project, name=f'Plant roses {i}', description='',
+                                assigned_to=self.bob if i % 2 else self.alice, completed=True, progress=100)
+
+    @override_settings(DELETE_CHUNK_SIZE=2)
+    def test_api_delete_removes_tasks_in_chunks_with_their_bookkeeping(self):
+        task_ids = list(self.project.tasks.values_list('id', flat=True))
+        # Counters not recounted yet, as with DEFER_PROGRESS_UPDATES: the size comes from the tasks.
+        Project.objects.filter(pk=self.project.pk).update(total_tasks=0, completed_tasks=0)
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(f'/api/projects/{self.project.pk}/')
+        self.assertEqual(response.status_code, 204)
+        # Three chunks, and the final check for stragglers finds none.
+        deletes = [query for query in context.captured_queries if query['sql'].startswith('DELETE FROM projects_task ')]
+        self.assertEqual(len(deletes), 3)
+
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Project.members.through.objects.exists())
+        tombstones = Tombstone.objects.filter(kind=Tombstone.TASK, user__isnull=False)
+        self.assertEqual(set(tombstones.values_list('object_id', flat=True)), set(task_ids))
+        self.assertEqual(Tombstone.objects.filter(kind=Tombstone.MEMBERSHIP).count(), 2)
+        # Recorded before the memberships were removed: the members and the superusers are told.
+        self.assertCountEqual(Tombstone.objects.filter(kind=Tombstone.PROJECT).values_list('user_id', flat=True),
+                              [self.alice.pk, self.bob.pk, None])
+        self.assertEqual(get_search_backend().search(self.alice, ['roses'], ['project', 'task'], 0, 10), [])
+        self.assertEqual(UserTaskRollup.objects.filter(completed_tasks__gt=0).count(), 0)
+        self.assertFalse(ProjectTaskRollup.objects.exists())
+
+    def test_api_delete_of_a_small_project_is_one_set_based_transaction(self):
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(f'/api/projects/{self.project.pk}/')
+        self.assertEqual(response.status_code, 204)
+        statements = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('DELETE FROM projects_task ')]), 1)
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(Tombstone.objects.filter(kind=Tombstone.TASK).count(), 10)
+        # Not removed in chunks: the memberships go with the project.
+        self.assertEqual(Tombstone.objects.filter(kind=Tombstone.PROJECT, user__isnull=False).count(), 2)
+        self.assertFalse(Tombstone.objects.filter(kind=Tombstone.MEMBERSHIP).exists())
+
+    def test_archive_moves_finished_projects_only(self):
+        unfinished = Project.objects.create(name='Orchard', description='', created_by=self.alice)
+        Task.objects.create(project=unfinished, name='Prune', description='', assigned_to=self.alice)
+        Project.objects.update(updated_at=timezone.now() - timezone.timedelta(days=100))
+
+        out = StringIO()
+        call_command('archive_projects', '--dry-run', stdout=out)
+        self.assertIn('Would archive 1 projects and 5 tasks.', out.getvalue())
+        call_command('archive_projects', '--chunk-size', '2', stdout=out)
+        self.assertIn('Archived 1 projects and 5 tasks', out.getvalue())
+
+        self.assertEqual(list(Project.objects.values_list('name', flat=True)), ['Orchard'])
+        self.assertEqual(list(Task.objects.values_list('name', flat=True)), ['Prune'])
+        archived = ArchivedProject.objects.get()
+        self.assertEqual((archived.name, archived.total_tasks, sorted(archived.member_ids)),
+                         ('Garden', 5, [self.alice.pk, self.bob.pk]))
+        self.assertIsNotNone(archived.archived_at)
+        self.assertEqual(archived.tasks.filter(completed=True, assigned_to=self.bob).count(), 2)
+
+
+class SQLiteConcurrencyTests(SimpleTestCase):
+    alias = 'concurrency'
+    threads = 16
+    transactions = 25
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.settings[self.alias] = {
+            **connections['default'].settings_dict, 'NAME': os.path.join(directory.name, 'db.sqlite3'),
+        }
+        self.addCleanup(connections.settings.pop, self.alias)
+        self.addCleanup(lambda: connections[self.alias].close())
+
+    def test_concurrent_writers_wait_for_the_lock_instead_of_failing(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('CREATE TABLE counter (value integer)')
+            cursor.execute('INSERT INTO counter VALUES (0)')
+
+        errors = []
+        start = threading.Barrier(self.threads)
+
+        def writer():
+            start.wait()
+            try:
+                for _ in range(self.transactions):
+                    # Read-modify-write: a deferred BEGIN would fail once another writer commits in between.
+                    with transaction.atomic(using=self.alias), connections[self.alias].cursor() as cursor:
+                        cursor.execute('SELECT value FROM counter')
+                        cursor.execute('UPDATE counter SET value = %s', [cursor.fetchone()[0] + 1])
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections[self.alias].close()
+
+        threads = [threading.Thread(target=writer) for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('SELECT value FROM counter')
+            self.assertEqual(cursor.fetchone()[0], self.threads * self.transactions)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def test_reads_use_the_replica_until_the_request_writes(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Project), 'default')
+        with request_routing(use_replica=True):
+            self.assertEqual(router.db_for_read(Project), REPLICA_DB_ALIAS)
+            # Authentication data always comes from the primary.
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(Task), 'default')
+            self.assertEqual(router.db_for_read(Project), 'default')
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        def view(request):
+            PrimaryReplicaRouter().db_for_write(Task)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        response = middleware(RequestFactory().post('/'))
+        self.assertEqual(response.cookies['db_pin']['max-age'], 5)
+        request = RequestFactory().get('/', HTTP_COOKIE='db_pin=1')
+        self.assertFalse(middleware.use_replica(request))
+        self.assertTrue(middleware.use_replica(RequestFactory().get('/')))
@@ -0,0 +1,153 @@
+"""
+Token-bucket throttling of the API viewsets and the async API views, per client and endpoint.
+
+Every client (user, or IP address when anonymous) has a bucket per endpoint (the view's
+``throttle_scope``, or the scope the async views pass to ``take_token()``) and kind of request:
+reads draw from the ``read`` bucket, everything else from ``write``. A bucket holds
+``API_THROTTLE_BURSTS[kind]`` tokens and refills at ``API_THROTTLE_RATES[kind]``; a request takes
+one token, and an empty bucket answers ``429 Too Many Requests`` with ``Retry-After``.
+
+Buckets are kept in the ``API_THROTTLE_CACHE`` cache in GCRA form: a single timestamp, the moment
+the bucket will be full again, instead of a token count and a refill time. On a Redis cache a Lua
+script checks and moves it in one atomic round trip, against the Redis server's clock. Other
+backends read and write it while holding a per-bucket lock key taken with the cache's atomic
+``add()``, so workers sharing the cache cannot interleave their updates either; a local-memory
+cache is per process, and so are its buckets. A file-based cache, whose ``add()`` is not atomic,
+fails the system checks.
+"""
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS[1]: the bucket; ARGV: milliseconds per token and the burst allowance in milliseconds. Returns
+# 0 when a token was taken, otherwise the milliseconds until one is available.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + clock[2] / 1000
+local full_at = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+if full_at - tolerance > now then
+    return math.ceil(full_at - tolerance - now)
+end
+redis.call('SET', KEYS[1], string.format('%.3f', full_at + interval), 'PX', math.ceil(full_at + interval - now))
+return 0
+"""
+
+
+def parse_rate(rate):
+    """``'600/min'`` -> seconds per token (DRF's rate format)."""
+    requests, period = rate.split('/')
+    return RATE_PERIODS[period[0]] / int(requests)
+
+
+class CacheBucketStore:
+    """
+    Buckets updated with a get and a set under a lock key per bucket, taken with ``cache.add()``:
+    only requests drawing from the same bucket wait for each other. Four cache round trips a check.
+    """
+    # A holder that died frees the bucket after this many seconds.
+    lock_timeout = 1
+    lock_attempts = 100
+    lock_wait = 0.001
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, interval, tolerance):
+        """Take a token; returns 0, or the seconds until the bucket has one."""
+        lock = f'{key}:lock'
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock, 1, timeout=self.lock_timeout):
+                break
+            time.sleep(self.lock_wait)
+        else:
+            # The client's other requests kept the bucket busy all along: treat this one as over budget.
+            return interval
+        try:
+            now = time.time()
+            full_at = max(self.cache.get(key, now), now)
+            if full_at - tolerance > now:
+                return full_at - tolerance - now
+            self.cache.set(key, full_at + interval, timeout=math.ceil(full_at + interval - now))
+            return 0
+        finally:
+            self.cache.delete(lock)
+
+
+class RedisBucketStore:
+    def __init__(self, cache):
+        self.cache = cache
+        self.scripts = {}
+
+    def take(self, key, interval, tolerance):
+        key = self.cache.make_and_validate_key(key)
+        # Django's RedisCache keeps its redis-py clients on the private _cache attribute.
+        client = self.cache._cache.get_client(key, write=True)
+        script = self.scripts.get(id(client))
+        if script is None:
+            # Runs by EVALSHA, falling back to loading the script once per server.
+            script = self.scripts[id(client)] = client.register_script(GCRA_SCRIPT)
+        return script(keys=[key], args=[interval * 1000, tolerance * 1000]) / 1000
+
+
+@lru_cache(maxsize=None)
+def get_bucket_store():
+    cache = caches[settings.API_THROTTLE_CACHE]
+    return RedisBucketStore(cache) if isinstance(cache, RedisCache) else CacheBucketStore(cache)
+
+
+@receiver(setting_changed)
+def reset_bucket_store(setting, **kwargs):
+    if setting in ('API_THROTTLE_CACHE', 'CACHES'):
+        get_bucket_store.cache_clear()
+
+
+def get_budget(scope, kind):
+    """``(rate, burst)`` of a scope's ``read`` or ``write`` buckets, set per kind or per ``<scope>.<kind>``."""
+    for name in (f'{scope}.{kind}', kind):
+        if name in settings.API_THROTTLE_RATES:
+            burst = settings.API_THROTTLE_BURSTS.get(name, settings.API_THROTTLE_BURSTS[kind])
+            return settings.API_THROTTLE_RATES[name], max(1, burst)
+    return None, None
+
+
+def take_token(scope, kind, client):
+    """Take a token from the client's bucket; returns 0, or the seconds until the bucket has one."""
+    rate, burst = get_budget(scope, kind)
+    if not settings.API_THROTTLE or rate is None:
+        return 0
+    interval = parse_rate(rate)
+    return get_bucket_store().take(f'throttle:{scope}:{kind}:{client}', interval, (burst - 1) * interval)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttles by the view's ``throttle_scope``."""
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return True
+        kind = 'read' if request.method in SAFE_METHODS else 'write'
+        if request.user and request.user.is_authenticated:
+            client = f'user:{request.user.pk}'
+        else:
+            client = f'ip:{self.get_ident(request)}'
+        self.wait_seconds = take_token(scope, kind, client)
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
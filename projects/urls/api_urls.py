@@ -1,4 +1,9 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from ..views import async_api_views
+from ..views.api_search_views import SearchView
+from ..views.api_stats_views import StatsView
+from ..views.api_sync_views import SyncView
 from ..views.api_user_views import UserViewSet
 from ..views.api_project_views import ProjectViewSet
 from ..views.api_task_views import TaskViewSet
@@ -8,4 +13,12 @@ router.register(r'users', UserViewSet, basename='user')
 router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'tasks', TaskViewSet, basename='task')
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('async/projects/', async_api_views.project_list, name='async-project-list'),
+    path('async/projects/<int:pk>/', async_api_views.project_detail, name='async-project-detail'),
+    path('async/tasks/', async_api_views.task_list, name='async-task-list'),
+    path('async/tasks/<int:pk>/', async_api_views.task_detail, name='async-task-detail'),
+]
@@ -1,14 +1,18 @@
 from django.urls import path, include
-from ..views import views_v1
+from ..views import event_views, views_v1
 
 urlpatterns = [
     path('', views_v1.dashboard, name='dashboard'),
+    path('dashboard/cache_stats/', views_v1.dashboard_cache_stats, name='dashboard_cache_stats'),
+    path('metrics/requests/', views_v1.request_metrics, name='request_metrics'),
+    path('events/', event_views.event_stream, name='event_stream'),
     path('signup/', views_v1.signup, name='signup'),
     path('login/', views_v1.user_login, name='login'),
     path('create_project/', views_v1.create_project, name='create_project'),
     path('project/<int:pk>/create_task/', views_v1.create_task, name='create_task'),
     path('create_task/', views_v1.create_task, name='create_task'),
     path('user_list/', views_v1.user_list, name='user_list'),
+    path('users/autocomplete/', views_v1.user_autocomplete, name='user_autocomplete'),
     path('create_user/', views_v1.create_user, name='create_user'),
     path('project/<int:pk>/', views_v1.project_detail, name='project_detail'),
     path('user/<int:pk>/', views_v1.user_detail, name='user_detail'),
@@ -1,50 +1,65 @@
 import logging
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from ..archive import delete_project
 from ..models import Project
 from ..serializers.serializers_v1 import ProjectSerializer
 from ..permissions.project_permission import IsProjectCreator
+from ..exports import PROJECT_EXPORT_FIELDS, streaming_export_response
+from ..log import audit
+from ..renderers import API_PARSER_CLASSES, API_RENDERER_CLASSES
+from .mixins import ConditionalGetMixin, SparseFieldsetViewMixin
 
 logger = logging.getLogger(__name__)
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    renderer_classes = API_RENDERER_CLASSES
+    parser_classes = API_PARSER_CLASSES
+    throttle_scope = 'projects'
     permission_classes = [permissions.IsAuthenticated, IsProjectCreator]
 
     def get_queryset(self):
-        if self.request.user.is_superuser:
-            logger.info(f'Admin {self.request.user.username} is retrieving all projects.')
-            return Project.objects.all()
-        logger.info(f'User {self.request.user.username} is retrieving their projects.')
-        return Project.objects.filter(members=self.request.user)
+        queryset = Project.objects.visible_to(self.request.user)
+        if self.action == 'retrieve' and self.sparse_columns() is not None:
+            # The validators and the object permission need these whatever was asked for.
+            queryset = queryset.only(*self.sparse_columns(), 'updated_at', 'created_by')
+        return queryset
 
     def get_serializer_class(self):
         return ProjectSerializer
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
-        logger.info(f'User {self.request.user.username} created project {serializer.instance.name}.')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        logger.info(f'Project {serializer.instance.name} created by user {self.request.user.username}.')
+        audit(logger, 'project.created', user=request.user.username, project=serializer.instance.pk)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        logger.info(f'User {self.request.user.username} listed projects.')
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.collection_validators(queryset)
+        response = self.not_modified(request, etag, last_modified)
+        if response is None:
+            response = self.paginated_values_response(queryset)
+        audit(logger, 'project.listed', user=request.user.username, status=response.status_code)
+        return self.add_validators(response, etag, last_modified)
 
     def retrieve(self, request, pk=None, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        logger.info(f'User {self.request.user.username} retrieved project {instance.name}.')
-        return Response(serializer.data)
+        etag, last_modified = self.instance_validators(instance)
+        response = self.not_modified(request, etag, last_modified)
+        if response is None:
+            serializer = self.get_serializer(instance)
+            response = Response(serializer.data)
+        audit(logger, 'project.retrieved', user=request.user.username, project=instance.pk, status=response.status_code)
+        return self.add_validators(response, etag, last_modified)
 
     def update(self, request, pk=None, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -52,11 +67,21 @@ class ProjectViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        logger.info(f'User {self.request.user.username} updated project {instance.name}.')
+        audit(logger, 'project.updated', user=request.user.username, project=instance.pk)
         return Response(serializer.data)
 
+    def perform_destroy(self, instance):
+        # Chunked: the Collector would load every task and hold the write lock until all are gone.
+        delete_project(instance)
+
     def destroy(self, request, pk=None, *args, **kwargs):
         instance = self.get_object()
+        project_id = instance.pk
         self.perform_destroy(instance)
-        logger.info(f'User {self.request.user.username} deleted project {instance.name}.')
+        audit(logger, 'project.deleted', user=request.user.username, project=project_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'], url_path='export/(?P<file_format>csv|ndjson)')
+    def export(self, request, file_format=None, *args, **kwargs):
+        audit(logger, 'project.exported', user=request.user.username, format=file_format)
+        return streaming_export_response(request, self.get_queryset(), PROJECT_EXPORT_FIELDS, file_format, 'projects')
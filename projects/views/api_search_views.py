@@ -0,0 +1,82 @@
+import logging
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+from django.conf import settings
+from ..search import SEARCH_KINDS, get_search_backend, query_terms
+from ..log import audit
+from ..renderers import API_PARSER_CLASSES, API_RENDERER_CLASSES
+
+logger = logging.getLogger(__name__)
+
+# Columns returned per hit, besides its type.
+HIT_FIELDS = {'project': ('id', 'name', 'progress'), 'task': ('id', 'name', 'project', 'progress', 'completed')}
+
+
+class SearchView(APIView):
+    """
+    ``GET /api/search/?q=<words>``: the visible projects and tasks whose name or description contains
+    every word (``word*`` matches a prefix), best matches first. ``?type=project`` or ``?type=task``
+    searches one kind only. Page with ``next`` (``?page_size=N``; ``offset`` counts the hits skipped).
+    """
+    renderer_classes = API_RENDERER_CLASSES
+    parser_classes = API_PARSER_CLASSES
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.query_params['page_size'])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+    def get_offset(self):
+        try:
+            return max(0, int(self.request.query_params.get('offset', 0)))
+        except ValueError:
+            raise ValidationError({'offset': ['A non-negative integer is required.']})
+
+    def get_kinds(self):
+        kind = self.request.query_params.get('type')
+        if kind is None:
+            return list(SEARCH_KINDS)
+        if kind not in SEARCH_KINDS:
+            raise ValidationError({'type': [f"Choose one of {', '.join(SEARCH_KINDS)}."]})
+        return [kind]
+
+    def get(self, request, *args, **kwargs):
+        terms = query_terms(request.query_params.get('q'))
+        if not terms:
+            raise ValidationError({'q': ['Enter at least one word to search for.']})
+        kinds = self.get_kinds()
+        page_size, offset = self.get_page_size(), self.get_offset()
+
+        hits = get_search_backend().search(request.user, terms, kinds, offset, page_size + 1)
+        has_more = len(hits) > page_size
+        results = self.describe(hits[:page_size])
+        audit(logger, 'search.served', user=request.user.username, terms=len(terms), hits=len(results), offset=offset)
+        return Response({
+            'next': self.page_link(offset + page_size) if has_more else None,
+            'previous': self.page_link(max(0, offset - page_size)) if offset else None,
+            'results': results,
+        })
+
+    def describe(self, hits):
+        """The hits' rows in rank order, read with one query per kind."""
+        rows = {}
+        for kind, model in SEARCH_KINDS.items():
+            ids = [hit.id for hit in hits if hit.kind == kind]
+            if ids:
+                queryset = model.objects.visible_to(self.request.user).filter(pk__in=ids)
+                rows[kind] = {row['id']: row for row in queryset.values(*HIT_FIELDS[kind])}
+        return [
+            {'type': hit.kind, **rows[hit.kind][hit.id]}
+            for hit in hits if hit.id in rows.get(hit.kind, {})
+        ]
+
+    def page_link(self, offset):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, 'offset', offset) if offset else remove_query_param(url, 'offset')
@@ -0,0 +1,53 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from ..models import ProjectTaskRollup, UserTaskRollup
+from ..rollups import COUNT_FIELDS, PROGRESS_BUCKETS
+from ..renderers import API_PARSER_CLASSES, API_RENDERER_CLASSES
+
+
+class StatsView(APIView):
+    """
+    ``GET /api/stats/``: open and completed task counts and how tasks spread over progress ranges,
+    per assignee and per project, read from the rollup tables. Superusers get every user and project,
+    others their own counts and the projects they are members of. ``updated_at`` is the latest change
+    applied to these rows, ``rebuilt_at`` the latest reconciliation by ``manage.py rebuild_rollups``.
+    """
+    renderer_classes = API_RENDERER_CLASSES
+    parser_classes = API_PARSER_CLASSES
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'stats'
+
+    def get_querysets(self):
+        user = self.request.user
+        users = UserTaskRollup.objects.all()
+        projects = ProjectTaskRollup.objects.all()
+        if not user.is_superuser:
+            users = users.filter(user=user)
+            projects = projects.filter(project__members=user)
+        return (
+            users.order_by('user_id').values('user_id', 'user__username', 'updated_at', 'rebuilt_at', *COUNT_FIELDS),
+            projects.order_by('project_id').values('project_id', 'project__name', 'updated_at', 'rebuilt_at',
+                                                   *COUNT_FIELDS),
+        )
+
+    def get(self, request, *args, **kwargs):
+        users, projects = (list(rows) for rows in self.get_querysets())
+        rows = users + projects
+        return Response({
+            'users': [{'id': row['user_id'], 'username': row['user__username'], **self.counts(row)} for row in users],
+            'projects': [{'id': row['project_id'], 'name': row['project__name'], **self.counts(row)}
+                         for row in projects],
+            'updated_at': max((row['updated_at'] for row in rows), default=None),
+            'rebuilt_at': max((row['rebuilt_at'] for row in rows if row['rebuilt_at']), default=None),
+        })
+
+    @staticmethod
+    def counts(row):
+        return {
+            'open_tasks': row['open_tasks'],
+            'completed_tasks': row['completed_tasks'],
+            # e.g. {"0-24": 3, "25-49": 0, "50-74": 1, "75-100": 8}
+            'progress': {field.removeprefix('progress_').replace('_', '-'): row[field]
+                         for field, _, _ in PROGRESS_BUCKETS},
+        }
@@ -0,0 +1,75 @@
+import logging
+from rest_framework import permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.utils import timezone
+from ..models import Project, Task, Tombstone
+from ..serializers.serializers_v1 import ProjectSerializer, TaskSerializer
+from ..sync import (SYNC_STREAMS, InvalidSyncToken, advance, decode_token, encode_token, initial_cursors,
+                    read_stream, token_expired)
+from ..log import audit
+from ..renderers import API_PARSER_CLASSES, API_RENDERER_CLASSES
+
+logger = logging.getLogger(__name__)
+
+
+class SyncView(APIView):
+    """
+    ``GET /api/sync/?since=<token>``: the projects and tasks created or changed and the rows deleted
+    (or gone out of scope) since ``token``. Omit ``since`` for a first, full sync. While ``has_more``
+    is true, call again with ``next``; once it is false, keep ``next`` for the following sync.
+    Apply ``deleted`` before upserting ``projects`` and ``tasks``; rows may repeat across syncs.
+    """
+    renderer_classes = API_RENDERER_CLASSES
+    parser_classes = API_PARSER_CLASSES
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.query_params['page_size'])
+        except (KeyError, ValueError):
+            return settings.SYNC_PAGE_SIZE
+        return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+    def get_streams(self):
+        user = self.request.user
+        return {
+            'projects': Project.objects.visible_to(user).prefetch_related('members'),
+            'tasks': Task.objects.visible_to(user),
+            # User-less tombstones are the superusers' view of every deletion.
+            'deleted': Tombstone.objects.filter(user=None if user.is_superuser else user),
+        }
+
+    def get(self, request, *args, **kwargs):
+        now = timezone.now()
+        token = request.query_params.get('since')
+        try:
+            cursors = decode_token(token) if token else initial_cursors(now)
+        except InvalidSyncToken as exc:
+            raise ValidationError({'since': [str(exc)]})
+        if token_expired(cursors, now):
+            return Response({'detail': 'Sync token expired; run a full sync without "since".'},
+                            status=status.HTTP_410_GONE)
+
+        page_size = self.get_page_size()
+        rows, next_cursors, has_more = {}, {}, False
+        for name, queryset in self.get_streams().items():
+            field = SYNC_STREAMS[name]
+            rows[name], more = read_stream(queryset, field, cursors[name], page_size)
+            next_cursors[name] = advance(cursors[name], field, rows[name], more, now)
+            has_more |= more
+
+        audit(logger, 'sync.served', user=request.user.username, projects=len(rows['projects']),
+              tasks=len(rows['tasks']), deleted=len(rows['deleted']), more=has_more)
+        return Response({
+            'projects': ProjectSerializer(rows['projects'], many=True).data,
+            'tasks': TaskSerializer(rows['tasks'], many=True).data,
+            'deleted': [
+                {'kind': tombstone.kind, 'id': tombstone.object_id, 'deleted_at': tombstone.deleted_at}
+                for tombstone in rows['deleted']
+            ],
+            'has_more': has_more,
+            'next': encode_token(next_cursors),
+        })
@@ -1,56 +1,73 @@
 import logging
 from rest_framework import viewsets, permissions, status
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from ..models import Task, Project
-from ..serializers.serializers_v1 import TaskSerializer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ..models import Task, TaskState, tasks_changed
+from ..serializers.serializers_v1 import TaskSerializer, TaskProgressSerializer
+from ..background import refresh_task_counters
+from ..events import publish_task_changes
+from ..exports import TASK_EXPORT_FIELDS, streaming_export_response
 from ..permissions.task_permission import IsTaskAssignee
+from ..log import audit
+from ..renderers import API_PARSER_CLASSES, API_RENDERER_CLASSES
+from .mixins import ConditionalGetMixin, SparseFieldsetViewMixin
 
 logger = logging.getLogger(__name__)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    renderer_classes = API_RENDERER_CLASSES
+    parser_classes = API_PARSER_CLASSES
+    throttle_scope = 'tasks'
     permission_classes = [permissions.IsAuthenticated, IsTaskAssignee]
 
     def get_queryset(self):
-        if self.request.user.is_superuser:
-            logger.info(f'Admin {self.request.user.username} is retrieving all tasks.')
-            return Task.objects.all()
-        logger.info(f'User {self.request.user.username} is retrieving their assigned tasks.')
-        return Task.objects.filter(assigned_to=self.request.user)
+        queryset = Task.objects.visible_to(self.request.user)
+        if self.action == 'retrieve' and self.sparse_columns() is not None:
+            # The validators and the object permission need these whatever was asked for.
+            queryset = queryset.only(*self.sparse_columns(), 'updated_at', 'assigned_to')
+        return queryset
 
     def get_serializer_class(self):
         return TaskSerializer
 
     def perform_create(self, serializer):
-        project = get_object_or_404(Project, pk=self.request.data['project'])
-        if self.request.user != project.created_by:
-            logger.warning(
-                f'User {self.request.user.username} tried to add a task to project {project.name} without permission.')
+        project = serializer.validated_data['project']
+        if project.created_by_id != self.request.user.id:
+            audit(logger, 'task.create_denied', logging.WARNING, user=self.request.user.username, project=project.pk)
             raise PermissionDenied("You are not allowed to add tasks to this project.")
         serializer.save()
-        logger.info(
-            f'User {self.request.user.username} created task {serializer.instance.name} in project {project.name}.')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        logger.info(f'Task {serializer.instance.name} created by user {self.request.user.username}.')
+        audit(logger, 'task.created', user=request.user.username, task=serializer.instance.pk,
+              project=serializer.instance.project_id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        logger.info(f'User {self.request.user.username} listed tasks.')
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.collection_validators(queryset)
+        response = self.not_modified(request, etag, last_modified)
+        if response is None:
+            response = self.paginated_values_response(queryset)
+        audit(logger, 'task.listed', user=request.user.username, status=response.status_code)
+        return self.add_validators(response, etag, last_modified)
 
     def retrieve(self, request, pk=None, *args, **kwargs):
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        logger.info(f'User {self.request.user.username} retrieved task {instance.name}.')
-        return Response(serializer.data)
+        etag, last_modified = self.instance_validators(instance)
+        response = self.not_modified(request, etag, last_modified)
+        if response is None:
+            serializer = self.get_serializer(instance)
+            response = Response(serializer.data)
+        audit(logger, 'task.retrieved', user=request.user.username, task=instance.pk, status=response.status_code)
+        return self.add_validators(response, etag, last_modified)
 
     def update(self, request, pk=None, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -58,11 +75,60 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        logger.info(f'User {self.request.user.username} updated task {instance.name}.')
+        audit(logger, 'task.updated', user=request.user.username, task=instance.pk)
         return Response(serializer.data)
 
     def destroy(self, request, pk=None, *args, **kwargs):
         instance = self.get_object()
+        task_id = instance.pk
         self.perform_destroy(instance)
-        logger.info(f'User {self.request.user.username} deleted task {instance.name}.')
+        audit(logger, 'task.deleted', user=request.user.username, task=task_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True, max_length=settings.TASK_BULK_MAX_ITEMS)
+        serializer.is_valid(raise_exception=True)
+        projects = {item['project'] for item in serializer.validated_data}
+        forbidden = sorted(project.pk for project in projects if project.created_by_id != request.user.id)
+        if forbidden:
+            audit(logger, 'task.bulk_create_denied', logging.WARNING, user=request.user.username, projects=forbidden)
+            raise PermissionDenied(f"You are not allowed to add tasks to projects {forbidden}.")
+        with transaction.atomic():
+            serializer.save()
+        audit(logger, 'task.bulk_created', user=request.user.username, count=len(serializer.instance))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        serializer = TaskProgressSerializer(data=request.data, many=True, max_length=settings.TASK_BULK_MAX_ITEMS)
+        serializer.is_valid(raise_exception=True)
+        changes = {item.pop('id'): item for item in serializer.validated_data}
+        fields = sorted({field for item in changes.values() for field in item})
+        with transaction.atomic():
+            # The old states come from the locked rows: a task completed since the client read it counts once.
+            tasks = list(self.get_queryset().select_for_update().filter(pk__in=changes))
+            missing = sorted(set(changes) - {task.pk for task in tasks})
+            if missing:
+                raise NotFound(f"Tasks {missing} do not exist.")
+            now = timezone.now()
+            old_states = {}
+            for task in tasks:
+                self.check_object_permissions(request, task)
+                old_states[task.pk] = TaskState.of(task)
+                for field, value in changes[task.pk].items():
+                    setattr(task, field, value)
+                task.updated_at = now
+            # Only what was submitted: a progress-only update leaves a concurrent completion alone.
+            Task.objects.bulk_update(tasks, [*fields, 'updated_at'])
+            refresh_task_counters({task.project_id for task in tasks})
+            # bulk_update() sends no post_save, so announce the changed tasks here.
+            tasks_changed.send(sender=Task, changes=[(old_states[task.pk], TaskState.of(task)) for task in tasks])
+            transaction.on_commit(lambda: publish_task_changes(tasks))
+        audit(logger, 'task.bulk_updated', user=request.user.username, count=len(tasks))
+        return Response(TaskSerializer(tasks, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='export/(?P<file_format>csv|ndjson)')
+    def export(self, request, file_format=None, *args, **kwargs):
+        audit(logger, 'task.exported', user=request.user.username, format=file_format)
+        return streaming_export_response(request, self.get_queryset(), TASK_EXPORT_FIELDS, file_format, 'tasks')
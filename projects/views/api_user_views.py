@@ -3,16 +3,24 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from ..serializers.serializers_v1 import UserSerializer
+from ..log import audit
+from ..renderers import API_PARSER_CLASSES, API_RENDERER_CLASSES
+from .mixins import SparseFieldsetViewMixin
 
 logger = logging.getLogger(__name__)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    renderer_classes = API_RENDERER_CLASSES
+    parser_classes = API_PARSER_CLASSES
+    throttle_scope = 'users'
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        logger.info(f'User {self.request.user.username} is retrieving the user list.')
-        return User.objects.all()
+        queryset = User.objects.all()
+        if self.action == 'retrieve' and self.sparse_columns() is not None:
+            queryset = queryset.only(*self.sparse_columns())
+        return queryset
 
     def get_serializer_class(self):
         return UserSerializer
@@ -21,19 +29,19 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        logger.info(f'User {request.user.username} created new user {serializer.instance.username}.')
+        audit(logger, 'user.created', user=request.user.username, target=serializer.instance.pk)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        logger.info(f'User {request.user.username} listed users.')
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        response = self.paginated_values_response(queryset)
+        audit(logger, 'user.listed', user=request.user.username)
+        return response
 
     def retrieve(self, request, pk=None, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance)
-        logger.info(f'User {request.user.username} retrieved details for user {instance.username}.')
+        audit(logger, 'user.retrieved', user=request.user.username, target=instance.pk)
         return Response(serializer.data)
 
     def update(self, request, pk=None, *args, **kwargs):
@@ -42,11 +50,12 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        logger.info(f'User {request.user.username} updated user {instance.username}.')
+        audit(logger, 'user.updated', user=request.user.username, target=instance.pk)
         return Response(serializer.data)
 
     def destroy(self, request, pk=None, *args, **kwargs):
         instance = self.get_object()
+        user_id = instance.pk
         self.perform_destroy(instance)
-        logger.info(f'User {request.user.username} deleted user {instance.username}.')
+        audit(logger, 'user.deleted', user=request.user.username, target=user_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
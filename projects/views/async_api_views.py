@@ -0,0 +1,169 @@
+"""
+Async, read-only variants of the project and task list/retrieve endpoints.
+
+They return the same representations as ``ProjectSerializer``/``TaskSerializer`` but read them with
+the async ORM straight into dicts, so under ASGI a slow query parks a coroutine instead of a worker
+thread. Authentication is by session; lists are keyset-paginated with ``?after=<id>&page_size=N``.
+Reads draw from the same token buckets as the viewsets' (``projects`` and ``tasks`` scopes).
+"""
+import logging
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import Throttled
+
+from ..log import audit
+from ..models import Project, Task
+from ..throttling import take_token
+from .mixins import COLLECTION_PROBE, ConditionalGetMixin, collection_etag, instance_etag, settled_last_modified
+
+logger = logging.getLogger(__name__)
+
+PROJECT_FIELDS = ('id', 'name', 'description', 'created_by', 'progress')
+TASK_FIELDS = ('id', 'name', 'description', 'assigned_to', 'project', 'completed', 'progress')
+
+# Representations are always JSON. With the suffix, detail ETags match the sync endpoints'; collection
+# ETags never do, since they hash the request path.
+RENDERER_FORMAT = 'json'
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+async def authenticated_user(request):
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+async def throttled(user, scope):
+    """The viewsets' ``429`` response when the user's read bucket for ``scope`` is empty, else None."""
+    wait = await sync_to_async(take_token)(scope, 'read', f'user:{user.pk}')
+    if not wait:
+        return None
+    exc = Throttled(wait)
+    response = error(exc.detail, exc.status_code)
+    response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+def page_params(request):
+    """Return ``(page_size, after)``; a malformed ``after`` raises ``ValueError``."""
+    try:
+        page_size = int(request.GET['page_size'])
+    except (KeyError, ValueError):
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size = max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+    return page_size, int(request.GET.get('after', 0))
+
+
+async def paginated_rows(request, queryset, fields):
+    """One page of ``queryset`` as dicts, read past ``?after=`` in id order, and the next page's URL."""
+    page_size, after = page_params(request)
+    page = queryset.filter(pk__gt=after).order_by('id').values(*fields)[:page_size + 1]
+    rows = [row async for row in page.aiterator()]
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        params = request.GET.copy()
+        params['after'] = rows[-1]['id']
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return rows, next_url
+
+
+async def attach_members(rows):
+    members = defaultdict(list)
+    memberships = (
+        Project.members.through.objects.filter(project_id__in=[row['id'] for row in rows])
+        .order_by('id').values('project_id', 'user_id')
+    )
+    async for membership in memberships.aiterator():
+        members[membership['project_id']].append(membership['user_id'])
+    for row in rows:
+        row['members'] = members[row['id']]
+    return rows
+
+
+async def list_response(request, user, queryset, fields, event, attach=None):
+    probe = await queryset.order_by().aaggregate(**COLLECTION_PROBE)
+    etag = collection_etag(user.pk, request.get_full_path(), probe, RENDERER_FORMAT)
+    response = ConditionalGetMixin.not_modified(request, etag, None)
+    if response is None:
+        try:
+            rows, next_url = await paginated_rows(request, queryset, fields)
+        except ValueError:
+            return error('Invalid cursor', 404)
+        if attach is not None:
+            rows = await attach(rows)
+        response = JsonResponse({'next': next_url, 'previous': None, 'results': rows})
+    audit(logger, event, user=user.username, status=response.status_code)
+    return ConditionalGetMixin.add_validators(response, etag, None)
+
+
+async def detail_response(request, user, queryset, pk, fields, event, attach=None):
+    model = queryset.model
+    try:
+        row = await queryset.values(*fields, 'updated_at').aget(pk=pk)
+    except model.DoesNotExist:
+        return error(f'No {model._meta.object_name} matches the given query.', 404)
+    updated_at = row.pop('updated_at')
+    etag = instance_etag(model._meta.label_lower, row['id'], updated_at, RENDERER_FORMAT)
+    last_modified = settled_last_modified(updated_at)
+    response = ConditionalGetMixin.not_modified(request, etag, last_modified)
+    if response is None:
+        if attach is not None:
+            [row] = await attach([row])
+        response = JsonResponse(row)
+    audit(logger, event, user=user.username, **{model._meta.model_name: pk}, status=response.status_code)
+    return ConditionalGetMixin.add_validators(response, etag, last_modified)
+
+
+@require_safe
+async def project_list(request):
+    user = await authenticated_user(request)
+    if user is None:
+        return error('Authentication credentials were not provided.', 403)
+    response = await throttled(user, 'projects')
+    if response is not None:
+        return response
+    queryset = Project.objects.visible_to(user)
+    return await list_response(request, user, queryset, PROJECT_FIELDS, 'project.listed', attach_members)
+
+
+@require_safe
+async def project_detail(request, pk):
+    user = await authenticated_user(request)
+    if user is None:
+        return error('Authentication credentials were not provided.', 403)
+    response = await throttled(user, 'projects')
+    if response is not None:
+        return response
+    queryset = Project.objects.visible_to(user)
+    return await detail_response(request, user, queryset, pk, PROJECT_FIELDS, 'project.retrieved', attach_members)
+
+
+@require_safe
+async def task_list(request):
+    user = await authenticated_user(request)
+    if user is None:
+        return error('Authentication credentials were not provided.', 403)
+    response = await throttled(user, 'tasks')
+    if response is not None:
+        return response
+    queryset = Task.objects.visible_to(user)
+    return await list_response(request, user, queryset, TASK_FIELDS, 'task.listed')
+
+
+@require_safe
+async def task_detail(request, pk):
+    user = await authenticated_user(request)
+    if user is None:
+        return error('Authentication credentials were not provided.', 403)
+    response = await throttled(user, 'tasks')
+    if response is not None:
+        return response
+    queryset = Task.objects.visible_to(user)
+    return await detail_response(request, user, queryset, pk, TASK_FIELDS, 'task.retrieved')
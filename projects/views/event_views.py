@@ -0,0 +1,62 @@
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+
+from ..events import ALL_PROJECTS_CHANNEL, get_broker, project_channel
+from ..log import audit
+from ..models import Project
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event_id, message):
+    data = json.dumps(message['data'], separators=(',', ':'))
+    return f"id: {event_id}\nevent: {message['event']}\ndata: {data}\n\n".encode()
+
+
+async def event_source(channels):
+    """Yield Server-Sent Events for ``channels`` until the client disconnects."""
+    async with get_broker().subscribe(channels) as subscription:
+        yield b'retry: 5000\n\n'
+        event_id = 0
+        while True:
+            try:
+                message = await subscription.get(timeout=settings.EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            event_id += 1
+            yield format_event(event_id, message)
+
+
+async def event_stream(request):
+    """
+    Stream ``project`` (progress and task counters) and ``task`` (progress/completion) events for
+    the projects the user is a member of. Served from the event loop, so run the project under ASGI;
+    the subscription is fixed when the stream opens and the client's reconnect picks up new memberships.
+    Under WSGI the stream would never end, holding a worker while its output buffers: that gets a 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        audit(logger, 'events.unavailable', logging.WARNING, path=request.path)
+        return HttpResponse('Live events need the ASGI application.', status=501, content_type='text/plain')
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if user.is_superuser:
+        channels = [ALL_PROJECTS_CHANNEL]
+    else:
+        channels = [
+            project_channel(project_id)
+            async for project_id in Project.objects.visible_to(user).values_list('id', flat=True)
+        ]
+    audit(logger, 'events.subscribed', user=user.username, projects=len(channels))
+    response = StreamingHttpResponse(event_source(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx and similar proxies from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
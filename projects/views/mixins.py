@@ -0,0 +1,106 @@
+import hashlib
+import time
+from functools import cached_property
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+
+from ..serializers.serializers_v1 import ValuesRepresentation
+
+
+# Changes whenever a row is added, edited, removed or leaves the requester's scope.
+COLLECTION_PROBE = {'count': Count('pk'), 'last': Max('updated_at')}
+
+
+def collection_etag(user_id, path, probe, renderer_format):
+    """ETag of a collection from its ``COUNT``/``MAX(updated_at)`` probe, the requester and the full path."""
+    last_modified = probe['last']
+    version = f"{user_id}:{probe['count']}:{last_modified and last_modified.isoformat()}"
+    digest = hashlib.md5(f'{version}:{path}'.encode()).hexdigest()
+    return quote_etag(f'{digest}-{renderer_format}')
+
+
+def instance_etag(label, pk, updated_at, renderer_format):
+    return quote_etag(f'{label}-{pk}-{updated_at.timestamp()}-{renderer_format}')
+
+
+def settled_last_modified(updated_at):
+    """
+    ``updated_at`` as a Last-Modified value once its second is over, else None. HTTP dates have whole
+    seconds: a change later in the same second would carry the same date, and If-Modified-Since
+    would answer 304 for it.
+    """
+    if int(updated_at.timestamp()) >= int(time.time()):
+        return None
+    return updated_at
+
+
+class ConditionalGetMixin:
+    """
+    Answers If-None-Match / If-Modified-Since for list and retrieve with 304 before serializing.
+
+    A single instance is validated by its ``updated_at``. A collection is validated by the ETag of a
+    ``COUNT``/``MAX(updated_at)`` probe over the requesting user's visible rows, which changes
+    whenever a row is added, edited, removed or leaves the user's scope; it gets no Last-Modified,
+    as ``MAX(updated_at)`` alone does not move when a row is removed.
+    """
+
+    def collection_validators(self, queryset):
+        probe = queryset.prefetch_related(None).order_by().aggregate(**COLLECTION_PROBE)
+        etag = collection_etag(self.request.user.pk, self.request.get_full_path(), probe,
+                               self.request.accepted_renderer.format)
+        return etag, None
+
+    def instance_validators(self, instance):
+        etag = instance_etag(instance._meta.label_lower, instance.pk, instance.updated_at,
+                             self.request.accepted_renderer.format)
+        return etag, settled_last_modified(instance.updated_at)
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    @staticmethod
+    def add_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class SparseFieldsetViewMixin:
+    """
+    ``?fields=id,name`` on GET limits the representation, and the columns read, to those fields.
+    List pages skip model instances altogether and are rendered from ``values()`` rows.
+    """
+
+    @cached_property
+    def requested_fields(self):
+        raw = self.request.query_params.get('fields') if self.request.method == 'GET' else None
+        if not raw:
+            return None
+        requested = [name.strip() for name in raw.split(',') if name.strip()]
+        available = self.get_serializer_class()().fields
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise ValidationError({'fields': [f"Unknown fields: {', '.join(unknown)}."]})
+        return requested
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields is not None:
+            kwargs.setdefault('fields', self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def sparse_columns(self):
+        """Concrete columns behind the requested fields, for ``.only()``; None without ``?fields=``."""
+        if self.requested_fields is None:
+            return None
+        return list(ValuesRepresentation(self.get_serializer()).columns.values())
+
+    def paginated_values_response(self, queryset):
+        representation = ValuesRepresentation(self.get_serializer())
+        page = self.paginate_queryset(representation.values(queryset))
+        return self.get_paginated_response(representation.to_representation(page))
@@ -1,15 +1,25 @@
 import logging
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
+from django.template.loader import render_to_string
+from .. import cache as dashboard_cache
+from .. import metrics
+from ..log import audit
+from ..permissions.membership import membership_for
 from ..forms import ProjectForm, TaskForm, UserCreationForm, TaskProgressForm, AddMemberForm
 from ..models import Project, Task
 from django.contrib.auth.forms import UserCreationForm as AuthUserCreationForm, AuthenticationForm
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.functions import Lower
 
 logger = logging.getLogger(__name__)
 
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 50
+
 
 def signup(request):
     if request.method == 'POST':
@@ -17,10 +27,10 @@ def signup(request):
         if form.is_valid():
             user = form.save()
             login(request, user)
-            logger.info(f'User {user.username} signed up and logged in.')
+            audit(logger, 'user.signed_up', user=user.username)
             return redirect('dashboard')
         else:
-            logger.warning('User signup failed. Invalid form data.')
+            audit(logger, 'user.signup_invalid', logging.WARNING)
     else:
         form = AuthUserCreationForm()
     return render(request, 'signup.html', {'form': form})
@@ -32,10 +42,10 @@ def user_login(request):
         if form.is_valid():
             user = form.get_user()
             login(request, user)
-            logger.info(f'User {user.username} logged in.')
+            audit(logger, 'user.logged_in', user=user.username)
             return redirect('dashboard')
         else:
-            logger.warning('User login failed. Invalid form data.')
+            audit(logger, 'user.login_invalid', logging.WARNING)
     else:
         form = AuthenticationForm()
     return render(request, 'login.html', {'form': form})
@@ -43,13 +53,30 @@ def user_login(request):
 
 @login_required
 def dashboard(request):
-    if request.user.is_superuser:
-        projects = Project.objects.all()
-        logger.info(f'Admin {request.user.username} accessed the dashboard.')
-    else:
-        projects = Project.objects.filter(members=request.user)
-        logger.info(f'User {request.user.username} accessed the dashboard.')
-    return render(request, 'dashboard.html', {'projects': projects})
+    cache_key = dashboard_cache.dashboard_cache_key(request.user)
+    projects_html = dashboard_cache.get_dashboard_fragment(cache_key)
+    if projects_html is None:
+        projects = Project.objects.visible_to(request.user).only('id', 'name', 'progress')
+        projects_html = render_to_string('dashboard_projects.html', {'projects': projects})
+        dashboard_cache.set_dashboard_fragment(cache_key, projects_html)
+    audit(logger, 'dashboard.viewed', user=request.user.username)
+    return render(request, 'dashboard.html', {'projects_html': projects_html})
+
+
+@login_required
+def dashboard_cache_stats(request):
+    if not request.user.is_superuser:
+        audit(logger, 'dashboard.cache_stats_denied', logging.WARNING, user=request.user.username)
+        return HttpResponseForbidden()
+    return JsonResponse(dashboard_cache.dashboard_cache_stats())
+
+
+@login_required
+def request_metrics(request):
+    if not request.user.is_superuser:
+        audit(logger, 'metrics.denied', logging.WARNING, user=request.user.username)
+        return HttpResponseForbidden()
+    return JsonResponse(metrics.request_metrics.snapshot())
 
 
 @login_required
@@ -61,10 +88,10 @@ def create_project(request):
             project.created_by = request.user
             project.save()
             form.save_m2m()  # Save the many-to-many data for the form
-            logger.info(f'User {request.user.username} created project {project.name}.')
+            audit(logger, 'project.created', user=request.user.username, project=project.pk)
             return redirect('dashboard')
         else:
-            logger.warning('Project creation failed. Invalid form data.')
+            audit(logger, 'project.create_invalid', logging.WARNING, user=request.user.username)
     else:
         form = ProjectForm()
     return render(request, 'create_project.html', {'form': form})
@@ -73,22 +100,46 @@ def create_project(request):
 @login_required
 def project_detail(request, pk):
     project = get_object_or_404(Project, pk=pk)
-    if request.user.is_superuser or request.user in project.members.all():
-        tasks = project.tasks.all()
-        logger.info(f'User {request.user.username} accessed details for project {project.name}.')
-        return render(request, 'project_detail.html', {'project': project, 'tasks': tasks})
+    if request.user.is_superuser or membership_for(request).is_member(project.pk):
+        members = project.members.only('id', 'username')
+        tasks = project.tasks.select_related('assigned_to').only(
+            'id', 'name', 'completed', 'project', 'assigned_to__username')
+        audit(logger, 'project.viewed', user=request.user.username, project=project.pk)
+        return render(request, 'project_detail.html', {'project': project, 'members': members, 'tasks': tasks})
     else:
-        logger.warning(f'User {request.user.username} tried to access forbidden project {project.name}.')
+        audit(logger, 'project.view_denied', logging.WARNING, user=request.user.username, project=project.pk)
         return HttpResponseForbidden()
 
 
 @login_required
 def user_list(request):
     users = User.objects.all()
-    logger.info(f'User {request.user.username} accessed the user list.')
+    audit(logger, 'user.listed', user=request.user.username)
     return render(request, 'user_list.html', {'users': users})
 
 
+@login_required
+def user_autocomplete(request):
+    """Users whose username or email starts with ``q`` (case-insensitive), for the form pickers."""
+    term = request.GET.get('q', '').strip().lower()
+    if not term:
+        return JsonResponse({'results': []})
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    # A range over the lowered column instead of LIKE/istartswith, so the LOWER() expression indexes are used.
+    upper = term + '\U0010ffff'
+    users = (
+        User.objects.alias(username_lower=Lower('username'), email_lower=Lower('email'))
+        .filter(Q(username_lower__gte=term, username_lower__lt=upper)
+                | Q(email_lower__gte=term, email_lower__lt=upper))
+        .order_by('username')
+        .values('id', 'username', 'email')[:max(limit, 1)]
+    )
+    return JsonResponse({'results': list(users)})
+
+
 @login_required
 def create_user(request):
     if request.method == 'POST':
@@ -99,10 +150,10 @@ def create_user(request):
                 email=form.cleaned_data['email'],
                 password=form.cleaned_data['password']
             )
-            logger.info(f'User {request.user.username} created new user {user.username}.')
+            audit(logger, 'user.created', user=request.user.username, target=user.pk)
             return redirect('user_list')
         else:
-            logger.warning('User creation failed. Invalid form data.')
+            audit(logger, 'user.create_invalid', logging.WARNING, user=request.user.username)
     else:
         form = UserCreationForm()
     return render(request, 'create_user.html', {'form': form})
@@ -111,24 +162,24 @@ def create_user(request):
 @login_required
 def user_detail(request, pk):
     user = get_object_or_404(User, pk=pk)
-    logger.info(f'User {request.user.username} accessed details for user {user.username}.')
+    audit(logger, 'user.viewed', user=request.user.username, target=user.pk)
     return render(request, 'user_detail.html', {'user': user})
 
 
 @login_required
 def update_task_progress(request, pk):
     task = get_object_or_404(Task, pk=pk)
-    if request.user != task.assigned_to:
-        logger.warning(f'User {request.user.username} tried to update forbidden task {task.name}.')
+    if task.assigned_to_id != request.user.id:
+        audit(logger, 'task.update_denied', logging.WARNING, user=request.user.username, task=task.pk)
         return HttpResponseForbidden("You are not allowed to update this task.")
     if request.method == 'POST':
         form = TaskProgressForm(request.POST, instance=task)
         if form.is_valid():
             form.save()
-            logger.info(f'User {request.user.username} updated progress for task {task.name}.')
-            return redirect('project_detail', pk=task.project.pk)
+            audit(logger, 'task.progress_updated', user=request.user.username, task=task.pk)
+            return redirect('project_detail', pk=task.project_id)
         else:
-            logger.warning('Task progress update failed. Invalid form data.')
+            audit(logger, 'task.progress_invalid', logging.WARNING, user=request.user.username, task=task.pk)
     else:
         form = TaskProgressForm(instance=task)
     return render(request, 'update_task_progress.html', {'form': form, 'task': task})
@@ -137,8 +188,8 @@ def update_task_progress(request, pk):
 @login_required
 def create_task(request, pk):
     project = get_object_or_404(Project, pk=pk)
-    if request.user != project.created_by:
-        logger.warning(f'User {request.user.username} tried to add task to forbidden project {project.name}.')
+    if project.created_by_id != request.user.id:
+        audit(logger, 'task.create_denied', logging.WARNING, user=request.user.username, project=project.pk)
         return HttpResponseForbidden("You are not allowed to add tasks to this project.")
     if request.method == 'POST':
         form = TaskForm(request.POST)
@@ -146,30 +197,30 @@ def create_task(request, pk):
             task = form.save(commit=False)
             task.project = project
             task.save()
-            logger.info(f'User {request.user.username} created task {task.name} in project {project.name}.')
+            audit(logger, 'task.created', user=request.user.username, task=task.pk, project=project.pk)
             return redirect('project_detail', pk=project.pk)
         else:
-            logger.warning('Task creation failed. Invalid form data.')
+            audit(logger, 'task.create_invalid', logging.WARNING, user=request.user.username, project=project.pk)
     else:
-        form = TaskForm()
+        form = TaskForm(initial={'project': project})
     return render(request, 'create_task.html', {'form': form, 'project': project})
 
 
 @login_required
 def add_member(request, pk):
     project = get_object_or_404(Project, pk=pk)
-    if request.user != project.created_by:
-        logger.warning(f'User {request.user.username} tried to add member to forbidden project {project.name}.')
+    if project.created_by_id != request.user.id:
+        audit(logger, 'project.add_member_denied', logging.WARNING, user=request.user.username, project=project.pk)
         return HttpResponseForbidden("You are not allowed to add members to this project.")
     if request.method == 'POST':
         form = AddMemberForm(request.POST)
         if form.is_valid():
             user = form.cleaned_data['user']
             project.members.add(user)
-            logger.info(f'User {request.user.username} added member {user.username} to project {project.name}.')
+            audit(logger, 'project.member_added', user=request.user.username, project=project.pk, member=user.pk)
             return redirect('project_detail', pk=project.pk)
         else:
-            logger.warning('Add member failed. Invalid form data.')
+            audit(logger, 'project.add_member_invalid', logging.WARNING, user=request.user.username, project=project.pk)
     else:
         form = AddMemberForm()
     return render(request, 'add_member.html', {'form': form, 'project': project})
@@ -0,0 +1,68 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
+
+
+class AutocompleteMixin:
+    """
+    Renders only the currently selected options of a model choice field; further options are
+    fetched by ``js/autocomplete.js`` from ``url``. Keeps form pages constant-size however many
+    rows the field's queryset spans.
+    """
+    url = None
+
+    class Media:
+        js = ['js/autocomplete.js']
+
+    def __init__(self, attrs=None, url=None):
+        super().__init__(attrs)
+        if url is not None:
+            self.url = url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        if self.url:
+            attrs['data-autocomplete-url'] = str(self.url)
+        return attrs
+
+    def selected_pks(self, value):
+        """The submitted values that are valid primary keys; a form re-rendered with errors may hold any string."""
+        pk_field = self.choices.queryset.model._meta.pk
+        pks = set()
+        for v in value:
+            if v in (None, ''):
+                continue
+            try:
+                pks.add(pk_field.to_python(v))
+            except ValidationError:
+                continue
+        return pks
+
+    def optgroups(self, name, value, attrs=None):
+        selected = self.selected_pks(value)
+        options = []
+        if not self.is_required and not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '---------', not selected, 0))
+        if selected:
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for obj in queryset:
+                option_value = self.choices.choice(obj)[0]
+                label = self.choices.field.label_from_instance(obj)
+                options.append(self.create_option(name, option_value, label, True, len(options), attrs=attrs))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
+
+
+class UserAutocompleteSelect(AutocompleteSelect):
+    url = reverse_lazy('user_autocomplete')
+
+
+class UserAutocompleteSelectMultiple(AutocompleteSelectMultiple):
+    url = reverse_lazy('user_autocomplete')
@@ -0,0 +1,37 @@
+// Remote search for <select data-autocomplete-url>: the server renders only the selected options,
+// matching users are fetched as the user types and merged into the select.
+$(function () {
+	$("select[data-autocomplete-url]").each(function () {
+		var $select = $(this);
+		var url = $select.data("autocomplete-url");
+		var $input = $('<input type="search" class="form-control mb-1" placeholder="Search users...">');
+		var timer = null;
+
+		$select.addClass("form-select").before($input);
+		if ($select.prop("multiple")) {
+			$select.attr("size", 8);
+		}
+
+		$input.on("input", function () {
+			clearTimeout(timer);
+			var term = $.trim($input.val());
+			if (!term) {
+				return;
+			}
+			timer = setTimeout(function () {
+				$.getJSON(url, { q: term }, function (data) {
+					// Keep what is selected, replace the previous suggestions.
+					$select.find("option:not(:selected)").filter(function () {
+						return this.value !== "";
+					}).remove();
+					$.each(data.results, function (i, user) {
+						if (!$select.find('option[value="' + user.id + '"]').length) {
+							var label = user.email ? user.username + " (" + user.email + ")" : user.username;
+							$select.append(new Option(label, user.id));
+						}
+					});
+				});
+			}, 250);
+		});
+	});
+});